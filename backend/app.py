@@ -4,16 +4,28 @@ Flask API for FIEK Chatbot using LangChain RAG
 
 from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
+import asyncio
 import os
 import json
+import threading
+import time
 from pathlib import Path
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables import RunnableLambda, RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
+from models.embedding_cache import CachedEmbeddings
+from models.answer_cache import SemanticAnswerCache
+from models.kb_version import read_kb_version
+from models.hybrid_retriever import HybridRetriever, load_bm25_index
+from models.chat_history import HistoryManager
+from models.context_packer import pack_context
+from models.indexer import estimate_tokens
+from models.timetable import load_schedule_index
+from models.fast_path import FastPathStats, IntentRouter, load_lookup_index
 
 load_dotenv()
 
@@ -24,173 +36,511 @@ CORS(app)  # Enable CORS for frontend
 print("Initializing FIEK Chatbot...")
 vectorstore = None
 rag_chain = None
+stream_chain = None
+query_embeddings = None
+retriever = None
+retriever_kb_version = None
+router = None
+
+# Guards lazy construction of the shared components above, so concurrent
+# first requests build a single Chroma client and a single pair of chains
+_init_lock = threading.RLock()
+_warmup_start_lock = threading.Lock()
+_warmup_thread = None
+# Readiness and cold-start timings reported by /api/health; written by the
+# warm-up thread and read by health checks, always under _startup_lock
+_startup_lock = threading.Lock()
+startup = {
+    'state': 'cold',  # cold -> warming -> ready | failed
+    'started_at': None,
+    'ready_at': None,
+    'timings': {},
+    'error': None
+}
+
+# Warm up in a background thread at process start instead of on the first request
+EAGER_WARMUP = os.environ.get('EAGER_WARMUP', 'false').lower() == 'true'
+# Embedded during warm-up to open the OpenAI connection and fill the embedding cache
+WARMUP_QUERY = os.environ.get('WARMUP_QUERY', 'Kush është dekani i FIEK?')
+
+# Candidate chunks retrieved for context packing, and candidates fetched
+# per retriever before fusion
+RETRIEVER_K = int(os.environ.get('RETRIEVER_K', 12))
+RETRIEVER_FETCH_K = int(os.environ.get('RETRIEVER_FETCH_K', 20))
+
+# Candidates are packed into a fixed context budget: MMR for diversity
+# (1.0 = rank only), overlap between chunks of the same source removed
+CONTEXT_TOKEN_BUDGET = int(os.environ.get('CONTEXT_TOKEN_BUDGET', 1500))
+CONTEXT_MMR_LAMBDA = float(os.environ.get('CONTEXT_MMR_LAMBDA', 0.7))
+
+# Query-embedding cache settings (TTL in seconds; path enables persistence)
+EMBEDDING_CACHE_SIZE = int(os.environ.get('EMBEDDING_CACHE_SIZE', 1024))
+EMBEDDING_CACHE_TTL = float(os.environ['EMBEDDING_CACHE_TTL']) if os.environ.get('EMBEDDING_CACHE_TTL') else None
+EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH') or None
+
+PERSIST_DIRECTORY = "./fiek_db"
+
+# Room, timetable and staff-contact lookups are answered from the indexes
+# ingest.py builds, without retrieval or an LLM call
+FAST_PATH_ENABLED = os.environ.get('FAST_PATH_ENABLED', 'true').lower() == 'true'
+fast_path_stats = FastPathStats()
+
+# Answers to first-turn questions are reused for near-identical queries
+# until ingest.py rebuilds the knowledge base
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.environ.get('ANSWER_CACHE_THRESHOLD', 0.95)),
+    max_entries=int(os.environ.get('ANSWER_CACHE_SIZE', 512)),
+    version_fn=lambda: read_kb_version(PERSIST_DIRECTORY)
+)
+
+# Older turns beyond the budget are folded into a cached rolling summary;
+# the last HISTORY_KEEP_TURNS question/answer pairs are sent verbatim
+history_manager = HistoryManager(
+    llm=lambda: ChatOpenAI(model="gpt-4o-mini", temperature=0),
+    max_tokens=int(os.environ.get('HISTORY_TOKEN_BUDGET', 2000)),
+    keep_turns=int(os.environ.get('HISTORY_KEEP_TURNS', 3))
+)
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant for the Faculty of Electrical and Computer Engineering (FIEK). "
+    "Use the provided context to answer the student's question accurately. "
+    "You have access to the conversation history, so you can understand references to previous questions and answers. "
+    "\n\n"
+    "IMPORTANT INSTRUCTIONS:\n"
+    "- When the user asks about FIEK (e.g., 'who is the dean of fiek', 'fiek dean', 'dean'), understand that they are asking about FIEK specifically. "
+    "- Be flexible with question variations: 'dean of fiek', 'fiek dean', 'who is the dean', 'the dean' all refer to the same thing. "
+    "- When the user uses similar terms (like 'schedule' and 'timetable', 'program' and 'programme'), understand they refer to the same concept. "
+    "- Extract the core question from the user's query, ignoring redundant words or variations in phrasing. "
+    "- If the context contains relevant information even if the exact wording doesn't match, use it to answer. "
+    "- CRITICAL: Always answer in the SAME LANGUAGE as the user's question. If the user asks in English, answer in English. If the user asks in Albanian, answer in Albanian.\n\n"
+    "If the answer is not in the context, say 'Nuk kam informacion për këtë pyetje në dokumentet e mia.' (in Albanian) or 'I do not have that information in my documents' (in English), matching the language of the question.\n\n"
+    "Context:\n{context}"
+)
 
 def get_vectorstore():
     """Get or initialize the Chroma vectorstore (lazy loading)."""
-    global vectorstore
-    if vectorstore is None:
+    global vectorstore, query_embeddings
+    if vectorstore is not None:
+        return vectorstore
+    with _init_lock:
+        if vectorstore is not None:
+            return vectorstore
         try:
             # Use lazy loading - only load when needed
-            embedding = OpenAIEmbeddings(model="text-embedding-3-small")
-            vectorstore = Chroma(
-                persist_directory="./fiek_db", 
-                embedding_function=embedding
+            # Repeated questions reuse their cached query embedding
+            query_embeddings = CachedEmbeddings(
+                OpenAIEmbeddings(model="text-embedding-3-small"),
+                max_size=EMBEDDING_CACHE_SIZE,
+                ttl=EMBEDDING_CACHE_TTL,
+                persist_path=EMBEDDING_CACHE_PATH
+            )
+            store = Chroma(
+                persist_directory=PERSIST_DIRECTORY, 
+                embedding_function=query_embeddings
             )
+            vectorstore = store
             print("Vectorstore loaded successfully")
         except Exception as e:
             print(f"Error loading vectorstore: {e}")
             raise
     return vectorstore
 
+def get_retriever():
+    """
+    Hybrid BM25 + vector retriever when ingest.py built a keyword index,
+    plain vector search otherwise; rebuilt (with a fresh BM25 index) when
+    ingest.py writes a new knowledge-base version.
+    """
+    global retriever, retriever_kb_version
+    version = read_kb_version(PERSIST_DIRECTORY)
+    if retriever is not None and retriever_kb_version == version:
+        return retriever
+    with _init_lock:
+        if retriever is not None and retriever_kb_version == version:
+            return retriever
+        vectorstore = get_vectorstore()
+        bm25 = load_bm25_index(PERSIST_DIRECTORY)
+        if bm25 is not None:
+            retriever = HybridRetriever(
+                vectorstore=vectorstore,
+                bm25=bm25,
+                k=RETRIEVER_K,
+                fetch_k=RETRIEVER_FETCH_K
+            )
+            print(f"Hybrid retriever ready ({len(bm25)} chunks in BM25 index)")
+        else:
+            print("BM25 index not found - using vector search only (re-run ingest to build it)")
+            retriever = vectorstore.as_retriever(search_kwargs={"k": RETRIEVER_K})
+        retriever_kb_version = version
+    return retriever
+
+def get_router():
+    """
+    Intent router over the schedule and lookup indexes; reloaded when
+    ingest.py writes a new knowledge-base version.
+    """
+    global router
+    version = read_kb_version(PERSIST_DIRECTORY)
+    if router is not None and router.kb_version == version:
+        return router
+    with _init_lock:
+        if router is None or router.kb_version != version:
+            router = IntentRouter(
+                schedule=load_schedule_index(PERSIST_DIRECTORY),
+                lookup=load_lookup_index(PERSIST_DIRECTORY),
+                kb_version=version
+            )
+    return router
+
+def fast_path_answer(query):
+    """{'intent', 'answer', 'sources'} for lookup questions, or None to use RAG."""
+    if not FAST_PATH_ENABLED:
+        return None
+    start = time.perf_counter()
+    result = None
+    try:
+        result = get_router().route(query)
+    except Exception as e:
+        print(f"Fast path failed, falling back to RAG: {e}")
+    fast_path_stats.record(result and result['intent'], time.perf_counter() - start)
+    return result
+
+def build_rag_chain(streaming=False, llm=None, retriever=None):
+    """
+    Build the RAG runnable: one retrieval feeds both the prompt context and
+    the returned documents. The output is a dict with the packed "context",
+    the "docs" that made it into the context and the generated "answer";
+    when streamed, the "docs" chunk arrives before the "answer" chunks.
+    Supports invoke/stream and ainvoke/astream.
+
+    Without an explicit retriever, get_retriever() is asked on every query,
+    so the shared chains pick up a re-ingested knowledge base.
+    """
+    current_retriever = get_retriever if retriever is None else (lambda: retriever)
+    if llm is None:
+        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=streaming)
+
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", SYSTEM_PROMPT),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{input}"),
+    ])
+
+    def with_docs(input_data, candidates):
+        context, docs = pack_context(
+            candidates,
+            max_tokens=CONTEXT_TOKEN_BUDGET,
+            lambda_mult=CONTEXT_MMR_LAMBDA
+        )
+        return {
+            "context": context,
+            "input": input_data["input"],
+            "chat_history": input_data["chat_history"],
+            "docs": docs
+        }
+    
+    def retrieve_context(input_data):
+        return with_docs(input_data, current_retriever().invoke(input_data["input"]))
+    
+    async def aretrieve_context(input_data):
+        # get_retriever() checks the kb_version file and may reload BM25
+        active = await asyncio.to_thread(current_retriever)
+        return with_docs(input_data, await active.ainvoke(input_data["input"]))
+    
+    # Retrieve once and keep the documents next to the answer, so the
+    # caller can list sources without a second vector search
+    return (
+        RunnableLambda(retrieve_context, afunc=aretrieve_context)
+        | RunnablePassthrough.assign(
+            answer=prompt | llm | StrOutputParser()
+        )
+    )
+
 def get_rag_chain():
     """Get or initialize the RAG chain."""
     global rag_chain
     if rag_chain is None:
-        vectorstore = get_vectorstore()
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-
-        llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
-
-        system_prompt = (
-            "You are a helpful assistant for the Faculty of Electrical and Computer Engineering (FIEK). "
-            "Use the provided context to answer the student's question accurately. "
-            "You have access to the conversation history, so you can understand references to previous questions and answers. "
-            "\n\n"
-            "IMPORTANT INSTRUCTIONS:\n"
-            "- When the user asks about FIEK (e.g., 'who is the dean of fiek', 'fiek dean', 'dean'), understand that they are asking about FIEK specifically. "
-            "- Be flexible with question variations: 'dean of fiek', 'fiek dean', 'who is the dean', 'the dean' all refer to the same thing. "
-            "- When the user uses similar terms (like 'schedule' and 'timetable', 'program' and 'programme'), understand they refer to the same concept. "
-            "- Extract the core question from the user's query, ignoring redundant words or variations in phrasing. "
-            "- If the context contains relevant information even if the exact wording doesn't match, use it to answer. "
-            "- CRITICAL: Always answer in the SAME LANGUAGE as the user's question. If the user asks in English, answer in English. If the user asks in Albanian, answer in Albanian.\n\n"
-            "If the answer is not in the context, say 'Nuk kam informacion për këtë pyetje në dokumentet e mia.' (in Albanian) or 'I do not have that information in my documents' (in English), matching the language of the question.\n\n"
-            "Context:\n{context}"
-        )
-        
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{input}"),
-        ])
-
-        def format_docs(docs):
-            return "\n\n".join(doc.page_content for doc in docs)
-        
-        def retrieve_context(input_data):
-            query = input_data["input"]
-            docs = retriever.invoke(query)
-            return {
-                "context": format_docs(docs),
-                "input": query,
-                "chat_history": input_data["chat_history"]
-            }
-        
-        rag_chain = (
-            RunnableLambda(retrieve_context)
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
+        with _init_lock:
+            if rag_chain is None:
+                rag_chain = build_rag_chain()
     
     return rag_chain
 
+def get_stream_chain():
+    """Get or initialize the streaming RAG chain shared by all SSE requests."""
+    global stream_chain
+    if stream_chain is None:
+        with _init_lock:
+            if stream_chain is None:
+                stream_chain = build_rag_chain(streaming=True)
+    
+    return stream_chain
+
+def get_sources(docs):
+    """Unique source names of the retrieved documents, in retrieval order."""
+    return list(dict.fromkeys(doc.metadata.get("source", "Unknown") for doc in docs))
+
+def format_sources(sources):
+    """Sources section appended to answers (matching appV2.py format)."""
+    sources_text = "\n\n---\n**Burimet:**\n"
+    for s in sources:
+        sources_text += f"- `{s}`\n"
+    return sources_text
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'X-Accel-Buffering': 'no',
+    'Connection': 'keep-alive'
+}
+
+def sse_event(payload):
+    """Encode one Server-Sent Events message."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+def parse_chat_request(data):
+    """
+    Extract (query, chat_history) from a chat request body.
+    Returns (None, None, (error, status)) when the request is invalid.
+    """
+    if not data:
+        return None, None, ('Invalid request. JSON body required.', 400)
+    
+    # Get user message - support both 'message' and 'messages' format
+    if 'messages' in data:
+        # Extract the last user message from the messages array
+        messages = data.get('messages', [])
+        user_messages = [msg for msg in messages if msg.get('role') == 'user']
+        if not user_messages:
+            return None, None, ('No user message found in messages array', 400)
+        query = user_messages[-1].get('content', '').strip()
+        
+        # Build chat history from previous messages (excluding system and last user message)
+        chat_history = []
+        for msg in messages[:-1]:  # Exclude the last user message
+            role = msg.get('role', '')
+            content = msg.get('content', '')
+            if role == 'user':
+                chat_history.append(HumanMessage(content=content))
+            elif role == 'assistant':
+                # Remove sources section if present
+                if "---\n**Burimet:**" in content:
+                    content = content.split("---\n**Burimet:**")[0].strip()
+                chat_history.append(AIMessage(content=content))
+    else:
+        # Legacy format: single message
+        query = data.get('message', '').strip()
+        chat_history = []
+    
+    if not query:
+        return None, None, ('Message is required', 400)
+    
+    return query, chat_history, None
+
+def is_ready():
+    """True once the vectorstore and both chains exist."""
+    return vectorstore is not None and rag_chain is not None and stream_chain is not None
+
+def update_startup(**fields):
+    """Set fields of the startup record (timings are replaced, not mutated)."""
+    with _startup_lock:
+        startup.update(fields)
+
+def startup_status():
+    """Snapshot of the warm-up state and timings."""
+    # Only the startup lock, not the init lock, so health checks never wait on a warm-up
+    with _startup_lock:
+        status = dict(startup, timings=dict(startup['timings']))
+    status['ready'] = is_ready()
+    if status['ready'] and status['state'] != 'ready':
+        # Components were injected directly (e.g. load_test.py)
+        status['state'] = 'ready'
+    return status
+
+def token_usage(history_info, query, context=None, answer=None):
+    """
+    Estimated token counts for one request. context/answer are None when
+    the answer came from the cache and the LLM was not called.
+    """
+    usage = dict(history_info)
+    usage['query_tokens'] = estimate_tokens(query)
+    if context is None:
+        usage.update(context_tokens=0, prompt_tokens=0, completion_tokens=0)
+        return usage
+    usage['context_tokens'] = estimate_tokens(context)
+    usage['prompt_tokens'] = (
+        estimate_tokens(SYSTEM_PROMPT) + usage['context_tokens']
+        + usage['history_tokens'] + usage['query_tokens']
+    )
+    usage['completion_tokens'] = estimate_tokens(answer or "")
+    return usage
+
+def health_status():
+    """Payload of the health check endpoint."""
+    status = startup_status()
+    if status['ready']:
+        message = 'Server is running. Chatbot is ready.'
+    elif status['state'] == 'warming':
+        message = 'Server is running. Chatbot is warming up.'
+    else:
+        message = 'Server is running. Chatbot will initialize on first request.'
+    return {
+        'status': 'healthy',
+        'ready': status['ready'],
+        'chatbot_initialized': status['ready'],
+        'startup': status,
+        'embedding_cache': query_embeddings.stats() if query_embeddings else None,
+        'answer_cache': answer_cache.stats(),
+        'history': history_manager.stats(),
+        'fast_path': fast_path_stats.stats(),
+        'message': message
+    }
+
+def fast_path_response(query, fast):
+    """/api/chat payload for a fast-path answer (no retrieval or LLM tokens)."""
+    full_response = f"{fast['answer']}{format_sources(fast['sources'])}"
+    return {
+        'reply': full_response,
+        'content': full_response,
+        'response': fast['answer'],
+        'sources': fast['sources'],
+        'cached': False,
+        'fast_path': fast['intent'],
+        'usage': token_usage({}, query)
+    }
+
+def fast_path_events(query, fast):
+    """SSE messages for a fast-path answer: the whole answer as one chunk, then sources and done."""
+    yield sse_event({'type': 'chunk', 'content': fast['answer']})
+    yield sse_event({'type': 'sources', 'content': format_sources(fast['sources'])})
+    yield sse_event({'type': 'done', 'usage': token_usage({}, query), 'fast_path': fast['intent']})
+
 def initialize_chatbot():
-    """Initialize the chatbot components."""
-    try:
-        get_vectorstore()
-        get_rag_chain()
+    """
+    Initialize the chatbot components (single-flight: concurrent callers
+    wait for the first one and share its result).
+    """
+    if is_ready():
         return True
-    except Exception as e:
-        print(f"Error initializing chatbot: {e}")
-        import traceback
-        traceback.print_exc()
-        return False
+    with _init_lock:
+        if is_ready():
+            return True
+        update_startup(state='warming', started_at=time.time(), ready_at=None, error=None, timings={})
+        timings = {}
+        t0 = time.perf_counter()
+        try:
+            get_vectorstore()
+            t1 = time.perf_counter()
+            timings['vectorstore_s'] = round(t1 - t0, 3)
+            update_startup(timings=dict(timings))
+            get_retriever()
+            get_rag_chain()
+            get_stream_chain()
+            t2 = time.perf_counter()
+            timings['chains_s'] = round(t2 - t1, 3)
+            update_startup(timings=dict(timings))
+            if WARMUP_QUERY:
+                try:
+                    # Opens the embeddings connection and caches the canary's vector
+                    query_embeddings.embed_query(WARMUP_QUERY)
+                    timings['canary_embed_s'] = round(time.perf_counter() - t2, 3)
+                except Exception as e:
+                    # The chatbot still works; the first real query pays the cost
+                    print(f"Warm-up canary embedding failed: {e}")
+            timings['total_s'] = round(time.perf_counter() - t0, 3)
+            update_startup(state='ready', ready_at=time.time(), timings=dict(timings))
+            print(f"Chatbot ready in {timings['total_s']}s")
+            return True
+        except Exception as e:
+            update_startup(state='failed', error=str(e), timings=dict(timings))
+            print(f"Error initializing chatbot: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+def start_warmup():
+    """
+    Initialize the chatbot in a background thread unless it is ready or
+    already warming up. Idempotent; returns the current startup state.
+    """
+    global _warmup_thread
+    with _warmup_start_lock:
+        if not is_ready() and not (_warmup_thread and _warmup_thread.is_alive()):
+            # Reported as warming right away, before the thread takes the init lock
+            update_startup(state='warming')
+            _warmup_thread = threading.Thread(target=initialize_chatbot, name='chatbot-warmup', daemon=True)
+            _warmup_thread.start()
+    return startup_status()['state']
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint - lightweight, doesn't initialize chatbot."""
-    return jsonify({
-        'status': 'healthy',
-        'chatbot_initialized': vectorstore is not None and rag_chain is not None,
-        'message': 'Server is running. Chatbot will initialize on first request.'
-    })
+    return jsonify(health_status())
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
     """Handle chat messages with conversation history."""
-    # Try to initialize if not already done
-    global vectorstore, rag_chain
-    if vectorstore is None or rag_chain is None:
-        if not initialize_chatbot():
-            return jsonify({
-                'error': 'Chatbot not initialized. Please check your .env file and ensure the vectorstore is set up.'
-            }), 500
-    
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                'error': 'Invalid request. JSON body required.'
-            }), 400
+        query, chat_history, error = parse_chat_request(request.get_json())
+        if error:
+            message, status = error
+            return jsonify({'error': message}), status
         
-        # Get user message - support both 'message' and 'messages' format
-        if 'messages' in data:
-            # Extract the last user message from the messages array
-            messages = data.get('messages', [])
-            user_messages = [msg for msg in messages if msg.get('role') == 'user']
-            if not user_messages:
-                return jsonify({
-                    'error': 'No user message found in messages array'
-                }), 400
-            query = user_messages[-1].get('content', '').strip()
-            
-            # Build chat history from previous messages (excluding system and last user message)
-            chat_history = []
-            for msg in messages[:-1]:  # Exclude the last user message
-                role = msg.get('role', '')
-                content = msg.get('content', '')
-                if role == 'user':
-                    chat_history.append(HumanMessage(content=content))
-                elif role == 'assistant':
-                    # Remove sources section if present
-                    if "---\n**Burimet:**" in content:
-                        content = content.split("---\n**Burimet:**")[0].strip()
-                    chat_history.append(AIMessage(content=content))
-        else:
-            # Legacy format: single message
-            query = data.get('message', '').strip()
-            chat_history = []
+        # Lookup questions are answered without the RAG components
+        fast = fast_path_answer(query)
+        if fast:
+            return jsonify(fast_path_response(query, fast))
         
-        if not query:
-            return jsonify({
-                'error': 'Message is required'
-            }), 400
+        # Try to initialize if not already done
+        if not is_ready():
+            if not initialize_chatbot():
+                return jsonify({
+                    'error': 'Chatbot not initialized. Please check your .env file and ensure the vectorstore is set up.'
+                }), 500
         
-        # Get RAG chain and vectorstore
-        chain = get_rag_chain()
-        vs = get_vectorstore()
+        # Keep long conversations within the history token budget
+        chat_history, history_info = history_manager.compact(chat_history)
         
-        # Invoke the chain with query and chat history
-        answer = chain.invoke({
-            "input": query,
-            "chat_history": chat_history
-        })
+        # Standalone questions can be answered from the semantic cache; the
+        # query embedding is cached, so retrieval below reuses it on a miss
+        query_vector = None
+        cached = None
+        if not chat_history:
+            query_vector = query_embeddings.embed_query(query)
+            cached = answer_cache.lookup(query_vector)
         
-        # Get sources
-        docs = vs.similarity_search(query, k=5)
-        sources = list(set([doc.metadata.get("source", "Unknown") for doc in docs]))
+        if cached:
+            answer, sources = cached
+            usage = token_usage(history_info, query)
+        else:
+            # Get RAG chain
+            chain = get_rag_chain()
+            
+            # Invoke the chain with query and chat history
+            result = chain.invoke({
+                "input": query,
+                "chat_history": chat_history
+            })
+            answer = result["answer"]
+            
+            # Sources come from the same retrieval that built the context
+            sources = get_sources(result["docs"])
+            usage = token_usage(history_info, query, result["context"], answer)
+            
+            if query_vector is not None:
+                answer_cache.store(query, query_vector, answer, sources)
         
         # Format response with sources (matching appV2.py format)
-        full_response = f"{answer}\n\n---\n**Burimet:**\n"
-        for s in sources:
-            full_response += f"- `{s}`\n"
+        full_response = f"{answer}{format_sources(sources)}"
         
         # Return response in format expected by frontend
         return jsonify({
             'reply': full_response,  # Frontend expects 'reply' or 'content'
             'content': full_response,  # Alternative field name
             'response': answer,  # Just the answer without sources
-            'sources': sources
+            'sources': sources,
+            'cached': cached is not None,
+            'fast_path': None,
+            'usage': usage
         })
     
     except Exception as e:
@@ -204,137 +554,88 @@ def chat():
 @app.route('/api/chat/stream', methods=['POST'])
 def chat_stream():
     """Handle chat messages with streaming response."""
-    # Try to initialize if not already done
-    global vectorstore, rag_chain
-    if vectorstore is None or rag_chain is None:
-        if not initialize_chatbot():
-            return jsonify({
-                'error': 'Chatbot not initialized. Please check your .env file and ensure the vectorstore is set up.'
-            }), 500
-    
     try:
-        data = request.get_json()
-        if not data:
-            return jsonify({
-                'error': 'Invalid request. JSON body required.'
-            }), 400
-        
-        # Get user message - support both 'message' and 'messages' format
-        if 'messages' in data:
-            # Extract the last user message from the messages array
-            messages = data.get('messages', [])
-            user_messages = [msg for msg in messages if msg.get('role') == 'user']
-            if not user_messages:
-                return jsonify({
-                    'error': 'No user message found in messages array'
-                }), 400
-            query = user_messages[-1].get('content', '').strip()
-            
-            # Build chat history from previous messages (excluding system and last user message)
-            chat_history = []
-            for msg in messages[:-1]:  # Exclude the last user message
-                role = msg.get('role', '')
-                content = msg.get('content', '')
-                if role == 'user':
-                    chat_history.append(HumanMessage(content=content))
-                elif role == 'assistant':
-                    # Remove sources section if present
-                    if "---\n**Burimet:**" in content:
-                        content = content.split("---\n**Burimet:**")[0].strip()
-                    chat_history.append(AIMessage(content=content))
-        else:
-            # Legacy format: single message
-            query = data.get('message', '').strip()
-            chat_history = []
+        query, chat_history, error = parse_chat_request(request.get_json())
+        if error:
+            message, status = error
+            return jsonify({'error': message}), status
         
-        if not query:
-            return jsonify({
-                'error': 'Message is required'
-            }), 400
+        # Lookup questions are answered without the RAG components
+        fast = fast_path_answer(query)
+        if fast:
+            return Response(
+                fast_path_events(query, fast),
+                mimetype='text/event-stream',
+                headers=SSE_HEADERS
+            )
         
-        # Get RAG chain and vectorstore
-        chain = get_rag_chain()
-        vs = get_vectorstore()
+        # Try to initialize if not already done
+        if not is_ready():
+            if not initialize_chatbot():
+                return jsonify({
+                    'error': 'Chatbot not initialized. Please check your .env file and ensure the vectorstore is set up.'
+                }), 500
         
-        # Get sources first (before streaming)
-        docs = vs.similarity_search(query, k=5)
-        sources = list(set([doc.metadata.get("source", "Unknown") for doc in docs]))
+        # Get the shared streaming chain
+        chain = get_stream_chain()
         
         def generate():
             """Generator function for streaming response."""
             try:
-                # Get the chain components for direct LLM streaming
-                vectorstore = get_vectorstore()
-                retriever = vectorstore.as_retriever(search_kwargs={"k": 5})
-                llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, streaming=True)
-                
-                system_prompt = (
-                    "You are a helpful assistant for the Faculty of Electrical and Computer Engineering (FIEK). "
-                    "Use the provided context to answer the student's question accurately. "
-                    "You have access to the conversation history, so you can understand references to previous questions and answers. "
-                    "\n\n"
-                    "IMPORTANT INSTRUCTIONS:\n"
-                    "- When the user asks about FIEK (e.g., 'who is the dean of fiek', 'fiek dean', 'dean'), understand that they are asking about FIEK specifically. "
-                    "- Be flexible with question variations: 'dean of fiek', 'fiek dean', 'who is the dean', 'the dean' all refer to the same thing. "
-                    "- When the user uses similar terms (like 'schedule' and 'timetable', 'program' and 'programme'), understand they refer to the same concept. "
-                    "- Extract the core question from the user's query, ignoring redundant words or variations in phrasing. "
-                    "- If the context contains relevant information even if the exact wording doesn't match, use it to answer. "
-                    "- CRITICAL: Always answer in the SAME LANGUAGE as the user's question. If the user asks in English, answer in English. If the user asks in Albanian, answer in Albanian.\n\n"
-                    "If the answer is not in the context, say 'Nuk kam informacion për këtë pyetje në dokumentet e mia.' (in Albanian) or 'I do not have that information in my documents' (in English), matching the language of the question.\n\n"
-                    "Context:\n{context}"
-                )
-                
-                prompt = ChatPromptTemplate.from_messages([
-                    ("system", system_prompt),
-                    MessagesPlaceholder(variable_name="chat_history"),
-                    ("human", "{input}"),
-                ])
-                
-                # Retrieve context
-                docs = retriever.invoke(query)
-                context = "\n\n".join(doc.page_content for doc in docs)
+                history, history_info = history_manager.compact(chat_history)
                 
-                # Create the prompt with context
-                formatted_prompt = prompt.format_messages(
-                    context=context,
-                    chat_history=chat_history,
-                    input=query
-                )
+                query_vector = None
+                cached = None
+                if not history:
+                    query_vector = query_embeddings.embed_query(query)
+                    cached = answer_cache.lookup(query_vector)
                 
-                # Stream directly from LLM
-                full_answer = ""
-                for chunk in llm.stream(formatted_prompt):
-                    if hasattr(chunk, 'content') and chunk.content:
-                        content = chunk.content
-                        full_answer += content
-                        # Send each chunk as JSON
-                        yield f"data: {json.dumps({'type': 'chunk', 'content': content})}\n\n"
+                if cached:
+                    # Cache hit: send the stored answer as a single chunk
+                    full_answer, sources = cached
+                    usage = token_usage(history_info, query)
+                    yield sse_event({'type': 'chunk', 'content': full_answer})
+                else:
+                    # A single retrieval yields the "docs" chunk first, followed by
+                    # the answer tokens streamed from the LLM
+                    docs = []
+                    context = ""
+                    full_answer = ""
+                    for chunk in chain.stream({
+                        "input": query,
+                        "chat_history": history
+                    }):
+                        if "docs" in chunk:
+                            docs = chunk["docs"]
+                            context = chunk["context"]
+                        content = chunk.get("answer")
+                        if content:
+                            full_answer += content
+                            # Send each chunk as JSON
+                            yield sse_event({'type': 'chunk', 'content': content})
+                    
+                    sources = get_sources(docs)
+                    usage = token_usage(history_info, query, context, full_answer)
+                    if query_vector is not None:
+                        answer_cache.store(query, query_vector, full_answer, sources)
                 
                 # Send sources section
-                sources_text = "\n\n---\n**Burimet:**\n"
-                for s in sources:
-                    sources_text += f"- `{s}`\n"
+                yield sse_event({'type': 'sources', 'content': format_sources(sources)})
                 
-                yield f"data: {json.dumps({'type': 'sources', 'content': sources_text})}\n\n"
-                
-                # Send completion signal
-                yield f"data: {json.dumps({'type': 'done'})}\n\n"
+                # Send completion signal with the request's token counts
+                yield sse_event({'type': 'done', 'usage': usage})
                 
             except Exception as e:
                 error_msg = f"Error during streaming: {str(e)}"
                 print(error_msg)
                 import traceback
                 traceback.print_exc()
-                yield f"data: {json.dumps({'type': 'error', 'content': error_msg})}\n\n"
+                yield sse_event({'type': 'error', 'content': error_msg})
         
         return Response(
             stream_with_context(generate()),
             mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'X-Accel-Buffering': 'no',
-                'Connection': 'keep-alive'
-            }
+            headers=SSE_HEADERS
         )
     
     except Exception as e:
@@ -345,19 +646,29 @@ def chat_stream():
             'error': f'An error occurred: {str(e)}'
         }), 500
 
+def initialize_response():
+    """
+    (payload, status code) for /api/initialize: starts a background
+    warm-up if needed and returns at once; poll /api/health for readiness.
+    """
+    state = start_warmup()
+    if state == 'ready':
+        return {'status': 'initialized'}, 200
+    return {'status': 'initializing', 'startup': startup_status()}, 202
+
 @app.route('/api/initialize', methods=['POST'])
 def initialize():
-    """Manually initialize chatbot."""
-    success = initialize_chatbot()
-    
-    if success:
-        return jsonify({'status': 'initialized'})
-    else:
-        return jsonify({'error': 'Failed to initialize'}), 500
+    """Start chatbot initialization without blocking the request."""
+    payload, status = initialize_response()
+    return jsonify(payload), status
+
+if EAGER_WARMUP:
+    # Runs under any WSGI/ASGI server that imports this module, not only __main__
+    start_warmup()
 
 if __name__ == '__main__':
-    # Don't initialize on startup - use lazy loading to save memory
-    # Initialize only when first request comes in
+    # Unless EAGER_WARMUP is set, don't initialize on startup - use lazy
+    # loading to save memory and initialize when the first request comes in
     
     # Run Flask app
     # Use PORT from environment (Render sets this automatically)
@@ -0,0 +1,190 @@
+"""
+Async (ASGI) serving mode for the FIEK Chatbot API.
+
+Same /api/health, /api/chat, /api/chat/stream and /api/initialize
+contracts and SSE event types (chunk, sources, done, error) as app.py, but
+retrieval and LLM streaming are awaited, so an open streaming connection
+costs a coroutine instead of a worker thread.
+
+Run with:
+    hypercorn asgi_app:app --bind 0.0.0.0:5001
+"""
+
+import asyncio
+import os
+
+from quart import Quart, request, jsonify, Response
+from quart_cors import cors
+
+# Chain construction, caches and request helpers are shared with the Flask app
+import app as chatbot
+
+app = Quart(__name__)
+app = cors(app, allow_origin="*")  # Enable CORS for frontend
+# Streaming answers can outlive Quart's default 60s response timeout
+app.config["RESPONSE_TIMEOUT"] = None
+
+_init_lock = asyncio.Lock()
+
+
+async def ensure_initialized():
+    """
+    Initialize the chatbot off the event loop. initialize_chatbot() is
+    single-flight across threads; the asyncio lock keeps waiting requests
+    from each tying up an executor thread.
+    """
+    if chatbot.is_ready():
+        return True
+    async with _init_lock:
+        if chatbot.is_ready():
+            return True
+        return await asyncio.to_thread(chatbot.initialize_chatbot)
+
+
+async def cached_answer(query, chat_history):
+    """(query_vector, cached) for standalone questions, as in app.py."""
+    if chat_history:
+        return None, None
+    query_vector = await chatbot.query_embeddings.aembed_query(query)
+    return query_vector, chatbot.answer_cache.lookup(query_vector)
+
+
+@app.route('/api/health', methods=['GET'])
+async def health_check():
+    """Health check endpoint - lightweight, doesn't initialize chatbot."""
+    return jsonify(chatbot.health_status())
+
+
+@app.route('/api/chat', methods=['POST'])
+async def chat():
+    """Handle chat messages with conversation history."""
+    try:
+        query, chat_history, error = chatbot.parse_chat_request(await request.get_json(silent=True))
+        if error:
+            message, status = error
+            return jsonify({'error': message}), status
+
+        # Lookup questions are answered without the RAG components; routing
+        # reads the kb_version file and may reload the indexes, so off the loop
+        fast = await asyncio.to_thread(chatbot.fast_path_answer, query)
+        if fast:
+            return jsonify(chatbot.fast_path_response(query, fast))
+
+        if not await ensure_initialized():
+            return jsonify({
+                'error': 'Chatbot not initialized. Please check your .env file and ensure the vectorstore is set up.'
+            }), 500
+
+        chat_history, history_info = await chatbot.history_manager.acompact(chat_history)
+        query_vector, cached = await cached_answer(query, chat_history)
+        if cached:
+            answer, sources = cached
+            usage = chatbot.token_usage(history_info, query)
+        else:
+            result = await chatbot.get_rag_chain().ainvoke({
+                "input": query,
+                "chat_history": chat_history
+            })
+            answer = result["answer"]
+            sources = chatbot.get_sources(result["docs"])
+            usage = chatbot.token_usage(history_info, query, result["context"], answer)
+            if query_vector is not None:
+                chatbot.answer_cache.store(query, query_vector, answer, sources)
+
+        full_response = f"{answer}{chatbot.format_sources(sources)}"
+        return jsonify({
+            'reply': full_response,
+            'content': full_response,
+            'response': answer,
+            'sources': sources,
+            'cached': cached is not None,
+            'fast_path': None,
+            'usage': usage
+        })
+
+    except Exception as e:
+        print(f"Error in chat endpoint: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+
+
+@app.route('/api/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Handle chat messages with streaming response."""
+    query, chat_history, error = chatbot.parse_chat_request(await request.get_json(silent=True))
+    if error:
+        message, status = error
+        return jsonify({'error': message}), status
+
+    # Lookup questions are answered without the RAG components
+    fast = await asyncio.to_thread(chatbot.fast_path_answer, query)
+    if fast:
+        return Response(chatbot.fast_path_events(query, fast), mimetype='text/event-stream',
+                        headers=chatbot.SSE_HEADERS)
+
+    if not await ensure_initialized():
+        return jsonify({
+            'error': 'Chatbot not initialized. Please check your .env file and ensure the vectorstore is set up.'
+        }), 500
+
+    chain = chatbot.get_stream_chain()
+
+    async def generate():
+        try:
+            history, history_info = await chatbot.history_manager.acompact(chat_history)
+            query_vector, cached = await cached_answer(query, history)
+            if cached:
+                full_answer, sources = cached
+                usage = chatbot.token_usage(history_info, query)
+                yield chatbot.sse_event({'type': 'chunk', 'content': full_answer})
+            else:
+                docs = []
+                context = ""
+                full_answer = ""
+                async for chunk in chain.astream({
+                    "input": query,
+                    "chat_history": history
+                }):
+                    if "docs" in chunk:
+                        docs = chunk["docs"]
+                        context = chunk["context"]
+                    content = chunk.get("answer")
+                    if content:
+                        full_answer += content
+                        yield chatbot.sse_event({'type': 'chunk', 'content': content})
+
+                sources = chatbot.get_sources(docs)
+                usage = chatbot.token_usage(history_info, query, context, full_answer)
+                if query_vector is not None:
+                    chatbot.answer_cache.store(query, query_vector, full_answer, sources)
+
+            yield chatbot.sse_event({'type': 'sources', 'content': chatbot.format_sources(sources)})
+            yield chatbot.sse_event({'type': 'done', 'usage': usage})
+
+        except Exception as e:
+            error_msg = f"Error during streaming: {str(e)}"
+            print(error_msg)
+            yield chatbot.sse_event({'type': 'error', 'content': error_msg})
+
+    response = Response(generate(), mimetype='text/event-stream', headers=chatbot.SSE_HEADERS)
+    response.timeout = None
+    return response
+
+
+@app.route('/api/initialize', methods=['POST'])
+async def initialize():
+    """Start chatbot initialization without blocking the request."""
+    payload, status = chatbot.initialize_response()
+    return jsonify(payload), status
+
+
+if __name__ == '__main__':
+    import hypercorn.asyncio
+    from hypercorn.config import Config
+
+    config = Config()
+    config.bind = [f"0.0.0.0:{int(os.environ.get('PORT', 5001))}"]
+    asyncio.run(hypercorn.asyncio.serve(app, config))
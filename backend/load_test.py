@@ -0,0 +1,167 @@
+"""
+Load test for the async (ASGI) serving mode against a local fake LLM.
+
+Opens many concurrent /api/chat/stream requests through Quart's test
+client. The LLM and retriever are local fakes that only sleep, so no
+OpenAI key or vector database is needed. When streams are served as
+coroutines, the wall time stays close to a single stream's duration
+instead of growing with the number of connections, and the thread count
+stays flat.
+
+Usage:
+    python load_test.py --concurrency 200 --tokens 20 --token-delay 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+# Make sure app.py's module-level setup never needs real credentials
+os.environ.setdefault("OPENAI_API_KEY", "load-test")
+sys.path.insert(0, str(Path(__file__).parent))
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.retrievers import BaseRetriever
+
+import app as chatbot
+import asgi_app
+from models.embedding_cache import CachedEmbeddings
+
+
+class FakeStreamingLLM(BaseChatModel):
+    """Chat model that streams a fixed answer, sleeping before every token."""
+
+    tokens: int = 20
+    token_delay: float = 0.05
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-streaming"
+
+    def _answer_tokens(self):
+        return [f"token{i} " for i in range(self.tokens)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.tokens * self.token_delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self._answer_tokens())))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.tokens * self.token_delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(self._answer_tokens())))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        for token in self._answer_tokens():
+            await asyncio.sleep(self.token_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=token))
+
+
+class FakeRetriever(BaseRetriever):
+    """Returns fixed documents after a simulated search latency."""
+
+    latency: float = 0.02
+
+    def _docs(self) -> List[Document]:
+        return [
+            Document(page_content=f"Context chunk {i}", metadata={"source": f"fake_source_{i}.pdf"})
+            for i in range(3)
+        ]
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        time.sleep(self.latency)
+        return self._docs()
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun) -> List[Document]:
+        await asyncio.sleep(self.latency)
+        return self._docs()
+
+
+def install_fakes(tokens, token_delay, retrieval_latency):
+    """Point the shared chatbot state at the fakes instead of OpenAI/Chroma."""
+    llm = FakeStreamingLLM(tokens=tokens, token_delay=token_delay)
+    retriever = FakeRetriever(latency=retrieval_latency)
+    chatbot.query_embeddings = CachedEmbeddings(DeterministicFakeEmbedding(size=16))
+    chatbot.vectorstore = "fake"
+    chatbot.retriever = retriever
+    chatbot.rag_chain = chatbot.build_rag_chain(llm=llm, retriever=retriever)
+    chatbot.stream_chain = chatbot.build_rag_chain(streaming=True, llm=llm, retriever=retriever)
+    # Every request must reach the LLM
+    chatbot.answer_cache.threshold = 2.0
+
+
+def parse_events(body):
+    return [
+        json.loads(line[len("data: "):])
+        for line in body.split("\n")
+        if line.startswith("data: ")
+    ]
+
+
+async def one_stream(client, i):
+    start = time.perf_counter()
+    response = await client.post('/api/chat/stream', json={"message": f"load test question {i}"})
+    body = await response.get_data(as_text=True)
+    events = parse_events(body)
+    return time.perf_counter() - start, [event["type"] for event in events]
+
+
+async def run(concurrency, tokens, token_delay, retrieval_latency):
+    install_fakes(tokens, token_delay, retrieval_latency)
+    single_stream = retrieval_latency + tokens * token_delay
+
+    peak_threads = threading.active_count()
+    done_sampling = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done_sampling.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    async with asgi_app.app.test_app() as test_app:
+        client = test_app.test_client()
+        sampler = asyncio.create_task(sample_threads())
+        start = time.perf_counter()
+        results = await asyncio.gather(*(one_stream(client, i) for i in range(concurrency)))
+        wall = time.perf_counter() - start
+        done_sampling.set()
+        await sampler
+
+    latencies = sorted(latency for latency, _ in results)
+    complete = sum(1 for _, types in results if types and types[-1] == "done" and "sources" in types)
+    errors = sum(1 for _, types in results if "error" in types)
+
+    print("=" * 60)
+    print("Async SSE load test (fake LLM)")
+    print("=" * 60)
+    print(f"Concurrent streams:    {concurrency}")
+    print(f"Single stream:         {single_stream:.2f}s ({tokens} tokens x {token_delay}s + {retrieval_latency}s retrieval)")
+    print(f"Wall time:             {wall:.2f}s (serial would be {single_stream * concurrency:.1f}s)")
+    print(f"Latency p50 / p95:     {statistics.median(latencies):.2f}s / {latencies[int(0.95 * (len(latencies) - 1))]:.2f}s")
+    print(f"Completed streams:     {complete}/{concurrency} ({errors} errors)")
+    print(f"Peak threads:          {peak_threads}")
+    print(f"Streamed tokens/s:     {concurrency * tokens / wall:.0f}")
+    return complete == concurrency
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--token-delay", type=float, default=0.05)
+    parser.add_argument("--retrieval-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    ok = asyncio.run(run(args.concurrency, args.tokens, args.token_delay, args.retrieval_latency))
+    sys.exit(0 if ok else 1)
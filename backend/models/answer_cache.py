@@ -0,0 +1,86 @@
+"""
+Semantic answer cache for FAQ-style questions.
+
+A stored answer is reused when a new query's embedding is within a cosine
+similarity threshold of an earlier query. Entries are tagged with the
+knowledge-base version, so re-running ingest invalidates them.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """LRU cache of (answer, sources) keyed by query embedding similarity."""
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512,
+                 version_fn: Optional[Callable[[], Optional[str]]] = None):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # query text -> (unit vector, answer, sources), oldest first
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _unit(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _check_version(self):
+        """Drop every entry if the knowledge base was rebuilt (lock held)."""
+        version = self.version_fn() if self.version_fn else None
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def lookup(self, query_vector) -> Optional[Tuple[str, List[str]]]:
+        """Return (answer, sources) for the most similar cached query, if close enough."""
+        query = self._unit(query_vector)
+        with self._lock:
+            self._check_version()
+            if not self._entries:
+                self.misses += 1
+                return None
+            keys = list(self._entries)
+            matrix = np.stack([self._entries[k][0] for k in keys])
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            _, answer, sources = self._entries[key]
+            return answer, list(sources)
+
+    def store(self, query: str, query_vector, answer: str, sources: List[str]):
+        with self._lock:
+            self._check_version()
+            self._entries[query] = (self._unit(query_vector), answer, list(sources))
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "kb_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+            }
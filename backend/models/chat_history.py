@@ -0,0 +1,200 @@
+"""
+Token-budgeted chat history.
+
+The frontend resends the whole conversation on every request. Histories
+that fit the budget are passed through unchanged. Otherwise the last few
+turns are kept verbatim and everything older is folded into a rolling
+summary. Summaries are cached under a chained hash of the messages they
+cover, so the next request only summarizes the turns added since.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from .indexer import estimate_tokens
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+SUMMARY_PROMPT = (
+    "Update the running summary of a conversation between a student and the FIEK assistant. "
+    "Keep names, courses, dates, rooms and any facts the student may refer back to; drop pleasantries. "
+    "Write it in the language of the conversation, in at most {max_words} words.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New messages:\n{messages}\n\n"
+    "Updated summary:"
+)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Estimated tokens of one message, including ~4 tokens of chat framing."""
+    return estimate_tokens(message.content) + 4
+
+
+def _chain_hashes(messages: List[BaseMessage]) -> List[str]:
+    """hashes[i] identifies messages[:i + 1]; a conversation keeps its prefixes' hashes as it grows."""
+    hashes = []
+    digest = ""
+    for message in messages:
+        digest = hashlib.sha256(f"{digest}\x00{message.type}\x00{message.content}".encode("utf-8")).hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+def _transcript(messages: List[BaseMessage]) -> str:
+    roles = {"human": "Student", "ai": "Assistant"}
+    return "\n".join(f"{roles.get(m.type, m.type)}: {m.content}" for m in messages)
+
+
+class HistoryManager:
+    """Keeps chat history within a token budget using a cached rolling summary."""
+
+    def __init__(self, llm=None, max_tokens: int = 2000, keep_turns: int = 3,
+                 summary_words: int = 150, cache_size: int = 256):
+        # llm may be a zero-argument factory, so no client is built until a
+        # conversation first outgrows the budget
+        self._llm = llm
+        self.max_tokens = max_tokens
+        self.keep_turns = keep_turns
+        self.summary_words = summary_words
+        self.cache_size = cache_size
+        self.summaries_computed = 0
+        self.summary_cache_hits = 0
+        # chained hash of the summarized prefix -> summary text, oldest first
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def llm(self):
+        if callable(self._llm) and not hasattr(self._llm, "invoke"):
+            self._llm = self._llm()
+        return self._llm
+
+    def _split(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], List[BaseMessage]]:
+        """(older, recent): recent is at most keep_turns turns and leaves room for the summary."""
+        start = max(0, len(messages) - 2 * self.keep_turns)
+        # Leave roughly summary_words * 2 tokens for the summary itself
+        budget = self.max_tokens - 2 * self.summary_words
+        recent_tokens = sum(message_tokens(m) for m in messages[start:])
+        while start < len(messages) - 1 and recent_tokens > budget:
+            recent_tokens -= message_tokens(messages[start])
+            start += 1
+        # Start the verbatim part on a student message when possible
+        while 0 < start < len(messages) - 1 and not isinstance(messages[start], HumanMessage):
+            start += 1
+        return messages[:start], messages[start:]
+
+    def _cached_prefix(self, hashes: List[str]) -> Tuple[int, str]:
+        """(covered message count, summary) for the longest already summarized prefix."""
+        with self._lock:
+            for i in range(len(hashes), 0, -1):
+                summary = self._summaries.get(hashes[i - 1])
+                if summary is not None:
+                    self._summaries.move_to_end(hashes[i - 1])
+                    return i, summary
+        return 0, ""
+
+    def _remember(self, key: str, summary: str):
+        with self._lock:
+            self._summaries[key] = summary
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
+
+    def _summary_prompt(self, summary: str, messages: List[BaseMessage]) -> str:
+        return SUMMARY_PROMPT.format(
+            max_words=self.summary_words,
+            summary=summary or "(none)",
+            messages=_transcript(messages),
+        )
+
+    def _plan(self, messages: List[BaseMessage]):
+        """Everything compact() needs besides the LLM call; None if no compaction is needed."""
+        tokens_before = sum(message_tokens(m) for m in messages)
+        if tokens_before <= self.max_tokens:
+            return None
+        older, recent = self._split(messages)
+        if not older:
+            return None
+        hashes = _chain_hashes(older)
+        covered, summary = self._cached_prefix(hashes)
+        return tokens_before, older, recent, hashes, covered, summary
+
+    def _finish(self, messages, tokens_before, older, recent, summary, cached):
+        compacted = list(recent)
+        if summary:
+            compacted.insert(0, SystemMessage(content=SUMMARY_PREFIX + summary))
+        return compacted, {
+            "history_messages": len(messages),
+            "history_tokens_original": tokens_before,
+            "history_tokens": sum(message_tokens(m) for m in compacted),
+            "summarized_messages": len(older),
+            "summary_cached": cached,
+        }
+
+    @staticmethod
+    def _unchanged(messages):
+        tokens = sum(message_tokens(m) for m in messages)
+        return list(messages), {
+            "history_messages": len(messages),
+            "history_tokens_original": tokens,
+            "history_tokens": tokens,
+            "summarized_messages": 0,
+            "summary_cached": False,
+        }
+
+    def _fallback(self, error):
+        # Without a summary the older turns are dropped, which still bounds the prompt
+        print(f"History summarization failed, dropping older turns: {error}")
+        return ""
+
+    def compact(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], dict]:
+        """Return (history to send, token usage info)."""
+        plan = self._plan(messages)
+        if plan is None:
+            return self._unchanged(messages)
+        tokens_before, older, recent, hashes, covered, summary = plan
+        cached = covered == len(older)
+        if not cached:
+            try:
+                response = self.llm.invoke(self._summary_prompt(summary, older[covered:]))
+                summary = response.content.strip()
+                self._remember(hashes[-1], summary)
+                self.summaries_computed += 1
+            except Exception as e:
+                summary = self._fallback(e)
+        else:
+            self.summary_cache_hits += 1
+        return self._finish(messages, tokens_before, older, recent, summary, cached)
+
+    async def acompact(self, messages: List[BaseMessage]) -> Tuple[List[BaseMessage], dict]:
+        """Async version of compact()."""
+        plan = self._plan(messages)
+        if plan is None:
+            return self._unchanged(messages)
+        tokens_before, older, recent, hashes, covered, summary = plan
+        cached = covered == len(older)
+        if not cached:
+            try:
+                response = await self.llm.ainvoke(self._summary_prompt(summary, older[covered:]))
+                summary = response.content.strip()
+                self._remember(hashes[-1], summary)
+                self.summaries_computed += 1
+            except Exception as e:
+                summary = self._fallback(e)
+        else:
+            self.summary_cache_hits += 1
+        return self._finish(messages, tokens_before, older, recent, summary, cached)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cached_summaries": len(self._summaries),
+                "summaries_computed": self.summaries_computed,
+                "summary_cache_hits": self.summary_cache_hits,
+                "max_tokens": self.max_tokens,
+                "keep_turns": self.keep_turns,
+            }
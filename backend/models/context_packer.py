@@ -0,0 +1,139 @@
+"""
+Context packing for the RAG prompt.
+
+Retrieval returns more candidates than the prompt needs. The packer picks
+chunks by maximal marginal relevance (retrieval rank traded off against
+lexical Jaccard similarity to the chunks already picked). It removes the
+text that chunks from the same source share because of the splitter's
+chunk_overlap, and writes one "[Source: ...]" header per source. Chunks
+are added until a token budget is filled.
+"""
+
+import re
+from typing import Dict, List, Tuple
+
+from langchain_core.documents import Document
+
+from .hybrid_retriever import tokenize
+from .indexer import estimate_tokens
+
+_SOURCE_HEADER_RE = re.compile(r"^\s*\[Source: [^\]\n]*\]\s*")
+
+# Overlaps shorter than this are treated as coincidence
+MIN_OVERLAP_CHARS = 30
+# The splitter's chunk_overlap is 200; allow for whitespace differences
+MAX_OVERLAP_CHARS = 400
+# Don't squeeze a truncated chunk into less room than this
+MIN_TRIMMED_TOKENS = 60
+
+
+def strip_source_header(text: str) -> str:
+    """Remove a leading "[Source: url]" line added at ingest time."""
+    return _SOURCE_HEADER_RE.sub("", text, count=1)
+
+
+def overlap_length(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right."""
+    limit = min(len(left), len(right), MAX_OVERLAP_CHARS)
+    for size in range(limit, MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def mmr_order(docs: List[Document], lambda_mult: float = 0.7) -> List[int]:
+    """
+    Order candidate positions by MMR. Relevance is taken from retrieval
+    rank (the first candidate is the most relevant), and redundancy is the
+    highest Jaccard similarity to an already selected chunk.
+    """
+    n = len(docs)
+    terms = [set(tokenize(doc.page_content)) for doc in docs]
+    relevance = [1.0 - i / n for i in range(n)]
+    redundancy = [0.0] * n
+    remaining = list(range(n))
+    order = []
+    while remaining:
+        best = max(remaining, key=lambda i: lambda_mult * relevance[i] - (1 - lambda_mult) * redundancy[i])
+        order.append(best)
+        remaining.remove(best)
+        for i in remaining:
+            redundancy[i] = max(redundancy[i], jaccard(terms[i], terms[best]))
+    return order
+
+
+def _trim_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text to roughly max_tokens, preferring a sentence or line boundary."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4]
+    while cut and estimate_tokens(cut) > max_tokens:
+        cut = cut[:int(len(cut) * 0.9)]
+    boundary = max(cut.rfind(". "), cut.rfind("\n"))
+    if boundary > len(cut) // 2:
+        cut = cut[:boundary + 1]
+    return cut.rstrip() + " …"
+
+
+def pack_context(docs: List[Document], max_tokens: int = 1500,
+                 lambda_mult: float = 0.7) -> Tuple[str, List[Document]]:
+    """
+    Build the prompt context from ranked candidates. Returns the context
+    text and the documents that made it in (in context order).
+    """
+    # source -> texts already packed for it, in packing order
+    sections: Dict[str, List[str]] = {}
+    used: List[Document] = []
+    seen_texts = set()
+    tokens = 0
+
+    for position in mmr_order(docs, lambda_mult):
+        doc = docs[position]
+        source = doc.metadata.get("source", "Unknown")
+        text = strip_source_header(doc.page_content).strip()
+        if not text or text in seen_texts:
+            continue
+        seen_texts.add(text)
+
+        packed = sections.get(source, [])
+        if any(text in other for other in packed):
+            continue
+        for i, other in enumerate(packed):
+            # This chunk continues one already packed: drop the shared prefix
+            size = overlap_length(other, text)
+            if size:
+                text = text[size:].lstrip()
+                continue
+            # This chunk precedes one already packed: drop the shared suffix
+            size = overlap_length(text, other)
+            if size:
+                text = text[:-size].rstrip()
+        if not text:
+            continue
+
+        # The first chunk of a source also pays for its header line
+        cost = estimate_tokens(text) + (0 if source in sections else estimate_tokens(f"[Source: {source}]") + 1)
+        if tokens + cost > max_tokens:
+            room = max_tokens - tokens - (cost - estimate_tokens(text))
+            if room < MIN_TRIMMED_TOKENS:
+                continue
+            text = _trim_to_tokens(text, room)
+            cost = max_tokens - tokens
+
+        sections.setdefault(source, []).append(text)
+        used.append(doc)
+        tokens += cost
+        if tokens >= max_tokens:
+            break
+
+    context = "\n\n".join(
+        f"[Source: {source}]\n" + "\n\n".join(texts)
+        for source, texts in sections.items()
+    )
+    return context, used
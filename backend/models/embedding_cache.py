@@ -0,0 +1,140 @@
+"""
+Query-embedding cache for the chat endpoints.
+
+Students repeat the same handful of questions, so query embeddings are
+cached in memory (LRU with an optional TTL) and can optionally be
+persisted to a JSON file to survive restarts.
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: lowercased with whitespace collapsed."""
+    return " ".join(text.lower().split())
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model and caches `embed_query` results.
+
+    Document embeddings (used at ingest time) are passed straight through;
+    only query embeddings are cached, keyed on the normalized query text.
+    """
+
+    def __init__(self, embedding: Embeddings, max_size: int = 1024,
+                 ttl: Optional[float] = None, persist_path: Optional[str] = None):
+        self.embedding = embedding
+        self.max_size = max_size
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.hits = 0
+        self.misses = 0
+        # key -> (created_at, vector), oldest first
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        if persist_path:
+            self._load()
+            atexit.register(self.save)
+
+    def _is_expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def _get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                created_at, vector = entry
+                if not self._is_expired(created_at):
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return list(vector)
+                del self._cache[key]
+            self.misses += 1
+            return None
+
+    def _put(self, key: str, vector: List[float]):
+        with self._lock:
+            self._cache[key] = (time.time(), list(vector))
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def embed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = self.embedding.embed_query(text)
+            self._put(key, vector)
+        return vector
+
+    async def aembed_query(self, text: str) -> List[float]:
+        key = normalize_query(text)
+        vector = self._get(key)
+        if vector is None:
+            vector = await self.embedding.aembed_query(text)
+            self._put(key, vector)
+        return vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embedding.embed_documents(texts)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.embedding.aembed_documents(texts)
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size, for health reporting."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def save(self):
+        """Write the cache to `persist_path` (atomic replace)."""
+        if not self.persist_path:
+            return
+        with self._lock:
+            entries = [[key, created_at, vector]
+                       for key, (created_at, vector) in self._cache.items()
+                       if not self._is_expired(created_at)]
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.persist_path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.persist_path)
+        except OSError as e:
+            print(f"⚠️  Could not save embedding cache to {self.persist_path}: {e}")
+
+    def _load(self):
+        if not os.path.exists(self.persist_path):
+            return
+        try:
+            with open(self.persist_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not load embedding cache from {self.persist_path}: {e}")
+            return
+        for key, created_at, vector in entries[-self.max_size:]:
+            if not self._is_expired(created_at):
+                self._cache[key] = (created_at, vector)
@@ -0,0 +1,453 @@
+"""
+Structured fast path for lookup questions.
+
+Some questions are plain lookups: the list of rooms, what is scheduled in
+a room or for a course or group, and a staff member's office or email.
+IntentRouter matches them with keyword rules and answers them from indexes
+built at ingest time: the ScheduleIndex from the timetables, and the
+LookupIndex of rooms and staff contacts. Everything else returns None and
+goes through the RAG chain as before.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+try:
+    from .timetable import (
+        DAYS, ENGLISH_DAY_NAMES, ScheduleIndex, fold, format_session,
+        group_key, normalize_day, normalize_room, course_words
+    )
+except ImportError:
+    from timetable import (
+        DAYS, ENGLISH_DAY_NAMES, ScheduleIndex, fold, format_session,
+        group_key, normalize_day, normalize_room, course_words
+    )
+
+LOOKUP_INDEX_FILE = "lookup_index.json"
+
+# Longer answers are better written by the LLM from the retrieved context
+MAX_ANSWER_LINES = 40
+# A contact value shared by this many people is the site footer, not theirs
+SHARED_VALUE_LIMIT = 3
+
+# Primes are kept on tokens with digits, for groups like 3a'
+_TOKEN_RE = re.compile(r"[^\W_]+['\"’]*", re.UNICODE)
+_EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+_CONTACT_FIELDS = {
+    "office": ("zyra", "kabineti", "office", "salla"),
+    "phone": ("telefoni", "tel", "phone"),
+}
+_FIELDS = ("office", "email", "phone")
+_TITLE_WORDS = {"prof", "asoc", "ass", "dr", "sc", "msc", "mr", "phd", "doc", "ma", "bsc", "ing"}
+_TITLE_SUFFIX_RE = re.compile(r"\s+[-|–]\s+.*$")
+
+# Intent keywords (folded: lowercase, no diacritics)
+_ROOM_WORDS = {"salla", "sallat", "sallen", "sallave", "klasa", "klasat", "laborator", "laboratori",
+               "laboratoret", "room", "rooms", "lab", "labs", "laboratories"}
+# The room list answers only explicit list questions ("Lista e sallave", "Cilat janë
+# sallat?", "List all rooms"); "Which lab has the most computers?" goes to RAG
+_LIST_WORDS = {"list", "lista", "listen", "listo", "listoni"}
+_ALL_WORDS = {"all", "gjitha"}
+_LIST_FILLER_WORDS = {"e", "i", "te", "ne", "dhe", "per", "jane", "cilat", "fiek", "na", "me", "trego",
+                      "tregoni", "the", "of", "at", "in", "and", "are", "what", "show", "give", "please"}
+# Only words that ask about the timetable; "ka", "cka" and "what" appear in any question
+# ("Sa kredite ka lënda Fizika?") and must not send it to the schedule
+_SCHEDULE_WORDS = {"orari", "orarin", "ora", "oret", "mesim", "mesimi", "ligjerata", "ligjeraten",
+                   "ligjerate", "ligjeratat", "ushtrime", "ushtrimet", "schedule", "timetable",
+                   "class", "classes", "lecture", "lectures", "exercise", "exercises"}
+# "When was the faculty founded?": these ask about the timetable only next to a day, time or group
+_WHEN_WORDS = {"kur", "when"}
+_CONTACT_WORDS = {"zyra", "zyren", "zyres", "kabineti", "kabinetin", "email", "emaili", "e-mail", "mail",
+                  "telefoni", "telefonin", "kontakt", "kontakti", "kontaktin", "office", "phone", "contact"}
+_ENGLISH_WORDS = {"what", "whats", "which", "when", "where", "who", "is", "are", "the", "in", "on", "at",
+                  "room", "rooms", "schedule", "timetable", "class", "classes", "office", "phone",
+                  "list", "all", "of", "does", "have", "today", "tomorrow"}
+_ALBANIAN_WORDS = {"cka", "cilat", "kur", "ku", "eshte", "jane", "ka", "ne", "te", "e", "salla", "sallat",
+                   "orari", "zyra", "sot", "neser", "per", "i", "dhe"}
+# English course words -> prefix of the Albanian course word
+_ENGLISH_COURSE_WORDS = {"physics": "fizik", "programming": "progr", "algebra": "algje", "calculus": "kalku",
+                         "electrical": "elekt", "engineering": "inxhi", "communication": "komun",
+                         "software": "softu", "tools": "vegla", "mathematics": "matem", "math": "matem",
+                         "faculty": "fakul", "computer": "kompj"}
+# Words of the faculty's own name: they name no course, so they never make a match on their own
+_FACULTY_WORDS = {"fakul", "elekt", "inxhi", "kompj"}
+# Course words in more than this share of the courses do not tell the courses apart
+MAX_COURSE_WORD_SHARE = 0.5
+_TODAY_WORDS = {"sot": 0, "today": 0, "neser": 1, "tomorrow": 1}
+# Exams, deadlines, registration and credits look like schedule questions but aren't in the timetables
+_RAG_ONLY_PREFIXES = ("provim", "exam", "kolokv", "afat", "deadline", "regjistr", "registr",
+                      "ects", "kredi", "credit")
+
+
+def _tokens(text: str) -> List[str]:
+    tokens = _TOKEN_RE.findall(fold(text).replace("’", "'"))
+    return [t if re.search(r"\d", t) else t.rstrip("'\"") for t in tokens]
+
+
+def _is_room_name(line: str) -> bool:
+    """A room number (A411, 201) or a named lab (LabFiz, Lab TEL); a bare "LAB" is not a room."""
+    key = re.sub(r"[\W_]+", "", fold(line))
+    return bool(re.search(r"\d", key)) or (key.startswith("lab") and len(key) > len("lab"))
+
+
+def extract_room_list(text: str) -> List[str]:
+    """Rooms listed under the "SALLAT DHE LABORATORET" heading of AdditionalInfo.txt."""
+    rooms = []
+    in_list = False
+    for line in text.splitlines():
+        line = line.strip()
+        folded = fold(line)
+        if not in_list:
+            in_list = "sallat" in folded and "laborator" in folded
+            continue
+        if line.startswith("---"):
+            break
+        # Short lines are room names; longer ones are the list's introduction
+        if line and len(line) <= 20 and _is_room_name(line):
+            rooms.append(line)
+    return rooms
+
+
+def _contact_value(lines: List[str], i: int, label_len: int) -> str:
+    """Value after a "Label:" either on the same line or on the next one."""
+    rest = lines[i][label_len:].strip(" :\t-")
+    if rest:
+        return rest
+    return lines[i + 1].strip() if i + 1 < len(lines) else ""
+
+
+def extract_contacts(text: str) -> Dict[str, List[str]]:
+    """Candidate office, phone and email values found in a staff profile text, in page order."""
+    contact: Dict[str, List[str]] = {}
+    lines = [line.strip() for line in text.splitlines()]
+    for i, line in enumerate(lines):
+        folded = fold(line)
+        for field, labels in _CONTACT_FIELDS.items():
+            for label in labels:
+                if re.match(rf"{label}\b\s*[:\-]?", folded) and (":" in line or len(line) <= len(label) + 1):
+                    value = _contact_value(lines, i, len(label))
+                    if value and len(value) <= 80:
+                        contact.setdefault(field, []).append(value)
+                    break
+    emails = _EMAIL_RE.findall(text)
+    if emails:
+        contact["email"] = emails
+    return contact
+
+
+def staff_name(title: str, text: str) -> str:
+    """Person's name from the profile page title (or first content line)."""
+    name = title if title and title != "No title" else ""
+    if not name:
+        lines = [l.strip() for l in text.splitlines() if l.strip() and not l.startswith("[Source:")]
+        name = lines[0] if lines else ""
+    return _TITLE_SUFFIX_RE.sub("", name).strip()
+
+
+def name_tokens(name: str) -> List[str]:
+    """Folded name parts without academic titles ("Prof. Dr. Ana Kola" -> ["ana", "kola"])."""
+    return [t for t in re.findall(r"[^\W\d_]+", fold(name)) if t not in _TITLE_WORDS and len(t) > 1]
+
+
+class LookupIndex:
+    """Room list and staff contacts extracted from the ingested chunks."""
+
+    def __init__(self, rooms: Iterable[str] = (), staff: Iterable[Dict] = (),
+                 rooms_source: str = "AdditionalInfo.txt"):
+        self.rooms = list(rooms)
+        self.staff = list(staff)
+        self.rooms_source = rooms_source
+
+    @classmethod
+    def from_chunks(cls, texts, metadatas) -> "LookupIndex":
+        rooms, rooms_source = [], ""
+        profiles: Dict[str, Dict] = {}
+        for text, metadata in zip(texts, metadatas):
+            metadata = metadata or {}
+            if not rooms:
+                rooms = extract_room_list(text)
+                rooms_source = metadata.get("source", "")
+            if metadata.get("type") != "staff_profile":
+                continue
+            name = staff_name(metadata.get("title", ""), text)
+            if not name_tokens(name):
+                continue
+            # A profile may be split over several chunks
+            profile = profiles.setdefault(name, {"name": name, "source": metadata.get("source", "")})
+            for field, values in extract_contacts(text).items():
+                profile.setdefault(field, []).extend(v for v in values if v not in profile.get(field, []))
+
+        # Values many profiles share are the site footer's phone and email, not the person's
+        counts = Counter((field, value) for p in profiles.values() for field in _FIELDS for value in p.get(field, []))
+        staff = []
+        for profile in profiles.values():
+            for field in _FIELDS:
+                own = [v for v in profile.pop(field, []) if counts[(field, v)] < SHARED_VALUE_LIMIT]
+                if own:
+                    profile[field] = own[0]
+            if any(field in profile for field in _FIELDS):
+                staff.append(profile)
+        return cls(rooms, staff, rooms_source)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "LookupIndex":
+        """Build from every chunk currently stored in a Chroma vectorstore."""
+        data = vectorstore.get(include=["documents", "metadatas"])
+        return cls.from_chunks(data["documents"], data["metadatas"])
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"rooms": self.rooms, "rooms_source": self.rooms_source, "staff": self.staff},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "LookupIndex":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return cls(data["rooms"], data["staff"], data.get("rooms_source", ""))
+
+
+def load_lookup_index(persist_directory) -> Optional[LookupIndex]:
+    """Load the lookup index written by ingest.py, or None if there is none."""
+    path = os.path.join(persist_directory, LOOKUP_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    return LookupIndex.load(path)
+
+
+def merge_consecutive(entries: List[Dict]) -> List[Dict]:
+    """Join back-to-back slots of the same session (08:00-08:45 + 08:45-09:30 -> 08:00-09:30)."""
+    def key(entry):
+        return (entry["day"], entry["kind"], entry["group"], entry["course"], entry["room"], entry["lecturer"])
+
+    def minutes(value):
+        hours, mins = value.split(":")
+        return int(hours) * 60 + int(mins)
+
+    merged = []
+    for entry in sorted(entries, key=lambda e: (key(e), e["start"])):
+        last = merged[-1] if merged else None
+        if last and key(last) == key(entry) and 0 <= minutes(entry["start"]) - minutes(last["end"]) <= 15:
+            last["end"] = max(last["end"], entry["end"])
+        else:
+            merged.append(dict(entry))
+    return sorted(merged, key=lambda e: (DAYS.index(e["day"]), e["start"], e["kind"], e["group"]))
+
+
+class FastPathStats:
+    """Thread-safe hit/miss counters per intent."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.by_intent = Counter()
+        self.hit_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, intent: Optional[str], seconds: float):
+        with self._lock:
+            if intent:
+                self.hits += 1
+                self.by_intent[intent] += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            queries = self.hits + self.misses
+            return {
+                "queries": queries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / queries if queries else 0.0,
+                "avg_hit_ms": round(1000 * self.hit_seconds / self.hits, 3) if self.hits else 0.0,
+                "by_intent": dict(self.by_intent),
+            }
+
+
+class IntentRouter:
+    """
+    Answers lookup questions from the schedule and lookup indexes.
+    route(query) returns {"intent", "answer", "sources"} or None.
+    """
+
+    def __init__(self, schedule: Optional[ScheduleIndex] = None, lookup: Optional[LookupIndex] = None,
+                 kb_version: Optional[str] = None):
+        self.schedule = schedule or ScheduleIndex()
+        self.lookup = lookup or LookupIndex()
+        self.kb_version = kb_version
+        self._rooms = {normalize_room(room) for room in self.schedule.rooms()}
+        # "411" and "A411" are the same room written two ways in the timetable
+        self._room_aliases: Dict[str, List[str]] = {}
+        for room in self._rooms:
+            base = room[1:] if re.fullmatch(r"A\d+", room) else room
+            self._room_aliases.setdefault(base, []).append(room)
+        self._courses = {course: course_words(course) for course in self.schedule.courses()}
+        # Words that tell courses apart: not the faculty's name, nor words most courses share
+        word_sets = {frozenset(words) for words in self._courses.values()}
+        shared = Counter(word for words in word_sets for word in words)
+        generic = _FACULTY_WORDS | {w for w, n in shared.items() if n > MAX_COURSE_WORD_SHARE * len(word_sets)}
+        self._distinctive = {course: words - generic for course, words in self._courses.items()}
+        # group key -> spelling used in the timetable
+        self._groups = {group_key(g): g for e in self.schedule.entries for g in e["group"].split("+") if g}
+        self._staff = [(person, name_tokens(person["name"])) for person in self.lookup.staff]
+        self._sources = sorted({e["source"] for e in self.schedule.entries})
+
+    def route(self, query: str) -> Optional[Dict]:
+        tokens = _tokens(query)
+        if not tokens:
+            return None
+        words = set(tokens)
+        if any(t.startswith(_RAG_ONLY_PREFIXES) for t in tokens):
+            return None
+        english = len(words & _ENGLISH_WORDS) > len(words & _ALBANIAN_WORDS)
+        for intent in (self._staff_contact, self._room_schedule, self._course_schedule, self._room_list):
+            result = intent(query, tokens, words, english)
+            if result:
+                return result
+        return None
+
+    # -- intents ---------------------------------------------------------
+
+    def _room_list(self, query, tokens, words, english):
+        rooms = self.lookup.rooms
+        if not rooms or not words & _ROOM_WORDS or self._query_rooms(tokens):
+            return None
+        if not (words & _LIST_WORDS or words & _ALL_WORDS or {"cilat", "jane"} <= words):
+            return None
+        # Anything beyond "list/all rooms" ("which rooms have projectors") is for RAG
+        if words - _ROOM_WORDS - _LIST_WORDS - _ALL_WORDS - _LIST_FILLER_WORDS:
+            return None
+        heading = "FIEK rooms and labs:" if english else "Sallat dhe laboratorët e FIEK:"
+        return {
+            "intent": "room_list",
+            "answer": heading + "\n" + "\n".join(f"- {room}" for room in rooms),
+            "sources": [self.lookup.rooms_source],
+        }
+
+    def _room_schedule(self, query, tokens, words, english):
+        rooms = self._query_rooms(tokens)
+        day = self._query_day(tokens)
+        at = self._query_time(query)
+        if not rooms or not (day or words & _SCHEDULE_WORDS or (words & _WHEN_WORDS and at)):
+            return None
+        entries = [e for room in rooms for e in self.schedule.lookup(room=room, day=day, at=at)]
+        heading = f"Schedule for room {rooms[0]}" if english else f"Orari për sallën {rooms[0]}"
+        return self._schedule_answer("room_schedule", entries, heading, day, english)
+
+    def _course_schedule(self, query, tokens, words, english):
+        day = self._query_day(tokens)
+        groups = [t for t in tokens if group_key(t) in self._groups and re.search(r"\d", t)]
+        at = self._query_time(query)
+        if not (day or words & _SCHEDULE_WORDS or (words & _WHEN_WORDS and (at or groups))):
+            return None
+        courses = self._query_courses(tokens)
+        if not courses and not groups:
+            return None
+        if courses:
+            entries = [e for course in courses for e in self.schedule.lookup(course=course, day=day, at=at)]
+        else:
+            entries = self.schedule.lookup(day=day, at=at)
+        if groups:
+            wanted = {group_key(g) for g in groups}
+            entries = [e for e in entries if wanted & {group_key(g) for g in e["group"].split("+")}]
+        # Name the course as most sessions spell it
+        subject = [Counter(e["course"] for e in entries).most_common(1)[0][0]] if courses and entries else []
+        subject += [self._groups[group_key(g)] for g in groups]
+        heading = f"Schedule for {', '.join(subject)}" if english else f"Orari për {', '.join(subject)}"
+        return self._schedule_answer("course_schedule", entries, heading, day, english)
+
+    def _staff_contact(self, query, tokens, words, english):
+        if not self._staff or not words & _CONTACT_WORDS:
+            return None
+        matches = []
+        for person, parts in self._staff:
+            if len(parts) >= 2 and parts[-1] in words:
+                matches.append((sum(p in words for p in parts), person))
+        if not matches:
+            return None
+        best = max(score for score, _ in matches)
+        people = [person for score, person in matches if score == best]
+        if len(people) > 1:
+            # Same surname, and the query doesn't say which one
+            return None
+        person = people[0]
+        labels = ({"office": "Office", "email": "Email", "phone": "Phone"} if english
+                  else {"office": "Zyra", "email": "Email", "phone": "Telefoni"})
+        lines = [f"**{person['name']}**"] + [
+            f"- {labels[field]}: {person[field]}" for field in _FIELDS if person.get(field)
+        ]
+        return {"intent": "staff_contact", "answer": "\n".join(lines), "sources": [person["source"]]}
+
+    # -- helpers ---------------------------------------------------------
+
+    def _query_rooms(self, tokens) -> List[str]:
+        """Timetable rooms named in the query, with their alternate spellings."""
+        candidates = set(tokens) | {a + b for a, b in zip(tokens, tokens[1:])}  # "a 411", "lab fiz"
+        found = []
+        for candidate in candidates:
+            room = normalize_room(candidate)
+            base = room[1:] if re.fullmatch(r"A\d+", room) else room
+            if room in self._rooms or (base != room and base in self._room_aliases):
+                for alias in self._room_aliases.get(base, [room]):
+                    if alias not in found:
+                        found.append(alias)
+        return sorted(found, key=lambda r: (not r.startswith("A"), r))
+
+    def _query_courses(self, tokens) -> List[str]:
+        """
+        Courses whose distinctive words (by prefix) the query mostly covers;
+        of those, the ones sharing the most words with it.
+        """
+        query_words = {_ENGLISH_COURSE_WORDS.get(t, t[:5]) for t in tokens if len(t) >= 4}
+        overlaps = {}
+        for course, words in self._courses.items():
+            distinctive = self._distinctive[course]
+            hits = len(distinctive & query_words)
+            if hits and 2 * hits >= len(distinctive):
+                overlaps[course] = len(words & query_words)
+        best = max(overlaps.values(), default=0)
+        return [course for course, overlap in overlaps.items() if overlap == best]
+
+    @staticmethod
+    def _query_day(tokens) -> Optional[str]:
+        for i, token in enumerate(tokens):
+            if token in _TODAY_WORDS:
+                return DAYS[(time.localtime().tm_wday + _TODAY_WORDS[token]) % 7]
+            day = normalize_day(token)
+            if day is None and i + 1 < len(tokens) and token == "e":
+                day = normalize_day(f"e {tokens[i + 1]}")
+            if day:
+                return day
+        return None
+
+    @staticmethod
+    def _query_time(query) -> Optional[str]:
+        match = re.search(r"\b(\d{1,2})[:.](\d{2})\b", query)
+        if match:
+            return f"{match.group(1)}:{match.group(2)}"
+        match = re.search(r"\b(?:ora|at)\s+(\d{1,2})\b", query, re.IGNORECASE)
+        if match and int(match.group(1)) < 24:
+            return f"{match.group(1)}:00"
+        return None
+
+    def _schedule_answer(self, intent, entries, heading, day, english):
+        # Nothing found may just mean another timetable (e.g. a PDF) has it
+        if not entries:
+            return None
+        entries = merge_consecutive(entries)
+        if len(entries) > MAX_ANSWER_LINES:
+            return None
+        if day:
+            heading += f" ({ENGLISH_DAY_NAMES[day] if english else day})"
+        lines = [f"- {format_session(e, with_day=not day, english=english)}" for e in entries]
+        sources = sorted({e["source"] for e in entries})
+        return {"intent": intent, "answer": heading + ":\n" + "\n".join(lines), "sources": sources}
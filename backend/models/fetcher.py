@@ -0,0 +1,135 @@
+"""
+Concurrent HTTP fetch stage for web scraping.
+
+A bounded thread pool shares one requests.Session (and its connection
+pool). Each host gets a token-bucket rate limiter, and transient failures
+are retried with exponential backoff. Results come back in input order,
+so scraping stays deterministic. With an HttpCache, GETs are conditional
+and unchanged pages are served from disk (see models/http_cache.py).
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    from .http_cache import CachingAdapter
+except ImportError:
+    from http_cache import CachingAdapter
+
+# Status codes worth retrying: rate limiting and server-side hiccups
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Blocking token bucket: `rate` tokens per second, bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class ConcurrentFetcher:
+    """Rate-limited, retrying HTTP client with a bounded worker pool."""
+
+    def __init__(self, max_workers=8, rate_per_host=2.0, burst=2, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, timeout=15, headers=None, session=None,
+                 cache=None):
+        self.max_workers = max_workers
+        self.rate_per_host = rate_per_host
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.cache = cache
+
+        self.session = session or requests.Session()
+        if cache is not None:
+            adapter = CachingAdapter(cache, pool_connections=max_workers, pool_maxsize=max_workers)
+        else:
+            adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self._buckets = {}
+        self._warmed_hosts = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url):
+        return urlparse(url).netloc
+
+    def throttle(self, url):
+        """Block until the per-host rate limiter allows a request to `url`."""
+        host = self.host_of(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate_per_host, self.burst)
+        bucket.acquire()
+
+    def backoff(self, attempt):
+        """Sleep for the exponential backoff delay of a retry attempt (0-based)."""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def warm_up(self, url):
+        """Visit the site root once per host so the shared session holds its cookies."""
+        parsed = urlparse(url)
+        with self._lock:
+            if parsed.netloc in self._warmed_hosts:
+                return
+            self._warmed_hosts.add(parsed.netloc)
+        try:
+            self.throttle(url)
+            self.session.get(f"{parsed.scheme}://{parsed.netloc}/", timeout=self.timeout)
+        except requests.RequestException:
+            pass
+
+    def get(self, url, **kwargs):
+        """GET with rate limiting and retries; raises the last error on failure."""
+        kwargs.setdefault("timeout", self.timeout)
+        for attempt in range(self.max_retries + 1):
+            self.throttle(url)
+            try:
+                response = self.session.get(url, **kwargs)
+                if response.status_code in RETRY_STATUS_CODES and attempt < self.max_retries:
+                    self.backoff(attempt)
+                    continue
+                response.raise_for_status()
+                return response
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                self.backoff(attempt)
+
+    def map(self, fn, items):
+        """Run fn over items on the worker pool; results keep the input order."""
+        items = list(items)
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(items))) as executor:
+            return list(executor.map(fn, items))
@@ -0,0 +1,136 @@
+"""
+Text extraction for the local files in fiek_documents.
+
+extract_file() turns one PDF, text, DOCX or timetable file into Documents
+and runs in ingest's loader process pool, so it only depends on the file
+itself and returns its log lines instead of printing them (the parent
+prints them in file order). Scanned PDFs are only detected here; the
+parent OCRs them page by page on the same pool.
+
+A PDF needs OCR when too many of its pages have next to no text layer.
+Pages are checked as they are extracted and the check stops as soon as
+the outcome is certain, so a scanned PDF costs a few pages of parsing.
+"""
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_core.documents import Document
+
+try:
+    from .timetable import load_timetable
+except ImportError:
+    from timetable import load_timetable
+
+# A page with fewer characters than this has no usable text layer
+MIN_PAGE_CHARS = 50
+# OCR the PDF when more than this share of its pages have no text layer
+MAX_SPARSE_PAGE_RATIO = 0.5
+
+
+def _file_metadata(rel_path, doc_type=None):
+    metadata = {"source": rel_path, "file_path": rel_path}
+    if doc_type:
+        metadata["type"] = doc_type
+    return metadata
+
+
+def load_pdf(file_path, rel_path):
+    """
+    (pages, sparse_pages, total_pages). pages is None when the text-density
+    check decided the PDF needs OCR before all pages were read.
+    """
+    pages = []
+    sparse = 0
+    total = None
+    for page in PyPDFLoader(file_path).lazy_load():
+        total = total or page.metadata.get("total_pages")
+        if len(page.page_content.strip()) < MIN_PAGE_CHARS:
+            sparse += 1
+            if total and sparse > total * MAX_SPARSE_PAGE_RATIO:
+                return None, sparse, total
+        page.metadata["source"] = rel_path
+        page.metadata["file_path"] = rel_path
+        pages.append(page)
+    total = total or len(pages)
+    if total and sparse > total * MAX_SPARSE_PAGE_RATIO:
+        return None, sparse, total
+    return pages, sparse, total
+
+
+def extract_file(file_path, rel_path):
+    """
+    Extract one local file. Returns a dict with the file's "documents",
+    the "log" lines to print, whether the PDF "needs_ocr" and the timetable
+    "sessions" (None for other file types).
+    """
+    result = {"documents": [], "log": [], "needs_ocr": False, "sessions": None}
+    log = result["log"].append
+
+    # Handle PDF files
+    if file_path.endswith(".pdf"):
+        try:
+            pages, sparse, total = load_pdf(file_path, rel_path)
+            if pages is None:
+                log(f"⚠️ {sparse} of {total} pages in {rel_path} have no text layer. Switching to OCR...")
+                result["needs_ocr"] = True
+            else:
+                log(f"📄 Loaded Digital PDF: {rel_path}")
+                result["documents"] = pages
+        except Exception:
+            log(f"⚠️ Digital read failed for {rel_path}. Switching to OCR...")
+            result["needs_ocr"] = True
+
+    # Handle text files
+    elif file_path.endswith((".txt", ".text")):
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read().strip()
+
+            if len(content) > 10:
+                result["documents"] = [Document(page_content=content, metadata=_file_metadata(rel_path, "text_file"))]
+                log(f"📝 Loaded Text File: {rel_path} ({len(content)} chars)")
+            else:
+                log(f"⚠️ Text file {rel_path} is too short or empty, skipping")
+        except Exception as e:
+            log(f"⚠️ Failed to load text file {rel_path}: {e}")
+
+    # Handle DOCX files (optional - requires python-docx)
+    elif file_path.endswith((".docx", ".doc")):
+        try:
+            from docx import Document as DocxDocument
+        except ImportError:
+            log(f"⚠️ DOCX file {rel_path} found but python-docx not installed. Skipping.")
+            log(f"   💡 Install with: pip install python-docx")
+            return result
+        try:
+            docx_doc = DocxDocument(file_path)
+            content = "\n\n".join([para.text for para in docx_doc.paragraphs])
+
+            if len(content.strip()) > 10:
+                result["documents"] = [Document(page_content=content, metadata=_file_metadata(rel_path, "docx_file"))]
+                log(f"📄 Loaded DOCX File: {rel_path} ({len(content)} chars)")
+            else:
+                log(f"⚠️ DOCX file {rel_path} appears empty, skipping")
+        except Exception as e:
+            log(f"⚠️ Failed to load DOCX file {rel_path}: {e}")
+
+    # Handle timetable spreadsheets (requires openpyxl)
+    elif file_path.endswith(".xlsx"):
+        try:
+            rows, sessions = load_timetable(file_path, rel_path)
+            if rows:
+                result["documents"] = rows
+                result["sessions"] = sessions
+                log(f"📅 Loaded Timetable: {rel_path} ({len(rows)} rows, {len(sessions)} sessions)")
+            else:
+                log(f"⚠️ No timetable rows found in {rel_path}, skipping")
+        except ImportError:
+            log(f"⚠️ Spreadsheet {rel_path} found but openpyxl not installed. Skipping.")
+            log(f"   💡 Install with: pip install openpyxl")
+        except Exception as e:
+            log(f"⚠️ Failed to load spreadsheet {rel_path}: {e}")
+
+    return result
+
+
+def extract_file_task(task):
+    return extract_file(*task)
@@ -0,0 +1,142 @@
+"""
+Conditional HTTP cache for the scrapers.
+
+Response bodies are stored on disk together with their ETag and
+Last-Modified validators, one file per URL. CachingAdapter is a requests
+transport adapter: GETs of cached URLs are sent with If-None-Match /
+If-Modified-Since, and a 304 is turned into a normal 200 response built
+from the stored body (marked `response.from_cache`). Everything that
+shares the session, WebBaseLoader included, then reads an unchanged page
+without downloading it again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Response headers kept with the body
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified", "Content-Language")
+
+
+class HttpCache:
+    """Response bodies plus validators, one file per URL under `directory`."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, url):
+        return os.path.join(self.directory, hashlib.sha256(url.encode('utf-8')).hexdigest())
+
+    def get(self, url):
+        """(headers, body) stored for url, or None."""
+        try:
+            with open(self._path(url), 'rb') as f:
+                meta = json.loads(f.readline())
+                body = f.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get("url") != url or len(body) != meta.get("size"):
+            return None
+        return meta["headers"], body
+
+    def put(self, url, headers, body):
+        """Store a body if the response carries a validator to revalidate it with."""
+        if not (headers.get("ETag") or headers.get("Last-Modified")):
+            return False
+        if "no-store" in headers.get("Cache-Control", "").lower():
+            return False
+        meta = {
+            "url": url,
+            "headers": {name: headers[name] for name in STORED_HEADERS if name in headers},
+            "size": len(body),
+            "stored_at": time.time(),
+        }
+        path = self._path(url)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(json.dumps(meta).encode('utf-8') + b"\n")
+            f.write(body)
+        os.replace(tmp_path, path)
+        return True
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self):
+        entries = [name for name in os.listdir(self.directory) if not name.endswith(".tmp")]
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachingAdapter(HTTPAdapter):
+    """HTTPAdapter that revalidates GETs against an HttpCache."""
+
+    def __init__(self, cache, **kwargs):
+        self.cache = cache
+        super().__init__(**kwargs)
+
+    def send(self, request, stream=False, **kwargs):
+        if request.method != "GET" or stream:
+            return super().send(request, stream=stream, **kwargs)
+
+        cached = self.cache.get(request.url)
+        if cached is not None:
+            headers, _ = cached
+            if "ETag" in headers:
+                request.headers["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        response = super().send(request, stream=stream, **kwargs)
+        response.from_cache = False
+        if response.status_code == 304 and cached is not None:
+            self.cache.record(hit=True)
+            return self._cached_response(request, response, *cached)
+        if response.status_code == 200:
+            self.cache.record(hit=False)
+            self.cache.put(request.url, response.headers, response.content)
+        return response
+
+    def _cached_response(self, request, not_modified, headers, body):
+        """A 200 response carrying the stored body and the server's fresh headers."""
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(headers)
+        # A 304 may carry updated validators; store them so later requests send them
+        changed = False
+        for name in ("ETag", "Last-Modified"):
+            if name in not_modified.headers and not_modified.headers[name] != response.headers.get(name):
+                response.headers[name] = not_modified.headers[name]
+                changed = True
+        if changed:
+            self.cache.put(request.url, response.headers, body)
+        response._content = body
+        response._content_consumed = True
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        not_modified.close()
+        return response
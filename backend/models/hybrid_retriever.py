@@ -0,0 +1,168 @@
+"""
+Hybrid lexical + vector retrieval.
+
+Dense embeddings handle exact tokens such as room codes (A411, LabFiz),
+course codes and surnames poorly. A BM25 inverted index over the same
+chunks stored in fiek_db is built at ingest time, and its ranking is
+fused with Chroma's using reciprocal rank fusion (RRF).
+"""
+
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+BM25_INDEX_FILE = "bm25_index.json"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens; keeps letters with diacritics and digits (A411 -> a411)."""
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """In-memory Okapi BM25 over a fixed set of chunks."""
+
+    def __init__(self, ids, texts, metadatas, k1=1.5, b=0.75):
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = [m or {} for m in metadatas]
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[List[int]]] = {}
+        self.doc_lens: List[int] = []
+        for i, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            self.doc_lens.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append([i, tf])
+        self._prepare()
+
+    def _prepare(self):
+        n = len(self.texts)
+        self.avg_len = (sum(self.doc_lens) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def __len__(self):
+        return len(self.texts)
+
+    def search(self, query: str, k: int = 20):
+        """Return up to k (position, score) pairs, best first."""
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = self.idf[term]
+            for i, tf in docs:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lens[i] / (self.avg_len or 1))
+                scores[i] = scores.get(i, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    def document(self, position: int) -> Document:
+        return Document(
+            page_content=self.texts[position],
+            metadata=dict(self.metadatas[position]),
+        )
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self.ids,
+                "texts": self.texts,
+                "metadatas": self.metadatas,
+                "doc_lens": self.doc_lens,
+                "postings": self.postings,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "BM25Index":
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = cls.__new__(cls)
+        index.k1 = data["k1"]
+        index.b = data["b"]
+        index.ids = data["ids"]
+        index.texts = data["texts"]
+        index.metadatas = data["metadatas"]
+        index.doc_lens = data["doc_lens"]
+        index.postings = data["postings"]
+        index._prepare()
+        return index
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore) -> "BM25Index":
+        """Index every chunk currently stored in a Chroma vectorstore."""
+        data = vectorstore.get(include=["documents", "metadatas"])
+        return cls(data["ids"], data["documents"], data["metadatas"])
+
+
+def load_bm25_index(persist_directory) -> Optional[BM25Index]:
+    """Load the BM25 index written by ingest.py, or None if there is none."""
+    path = os.path.join(persist_directory, BM25_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    return BM25Index.load(path)
+
+
+def reciprocal_rank_fusion(rankings, k: int = 60):
+    """Fuse ranked lists of keys; returns keys ordered by sum(1 / (k + rank))."""
+    scores: Dict[Any, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda key: -scores[key])
+
+
+class HybridRetriever(BaseRetriever):
+    """Chroma similarity search fused with BM25 via reciprocal rank fusion."""
+
+    vectorstore: Any
+    bm25: Any
+    k: int = 5
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    def _fuse(self, query: str, vector_docs: List[Document]) -> List[Document]:
+        candidates: Dict[str, Document] = {}
+        vector_ranking = []
+        for doc in vector_docs:
+            candidates.setdefault(doc.page_content, doc)
+            vector_ranking.append(doc.page_content)
+        lexical_ranking = []
+        for position, _ in self.bm25.search(query, self.fetch_k):
+            text = self.bm25.texts[position]
+            candidates.setdefault(text, self.bm25.document(position))
+            lexical_ranking.append(text)
+        fused = reciprocal_rank_fusion([vector_ranking, lexical_ranking], k=self.rrf_k)
+        return [candidates[key] for key in fused[:self.k]]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector_docs = self.vectorstore.similarity_search(query, k=self.fetch_k)
+        return self._fuse(query, vector_docs)
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector_docs = await self.vectorstore.asimilarity_search(query, k=self.fetch_k)
+        return self._fuse(query, vector_docs)
@@ -0,0 +1,187 @@
+"""
+Batched, concurrent embedding writer for the vector database.
+
+Chunks are grouped into batches that fit a token budget, several batches
+are embedded and written at once, transient failures are retried with
+exponential backoff, and finished chunk ids are checkpointed to disk so
+an interrupted ingest resumes where it stopped. write_stream() takes chunks
+from an iterator with a bounded number of batches in flight, so it can
+sit at the end of the streaming ingest pipeline.
+
+Works with any vectorstore exposing `add_texts(texts, metadatas, ids)`
+(e.g. Chroma built with a fake embedding function for offline tests).
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+
+def estimate_tokens(text):
+    """Token count with tiktoken when available, otherwise ~4 chars per token."""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def batch_by_tokens(items, max_tokens, max_items=1000):
+    """
+    Group (id, document) pairs into lists whose estimated token total stays
+    within max_tokens (a single oversized chunk gets its own batch).
+    """
+    batch = []
+    batch_tokens = 0
+    for chunk_id, doc in items:
+        tokens = estimate_tokens(doc.page_content)
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch = []
+            batch_tokens = 0
+        batch.append((chunk_id, doc))
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+class EmbeddingWriter:
+    """Embeds and writes chunks in concurrent token-budgeted batches."""
+
+    def __init__(self, vectorstore, batch_tokens=20000, max_items=1000, max_workers=4,
+                 max_retries=5, backoff_base=1.0, backoff_max=60.0, checkpoint_path=None):
+        self.vectorstore = vectorstore
+        self.batch_tokens = batch_tokens
+        self.max_items = max_items
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.checkpoint_path = checkpoint_path
+        self._lock = threading.Lock()
+        self._done = set()
+
+    def _load_checkpoint(self):
+        """Ids written by earlier runs; one JSON list of ids per line."""
+        done = set()
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return done
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    done.update(json.loads(line))
+                except ValueError:
+                    # A torn last line from an interrupted write
+                    continue
+        return done
+
+    def _append_checkpoint(self, batch_ids):
+        """Record a finished batch (lock held)."""
+        if not self.checkpoint_path:
+            return
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.checkpoint_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(batch_ids) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def clear_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def _write_batch(self, batch):
+        texts = [doc.page_content for _, doc in batch]
+        metadatas = [doc.metadata for _, doc in batch]
+        ids = [chunk_id for chunk_id, _ in batch]
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.vectorstore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+                return ids
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                print(f"    ⚠️  Batch of {len(batch)} chunks failed ({str(e)[:100]}), "
+                      f"retrying in {delay:.1f}s...")
+                time.sleep(delay * random.uniform(0.5, 1.0))
+
+    def write(self, ids, docs):
+        """
+        Embed and store docs under ids, skipping ids already checkpointed.
+        Returns the number of chunks written in this call.
+        """
+        return self.write_stream(zip(ids, docs))
+
+    def _collect(self, futures, errors):
+        """Checkpoint finished batches; returns the number of chunks they wrote."""
+        written = 0
+        for future in futures:
+            try:
+                batch_ids = future.result()
+            except Exception as e:
+                # Keep checkpointing the batches that do succeed
+                errors.append(e)
+                continue
+            with self._lock:
+                self._done.update(batch_ids)
+                self._append_checkpoint(batch_ids)
+            written += len(batch_ids)
+        return written
+
+    def write_stream(self, items, max_pending=None):
+        """
+        Embed and store (id, document) pairs as they arrive from an iterable,
+        skipping ids already checkpointed. At most max_pending batches
+        (default 2 per worker) are in flight, so a slow embedding API holds
+        back the producer instead of buffering its chunks. Returns the number
+        of chunks written; the checkpoint is kept on failure and removed once
+        everything has been written.
+        """
+        self._done = self._load_checkpoint()
+        max_pending = max_pending or 2 * self.max_workers
+        skipped = 0
+
+        def pending():
+            nonlocal skipped
+            for chunk_id, doc in items:
+                if chunk_id in self._done:
+                    skipped += 1
+                    continue
+                yield chunk_id, doc
+
+        print(f"  🧮 Embedding chunks as they are split "
+              f"({self.max_workers} concurrent batches, ≤{self.batch_tokens} tokens each)")
+        written = 0
+        errors = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = set()
+            try:
+                for batch in batch_by_tokens(pending(), self.batch_tokens, self.max_items):
+                    if len(in_flight) >= max_pending:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        written += self._collect(done, errors)
+                        print(f"    ✅ {written} chunks written")
+                    in_flight.add(executor.submit(self._write_batch, batch))
+            finally:
+                # Also when the producer fails: batches already sent are in the
+                # store, so they must be checkpointed or a resume writes them twice
+                for future in as_completed(in_flight):
+                    written += self._collect([future], errors)
+                    print(f"    ✅ {written} chunks written")
+
+        if skipped:
+            print(f"  ♻️  Resumed: {skipped} chunks were already written by an earlier run")
+        if errors:
+            print(f"  ❌ {len(errors)} batches failed; re-run ingest to resume from the checkpoint")
+            raise errors[0]
+        self.clear_checkpoint()
+        return written
@@ -1,6 +1,8 @@
+import hashlib
+import itertools
 import os
 import shutil
-import time
+from collections import Counter
 from urllib.parse import urlparse, urljoin
 from dotenv import load_dotenv
 
@@ -8,13 +10,48 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import pytesseract
-from pdf2image import convert_from_path
-from langchain_community.document_loaders import PyPDFLoader, WebBaseLoader
+from langchain_community.document_loaders import WebBaseLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document 
 
+try:
+    from .kb_version import write_kb_version
+    from .ingest_manifest import (
+        file_sha256, text_sha256, assign_chunk_ids,
+        load_manifest, save_manifest, manifest_chunk_ids
+    )
+except ImportError:
+    from kb_version import write_kb_version
+    from ingest_manifest import (
+        file_sha256, text_sha256, assign_chunk_ids,
+        load_manifest, save_manifest, manifest_chunk_ids
+    )
+
+try:
+    from .fetcher import ConcurrentFetcher
+    from .http_cache import HttpCache
+    from .ocr import ocr_pdf, detect_ocr_languages, init_worker, OCR_DPI
+    from .ocr_cache import OcrCache
+    from .indexer import EmbeddingWriter
+    from .pipeline import BufferedStage, ordered_map, process_pool
+    from .file_loader import extract_file_task
+    from .hybrid_retriever import BM25Index, BM25_INDEX_FILE
+    from .timetable import ScheduleIndex, load_schedule_index, SCHEDULE_INDEX_FILE
+    from .fast_path import LookupIndex, LOOKUP_INDEX_FILE
+except ImportError:
+    from fetcher import ConcurrentFetcher
+    from http_cache import HttpCache
+    from ocr import ocr_pdf, detect_ocr_languages, init_worker, OCR_DPI
+    from ocr_cache import OcrCache
+    from indexer import EmbeddingWriter
+    from pipeline import BufferedStage, ordered_map, process_pool
+    from file_loader import extract_file_task
+    from hybrid_retriever import BM25Index, BM25_INDEX_FILE
+    from timetable import ScheduleIndex, load_schedule_index, SCHEDULE_INDEX_FILE
+    from fast_path import LookupIndex, LOOKUP_INDEX_FILE
+
 try:
     import requests
     from bs4 import BeautifulSoup
@@ -86,6 +123,44 @@ if not os.getenv("OPENAI_API_KEY"):
     raise ValueError("OPENAI_API_KEY not found. Please check your .env file.")
 
 FOLDER_PATH = "./fiek_documents/"
+DB_PATH = "./fiek_db"
+
+# Concurrent scraping: worker threads and polite request rate per host
+SCRAPE_MAX_WORKERS = int(os.getenv("SCRAPE_MAX_WORKERS", 8))
+SCRAPE_RATE_PER_HOST = float(os.getenv("SCRAPE_RATE_PER_HOST", 2.0))
+
+# Scraped pages with their ETag/Last-Modified, for conditional re-fetching
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "./http_cache")
+
+# Worker processes extracting local files and OCR'ing scanned PDF pages
+# (None = one per core, 1 = in-process)
+LOAD_MAX_WORKERS = int(os.getenv("LOAD_MAX_WORKERS", 0)) or None
+
+# Embedding stage: token budget per batch and batches embedded concurrently
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", 20000))
+EMBED_MAX_WORKERS = int(os.getenv("EMBED_MAX_WORKERS", 4))
+# Chunk ids already written by an interrupted run
+EMBED_CHECKPOINT_FILE = "embed_checkpoint.jsonl"
+
+# Streaming pipeline: loaded documents and split chunks waiting for the next
+# stage; a full queue makes the stage before it wait
+LOAD_QUEUE_SIZE = int(os.getenv("LOAD_QUEUE_SIZE", 16))
+CHUNK_QUEUE_SIZE = int(os.getenv("CHUNK_QUEUE_SIZE", 512))
+
+# Per-page OCR results survive between runs (size limit in MB)
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "./ocr_cache/ocr_cache.sqlite")
+OCR_CACHE_MAX_MB = int(os.getenv("OCR_CACHE_MAX_MB", 200))
+_ocr_cache = None
+
+def get_ocr_cache():
+    """Open the OCR cache on first use."""
+    global _ocr_cache
+    if _ocr_cache is None:
+        _ocr_cache = OcrCache(OCR_CACHE_PATH, max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024)
+    return _ocr_cache
+
+# Local file types handled by load_documents()
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".text", ".docx", ".doc", ".xlsx")
 
 # URLs that contain staff listings with profile links
 STAFF_PAGES = [
@@ -116,7 +191,7 @@ URLS = [
     "https://fiek.uni-pr.edu/page.aspx?id=1,82",  # Bashkëpunime me Institucione Publike
 ]
 
-def extract_staff_profile_links(html_content, base_url):
+def extract_staff_profile_links(html_content, base_url, verbose=True):
     """
     Extract staff profile links from staff listing pages.
     Handles multiple URL formats:
@@ -125,6 +200,7 @@ def extract_staff_profile_links(html_content, base_url):
     - Relative: staff.aspx?id=1,15,15 (Administrative Staff)
     Handles multiple HTML structures: col-xl-6 cards and border media cards.
     """
+    log = print if verbose else (lambda *args, **kwargs: None)
     profile_links = []
     try:
         soup = BeautifulSoup(html_content, 'html.parser')
@@ -143,7 +219,7 @@ def extract_staff_profile_links(html_content, base_url):
         # Combine both methods
         all_cards = staff_cards_col + staff_cards_media
         
-        print(f"    🔍 Found {len(staff_cards_col)} col-xl-6 cards and {len(staff_cards_media)} media cards")
+        log(f"    🔍 Found {len(staff_cards_col)} col-xl-6 cards and {len(staff_cards_media)} media cards")
         
         for card in all_cards:
             # Find all links in the card
@@ -181,11 +257,11 @@ def extract_staff_profile_links(html_content, base_url):
                     if full_url not in profile_links:
                         profile_links.append(full_url)
                         # Print the URL as requested
-                        print(f"      📌 Found profile: {full_url}")
+                        log(f"      📌 Found profile: {full_url}")
         
         # Method 3: Also try finding links directly (fallback)
         if len(profile_links) == 0:
-            print(f"    🔍 Trying direct link search...")
+            log(f"    🔍 Trying direct link search...")
             all_links = soup.find_all('a', href=True)
             for link in all_links:
                 href = link.get('href', '').strip()
@@ -213,7 +289,7 @@ def extract_staff_profile_links(html_content, base_url):
                 if is_profile_link and full_url:
                     if full_url not in profile_links:
                         profile_links.append(full_url)
-                        print(f"      📌 Found profile: {full_url}")
+                        log(f"      📌 Found profile: {full_url}")
         
         # Remove duplicates while preserving order
         seen = set()
@@ -223,17 +299,19 @@ def extract_staff_profile_links(html_content, base_url):
                 seen.add(link)
                 unique_links.append(link)
         
-        print(f"    ✅ Extracted {len(unique_links)} unique profile links")
+        log(f"    ✅ Extracted {len(unique_links)} unique profile links")
         return unique_links
     except Exception as e:
-        print(f"    ⚠️  Error extracting profile links: {e}")
+        log(f"    ⚠️  Error extracting profile links: {e}")
         import traceback
         traceback.print_exc()
         return []
 
-def extract_text_from_scanned_pdf(pdf_path):
+def extract_text_from_scanned_pdf(pdf_path, executor=None):
     """
     Converts PDF pages to images, then runs OCR to get text.
+    Pages are rasterized one at a time and OCR'd in parallel on `executor`,
+    the loader's process pool (in-process without one).
     Requires Tesseract OCR to be installed.
     """
     if not HAS_TESSERACT:
@@ -242,141 +320,49 @@ def extract_text_from_scanned_pdf(pdf_path):
     
     print(f"🔍 Running OCR on scanned doc: {pdf_path}...")
     try:
-        images = convert_from_path(pdf_path)
-        text = ""
-        for i, image in enumerate(images):
-            # Extract text from image
-            # Try English and Albanian languages
-            try:
-                page_text = pytesseract.image_to_string(image, lang='eng+sqi')
-            except Exception:
-                # Fallback to English only if Albanian language pack not available
-                try:
-                    page_text = pytesseract.image_to_string(image, lang='eng')
-                except Exception:
-                    page_text = pytesseract.image_to_string(image)
-            text += f"\n[Page {i+1}]\n{page_text}"
-        return text
+        # English and Albanian when the language packs are installed;
+        # pages already OCR'd for this file content come from the cache
+        return ocr_pdf(
+            pdf_path,
+            lang=detect_ocr_languages(),
+            dpi=OCR_DPI,
+            executor=executor,
+            cache=get_ocr_cache(),
+            file_hash=file_sha256(pdf_path)
+        )
     except Exception as e:
         print(f"OCR Failed for {pdf_path}: {e}")
         return ""
 
-def load_documents():
-    all_docs = []
-
-    # Load PDFs and text files if folder exists (recursively through subfolders)
-    if os.path.exists(FOLDER_PATH):
-        # Use os.walk to recursively process all subfolders
-        for root, dirs, files in os.walk(FOLDER_PATH):
-            for filename in files:
-                file_path = os.path.join(root, filename)
-                
-                # Get relative path from FOLDER_PATH for metadata
-                rel_path = os.path.relpath(file_path, FOLDER_PATH)
-                # Use forward slashes for consistency across platforms
-                rel_path_normalized = rel_path.replace("\\", "/")
-                
-                # Handle PDF files
-                if filename.endswith(".pdf"):
-                    try:
-                        loader = PyPDFLoader(file_path)
-                        pages = loader.load()
-                        
-                        if len(pages) > 0 and len(pages[0].page_content.strip()) < 10:
-                            raise ValueError("Empty text - likely scanned")
-                        
-                        # Add folder path to metadata
-                        for page in pages:
-                            page.metadata["source"] = rel_path_normalized
-                            page.metadata["file_path"] = rel_path_normalized
-                        
-                        print(f"📄 Loaded Digital PDF: {rel_path_normalized}")
-                        all_docs.extend(pages)
-                        
-                    except Exception:
-                        print(f"⚠️ Digital read failed for {rel_path_normalized}. Switching to OCR...")
-                        raw_text = extract_text_from_scanned_pdf(file_path)
-                        if raw_text:
-                            doc = Document(
-                                page_content=raw_text, 
-                                metadata={
-                                    "source": rel_path_normalized,
-                                    "file_path": rel_path_normalized,
-                                    "type": "scanned_pdf"
-                                }
-                            )
-                            all_docs.append(doc)
-                
-                # Handle text files
-                elif filename.endswith((".txt", ".text")):
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read().strip()
-                        
-                        if len(content) > 10:
-                            doc = Document(
-                                page_content=content,
-                                metadata={
-                                    "source": rel_path_normalized,
-                                    "file_path": rel_path_normalized,
-                                    "type": "text_file"
-                                }
-                            )
-                            all_docs.append(doc)
-                            print(f"📝 Loaded Text File: {rel_path_normalized} ({len(content)} chars)")
-                        else:
-                            print(f"⚠️ Text file {rel_path_normalized} is too short or empty, skipping")
-                    except Exception as e:
-                        print(f"⚠️ Failed to load text file {rel_path_normalized}: {e}")
-                
-                # Handle DOCX files (optional - requires python-docx)
-                elif filename.endswith((".docx", ".doc")):
-                    try:
-                        try:
-                            from docx import Document as DocxDocument
-                            docx_doc = DocxDocument(file_path)
-                            content = "\n\n".join([para.text for para in docx_doc.paragraphs])
-                            
-                            if len(content.strip()) > 10:
-                                doc = Document(
-                                    page_content=content,
-                                    metadata={
-                                        "source": rel_path_normalized,
-                                        "file_path": rel_path_normalized,
-                                        "type": "docx_file"
-                                    }
-                                )
-                                all_docs.append(doc)
-                                print(f"📄 Loaded DOCX File: {rel_path_normalized} ({len(content)} chars)")
-                            else:
-                                print(f"⚠️ DOCX file {rel_path_normalized} appears empty, skipping")
-                        except ImportError:
-                            print(f"⚠️ DOCX file {rel_path_normalized} found but python-docx not installed. Skipping.")
-                            print(f"   💡 Install with: pip install python-docx")
-                    except Exception as e:
-                        print(f"⚠️ Failed to load DOCX file {rel_path_normalized}: {e}")
-    else:
-        print(f"⚠️ Folder '{FOLDER_PATH}' does not exist. Skipping file loading. Creating folder for future use...")
-        os.makedirs(FOLDER_PATH, exist_ok=True)
+# Browser-like headers for the requests fallback (Referer is set per host)
+REQUEST_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.9,sq;q=0.8",
+    "Accept-Encoding": "gzip, deflate, br",
+    "Connection": "keep-alive",
+    "Upgrade-Insecure-Requests": "1",
+    "Sec-Fetch-Dest": "document",
+    "Sec-Fetch-Mode": "navigate",
+    "Sec-Fetch-Site": "same-origin",
+    "Sec-Fetch-User": "?1",
+    "Cache-Control": "max-age=0",
+}
 
-    print("🌐 Scraping URLs...")
-    print("   Note: Website is protected by Cloudflare (bot protection).")
-    
-    # Try to import browser-based scraping
-    HAS_BROWSER_SCRAPING = False
+def detect_browser_scraper():
+    """Return scrape_with_browser if browser-based scraping is importable, else None."""
+    scrape_with_browser = None
     try:
         from .scrape_with_browser import scrape_with_browser
-        HAS_BROWSER_SCRAPING = True
     except ImportError:
         try:
             from scrape_with_browser import scrape_with_browser
-            HAS_BROWSER_SCRAPING = True
         except ImportError:
-            HAS_BROWSER_SCRAPING = False
+            scrape_with_browser = None
     
     # Check if Playwright is actually available (not just the module)
     PLAYWRIGHT_AVAILABLE = False
-    if HAS_BROWSER_SCRAPING:
+    if scrape_with_browser:
         try:
             from playwright.sync_api import sync_playwright
             # Try to actually use it to see if browser is installed
@@ -398,348 +384,338 @@ def load_documents():
         print("   📖 See backend/INSTALL_PLAYWRIGHT.md for detailed instructions")
         print("")
     
-    web_docs_count = 0
+    return scrape_with_browser
+
+def scrape_page(url, fetcher, browser_scraper=None, want_html=False):
+    """
+    Scrape a single page: browser-based scraping first (for Cloudflare), then
+    WebBaseLoader, then requests through the shared fetcher.
+    Returns (docs, html); html is only set when want_html is True and the
+    raw page was available, so staff profile links can be extracted.
+
+    The browser fetches pages itself, outside the fetcher's HTTP cache; in
+    incremental runs unchanged URLs are skipped before getting here.
+    """
+    # Try browser-based scraping first (if available) - handles Cloudflare
+    if browser_scraper:
+        try:
+            print(f"    🌐 Trying browser-based scraping (Playwright/Selenium): {url}")
+            browser_result = browser_scraper(url, return_html=want_html)
+            # Handle both single Document and tuple (Document, html_content)
+            if isinstance(browser_result, tuple):
+                browser_doc, browser_html = browser_result
+            else:
+                browser_doc, browser_html = browser_result, None
+            
+            # Check if we got real content (not Cloudflare challenge)
+            if browser_doc and len(browser_doc.page_content.strip()) > 200:
+                print(f"    ✅ Browser scraping succeeded! ({len(browser_doc.page_content.strip())} chars)")
+                if not want_html or browser_html:
+                    return [browser_doc], browser_html
+                # No HTML available from browser, need to fall back to requests
+                print(f"    ℹ️  Browser scraping succeeded but HTML not available, trying requests for link extraction...")
+            elif browser_doc:
+                content_preview = browser_doc.page_content[:100] if browser_doc.page_content else ""
+                print(f"    ⚠️  Browser scraping returned short content ({len(browser_doc.page_content) if browser_doc.page_content else 0} chars)")
+                if "Just a moment" in content_preview:
+                    print(f"    ⚠️  Still hitting Cloudflare challenge page")
+        except Exception as e:
+            print(f"    ⚠️  Browser scraping failed: {e}")
     
-    def scrape_with_fallback(url, extract_profile_links=False):
-        """
-        Try browser-based scraping first (for Cloudflare), then WebBaseLoader.
-        If extract_profile_links=True, also extracts and scrapes staff profile links.
-        """
-        # Check if we got Cloudflare challenge page
-        is_cloudflare_challenge = False
-        html_content_for_links = None
-        
-        # Try browser-based scraping first (if available) - handles Cloudflare
-        if HAS_BROWSER_SCRAPING:
-            try:
-                print(f"    🌐 Trying browser-based scraping (Playwright/Selenium)...")
-                browser_result = scrape_with_browser(url, return_html=extract_profile_links)
-                if browser_result:
-                    # Handle both single Document and tuple (Document, html_content)
-                    if isinstance(browser_result, tuple):
-                        browser_doc, browser_html = browser_result
-                    else:
-                        browser_doc = browser_result
-                        browser_html = None
-                    
-                    # Check if we got real content (not Cloudflare challenge)
-                    if browser_doc and len(browser_doc.page_content.strip()) > 200:
-                        content_len = len(browser_doc.page_content.strip())
-                        print(f"    ✅ Browser scraping succeeded! ({content_len} chars)")
-                    else:
-                        if browser_doc:
-                            content_preview = browser_doc.page_content[:100] if browser_doc.page_content else ""
-                            print(f"    ⚠️  Browser scraping returned short content ({len(browser_doc.page_content) if browser_doc.page_content else 0} chars)")
-                            if "Just a moment" in content_preview:
-                                print(f"    ⚠️  Still hitting Cloudflare challenge page")
-                        browser_doc = None
-                        browser_html = None
-                    
-                    # If we need to extract profile links and got HTML, extract and scrape them now
-                    if extract_profile_links and browser_html:
-                        html_content_for_links = browser_html
-                        # Extract and scrape profile links using browser HTML
-                        docs = [browser_doc]
-                        profile_links = extract_staff_profile_links(html_content_for_links, url)
-                        if profile_links:
-                            print(f"    📋 Scraping {len(profile_links)} staff profile links (no limit)...")
-                            scraped_count = 0
-                            failed_count = 0
-                            for i, profile_url in enumerate(profile_links, 1):
-                                try:
-                                    print(f"      [{i}/{len(profile_links)}] Scraping: {profile_url}")
-                                    profile_docs = scrape_with_fallback(profile_url, extract_profile_links=False)
-                                    if profile_docs and len(profile_docs) > 0:
-                                        for pdoc in profile_docs:
-                                            pdoc.metadata["type"] = "staff_profile"
-                                            pdoc.metadata["parent_page"] = url
-                                        docs.extend(profile_docs)
-                                        scraped_count += len(profile_docs)
-                                        print(f"        ✅ Successfully scraped profile")
-                                        time.sleep(0.3)
-                                    else:
-                                        print(f"        ⚠️  Failed to scrape profile (no content)")
-                                        failed_count += 1
-                                except Exception as e:
-                                    print(f"        ❌ Error scraping profile: {str(e)[:100]}")
-                                    failed_count += 1
-                                    continue
-                            
-                            print(f"    📊 Profile scraping summary:")
-                            print(f"       ✅ Successfully scraped: {scraped_count} profiles")
-                            if failed_count > 0:
-                                print(f"       ❌ Failed: {failed_count} profiles")
-                        return docs
-                    elif extract_profile_links:
-                        # No HTML available from browser, need to fall back to requests
-                        print(f"    ℹ️  Browser scraping succeeded but HTML not available, trying requests for link extraction...")
-                        html_content_for_links = None  # Will try requests method
-                    else:
-                        # No need for HTML, just return the document
-                        return [browser_doc]
-            except Exception as e:
-                print(f"    ⚠️  Browser scraping failed: {e}")
-                browser_doc = None
-                browser_html = None
-                html_content_for_links = None
-        
-        # Fallback to WebBaseLoader
-        web_docs_from_loader = None
+    # Fallback to WebBaseLoader (sharing the fetcher's session and rate limit)
+    web_docs_from_loader = None
+    try:
+        fetcher.throttle(url)
+        web_loader = WebBaseLoader(
+            web_paths=[url],
+            header_template={"User-Agent": REQUEST_HEADERS["User-Agent"]},
+            session=fetcher.session
+        )
+        web_docs_from_loader = web_loader.load()
+        if web_docs_from_loader and len(web_docs_from_loader) > 0:
+            content = web_docs_from_loader[0].page_content.strip()
+            
+            # Check if it's Cloudflare challenge page
+            is_cloudflare_challenge = "Just a moment" in content or "Enable JavaScript" in content
+            if is_cloudflare_challenge:
+                print(f"    ⚠️  Cloudflare challenge page detected: {url}")
+                print(f"    💡 Install Playwright for better scraping: pip install playwright && playwright install chromium")
+            
+            # Clean up WebBaseLoader content
+            lines = [line.strip() for line in content.split('\n') if line.strip() and len(line.strip()) > 3]
+            cleaned_content = '\n'.join(lines)
+            
+            if is_cloudflare_challenge:
+                print(f"    ❌ Cannot scrape: Cloudflare protection blocks automated access")
+                return None, None
+            
+            # Update the document with cleaned content
+            web_docs_from_loader[0].page_content = cleaned_content
+            if len(cleaned_content) <= 200:
+                print(f"    ⚠️  WebBaseLoader got short content ({len(cleaned_content)} chars)")
+            elif not want_html:
+                return web_docs_from_loader, None
+            # Staff listings still need the raw HTML from requests for profile links
+    except Exception as e:
+        print(f"    ⚠️  WebBaseLoader failed: {e}")
+    
+    # Try requests with the shared session to handle cookies/redirects (might help with 403)
+    if HAS_FALLBACK:
         try:
-            web_loader = WebBaseLoader(
-                web_paths=[url],
-                header_template={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"}
-            )
-            web_docs_from_loader = web_loader.load()
-            if web_docs_from_loader and len(web_docs_from_loader) > 0:
-                content = web_docs_from_loader[0].page_content.strip()
-                
-                # Check if it's Cloudflare challenge page
-                if "Just a moment" in content or "Enable JavaScript" in content:
-                    is_cloudflare_challenge = True
-                    print(f"    ⚠️  Cloudflare challenge page detected!")
-                    print(f"    💡 Install Playwright for better scraping: pip install playwright && playwright install chromium")
-                
-                # Clean up WebBaseLoader content
-                lines = [line.strip() for line in content.split('\n') if line.strip() and len(line.strip()) > 3]
-                cleaned_content = '\n'.join(lines)
-                
-                if len(cleaned_content) > 200 and not is_cloudflare_challenge:
-                    # Update the document with cleaned content
-                    web_docs_from_loader[0].page_content = cleaned_content
-                    return web_docs_from_loader
-                else:
-                    if is_cloudflare_challenge:
-                        print(f"    ❌ Cannot scrape: Cloudflare protection blocks automated access")
-                        return None
-                    else:
-                        print(f"    ⚠️  WebBaseLoader got short content ({len(cleaned_content)} chars)")
-                        web_docs_from_loader[0].page_content = cleaned_content
+            # First visit of a host picks up its cookies
+            fetcher.warm_up(url)
+            
+            parsed = urlparse(url)
+            headers = dict(REQUEST_HEADERS, Referer=f"{parsed.scheme}://{parsed.netloc}/")
+            response = fetcher.get(url, headers=headers, allow_redirects=True)
+            
+            # Handle encoding properly
+            if not response.encoding or response.encoding == 'ISO-8859-1':
+                response.encoding = response.apparent_encoding or 'utf-8'
+            
+            html_content = response.text  # Save for profile link extraction
+            soup = BeautifulSoup(html_content, 'html.parser')
+            
+            # Remove unwanted elements
+            for element in soup(["script", "style", "nav", "footer", "header", "iframe", "noscript"]):
+                element.decompose()
+            
+            # Try to find main content area (common patterns)
+            main_content = None
+            content_selectors = [
+                soup.find('main'),
+                soup.find('article'),
+                soup.find(id='content'),
+                soup.find(class_='content'),
+                soup.find(id='main-content'),
+                soup.find(class_='main-content'),
+                soup.find('div', {'id': 'ctl00_ContentPlaceHolder1'}),  # ASP.NET pattern
+            ]
+            
+            for selector in content_selectors:
+                if selector:
+                    main_content = selector
+                    break
+            
+            # Extract text from main content or whole page
+            if main_content:
+                text = main_content.get_text(separator='\n', strip=True)
+            else:
+                text = soup.get_text(separator='\n', strip=True)
+            
+            # Clean up text - remove excessive whitespace
+            lines = [line.strip() for line in text.split('\n') if line.strip() and len(line.strip()) > 3]
+            cleaned_text = '\n'.join(lines)
+            
+            # Get title
+            title = "No title"
+            if soup.title:
+                title = soup.title.string.strip() if soup.title.string else "No title"
+            elif main_content:
+                h1 = main_content.find('h1')
+                if h1:
+                    title = h1.get_text(strip=True)
+            
+            if len(cleaned_text.strip()) > 200:  # Require at least 200 chars
+                docs = [Document(
+                    page_content=cleaned_text,
+                    metadata={
+                        "source": url,
+                        "type": "website",
+                        "url": url,
+                        "title": title
+                    }
+                )]
+                return docs, html_content if want_html else None
+            else:
+                print(f"    ⚠️  Requests content too short ({len(cleaned_text)} chars)")
         except Exception as e:
-            print(f"    ⚠️  WebBaseLoader failed: {e}")
-        
-        # Try requests with session to handle cookies/redirects (might help with 403)
-        if HAS_FALLBACK:
-            try:
-                session = requests.Session()
-                # First visit main page to get cookies
-                session.get("https://fiek.uni-pr.edu/", timeout=10)
-                
-                # More complete headers to avoid 403
-                headers = {
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.9,sq;q=0.8",
-                    "Accept-Encoding": "gzip, deflate, br",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                    "Sec-Fetch-Dest": "document",
-                    "Sec-Fetch-Mode": "navigate",
-                    "Sec-Fetch-Site": "same-origin",
-                    "Sec-Fetch-User": "?1",
-                    "Cache-Control": "max-age=0",
-                    "Referer": "https://fiek.uni-pr.edu/",
-                }
-                response = session.get(url, headers=headers, timeout=15, allow_redirects=True)
-                response.raise_for_status()
-                
-                # Handle encoding properly
-                if not response.encoding or response.encoding == 'ISO-8859-1':
-                    response.encoding = response.apparent_encoding or 'utf-8'
-                
-                html_content_for_links = response.text  # Save for profile link extraction
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # Remove unwanted elements
-                for element in soup(["script", "style", "nav", "footer", "header", "iframe", "noscript"]):
-                    element.decompose()
-                
-                # Try to find main content area (common patterns)
-                main_content = None
-                content_selectors = [
-                    soup.find('main'),
-                    soup.find('article'),
-                    soup.find(id='content'),
-                    soup.find(class_='content'),
-                    soup.find(id='main-content'),
-                    soup.find(class_='main-content'),
-                    soup.find('div', {'id': 'ctl00_ContentPlaceHolder1'}),  # ASP.NET pattern
-                ]
-                
-                for selector in content_selectors:
-                    if selector:
-                        main_content = selector
-                        break
-                
-                # Extract text from main content or whole page
-                if main_content:
-                    text = main_content.get_text(separator='\n', strip=True)
-                else:
-                    text = soup.get_text(separator='\n', strip=True)
-                
-                # Clean up text - remove excessive whitespace
-                lines = [line.strip() for line in text.split('\n') if line.strip() and len(line.strip()) > 3]
-                cleaned_text = '\n'.join(lines)
-                
-                # Get title
-                title = "No title"
-                if soup.title:
-                    title = soup.title.string.strip() if soup.title.string else "No title"
-                elif main_content:
-                    h1 = main_content.find('h1')
-                    if h1:
-                        title = h1.get_text(strip=True)
-                
-                if len(cleaned_text.strip()) > 200:  # Require at least 200 chars
-                    docs = [Document(
-                        page_content=cleaned_text,
-                        metadata={
-                            "source": url,
-                            "type": "website",
-                            "url": url,
-                            "title": title
-                        }
-                    )]
-                    
-                    # If this is a staff page, extract and scrape profile links
-                    if extract_profile_links and html_content_for_links:
-                        profile_links = extract_staff_profile_links(html_content_for_links, url)
-                        if profile_links:
-                            print(f"    📋 Scraping {len(profile_links)} staff profile links (no limit)...")
-                            scraped_count = 0
-                            failed_count = 0
-                            for i, profile_url in enumerate(profile_links, 1):  # No limit - scrape all profiles
-                                try:
-                                    print(f"      [{i}/{len(profile_links)}] Scraping: {profile_url}")
-                                    # Recursively scrape the profile page (but don't extract more links)
-                                    profile_docs = scrape_with_fallback(profile_url, extract_profile_links=False)
-                                    if profile_docs and len(profile_docs) > 0:
-                                        # Update metadata to indicate it's a profile
-                                        for pdoc in profile_docs:
-                                            pdoc.metadata["type"] = "staff_profile"
-                                            pdoc.metadata["parent_page"] = url
-                                        docs.extend(profile_docs)
-                                        scraped_count += len(profile_docs)
-                                        print(f"        ✅ Successfully scraped profile")
-                                        time.sleep(0.3)  # Be polite
-                                    else:
-                                        print(f"        ⚠️  Failed to scrape profile (no content)")
-                                        failed_count += 1
-                                except Exception as e:
-                                    print(f"        ❌ Error scraping profile: {str(e)[:100]}")
-                                    failed_count += 1
-                                    continue
-                            
-                            print(f"    📊 Profile scraping summary:")
-                            print(f"       ✅ Successfully scraped: {scraped_count} profiles")
-                            if failed_count > 0:
-                                print(f"       ❌ Failed: {failed_count} profiles")
-                    
-                    return docs
-                else:
-                    print(f"    ⚠️  Requests content too short ({len(cleaned_text)} chars)")
-            except Exception as e:
-                print(f"    ⚠️  Requests method failed: {e}")
-        
-        # If we got something from WebBaseLoader (even if short), use it
-        if web_docs_from_loader:
-            print(f"    ℹ️  Using WebBaseLoader result (may be limited)")
-            return web_docs_from_loader
-        
+            print(f"    ⚠️  Requests method failed for {url}: {e}")
+    
+    # If we got something from WebBaseLoader (even if short), use it
+    if web_docs_from_loader:
+        print(f"    ℹ️  Using WebBaseLoader result (may be limited)")
+        return web_docs_from_loader, None
+    
+    return None, None
+
+def scrape_with_retries(url, fetcher, browser_scraper=None, want_html=False, max_retries=2):
+    """scrape_page() with exponential backoff between attempts; returns (docs, html, error)."""
+    last_error = None
+    for attempt in range(max_retries):
+        if attempt > 0:
+            print(f"    🔄 Retry attempt {attempt + 1}/{max_retries} for {url}...")
+            fetcher.backoff(attempt)
+        try:
+            docs, html = scrape_page(url, fetcher, browser_scraper, want_html=want_html)
+            if docs:
+                return docs, html, None
+            last_error = "No content extracted"
+        except Exception as e:
+            last_error = str(e)
+            print(f"    ⚠️  Attempt {attempt + 1} failed for {url}: {last_error[:100]}")
+    return None, None, last_error
+
+def web_source_hash(url, fetcher, is_staff_page=False):
+    """
+    Hash of the raw bodies behind a web source: the page and, for staff
+    listings, every profile it links to. Fetched through the fetcher's HTTP
+    cache, so an unchanged URL costs a 304. None if any fetch fails.
+    """
+    def fetch(page_url):
+        fetcher.warm_up(page_url)
+        parsed = urlparse(page_url)
+        headers = dict(REQUEST_HEADERS, Referer=f"{parsed.scheme}://{parsed.netloc}/")
+        response = fetcher.get(page_url, headers=headers, allow_redirects=True)
+        return response, hashlib.sha256(response.content).hexdigest()
+    
+    try:
+        response, digest = fetch(url)
+        parts = [f"{url} {digest}"]
+        if is_staff_page:
+            if not response.encoding or response.encoding == 'ISO-8859-1':
+                response.encoding = response.apparent_encoding or 'utf-8'
+            for profile_url in extract_staff_profile_links(response.text, url, verbose=False):
+                parts.append(f"{profile_url} {fetch(profile_url)[1]}")
+        return text_sha256("\n".join(parts))
+    except Exception:
         return None
+
+def load_web_documents(urls=None, staff_pages=None, fetcher=None, is_unchanged=None):
+    """
+    Scrape `urls` concurrently and return their Documents in `urls` order.
+    
+    Staff listing pages are scraped first; their profile links are then
+    fetched as a second concurrent stage and placed right after the
+    listing page they came from. All requests share one fetcher, i.e. one
+    connection pool, one per-host rate limiter and one HTTP cache.
+    
+    If is_unchanged(url, source_hash) is given, every URL is first
+    revalidated (see web_source_hash) and sources it reports as unchanged
+    are not scraped at all.
+    """
+    urls = URLS if urls is None else urls
+    staff_pages = STAFF_PAGES if staff_pages is None else staff_pages
+    if fetcher is None:
+        fetcher = ConcurrentFetcher(
+            max_workers=SCRAPE_MAX_WORKERS,
+            rate_per_host=SCRAPE_RATE_PER_HOST,
+            headers={"User-Agent": REQUEST_HEADERS["User-Agent"]},
+            cache=HttpCache(HTTP_CACHE_PATH)
+        )
+    
+    # Stage 0: conditional requests tell which sources changed since the last ingest
+    if is_unchanged:
+        print(f"🔁 Revalidating {len(urls)} URLs against the HTTP cache...")
+        source_hashes = fetcher.map(lambda url: web_source_hash(url, fetcher, url in staff_pages), urls)
+        changed_urls = []
+        for url, source_hash in zip(urls, source_hashes):
+            if source_hash and is_unchanged(url, source_hash):
+                print(f"⏭️  Unchanged, skipping: {url}")
+            else:
+                changed_urls.append(url)
+        urls = changed_urls
+    
+    print("🌐 Scraping URLs...")
+    print("   Note: Website is protected by Cloudflare (bot protection).")
+    browser_scraper = detect_browser_scraper()
+    print(f"   ⚡ Fetching {len(urls)} URLs with {fetcher.max_workers} workers ({fetcher.rate_per_host} req/s per host)")
+    
+    # Stage 1: listing and content pages
+    def fetch_page(url):
+        return scrape_with_retries(url, fetcher, browser_scraper, want_html=url in staff_pages)
+    
+    page_results = fetcher.map(fetch_page, urls)
+    
+    # Stage 2: staff profiles linked from the listing pages, each fetched once
+    profile_links = {}
+    for url, (docs, html, _) in zip(urls, page_results):
+        if docs and html and url in staff_pages:
+            print(f"\n  📋 Extracting staff profile links from {url}")
+            profile_links[url] = extract_staff_profile_links(html, url)
+    unique_profiles = list(dict.fromkeys(link for links in profile_links.values() for link in links))
+    
+    def fetch_profile(profile_url):
+        try:
+            docs, _ = scrape_page(profile_url, fetcher, browser_scraper)
+            return docs
+        except Exception as e:
+            print(f"        ❌ Error scraping profile {profile_url}: {str(e)[:100]}")
+            return None
+    
+    if unique_profiles:
+        print(f"\n  📋 Scraping {len(unique_profiles)} staff profile links (no limit)...")
+    profile_results = dict(zip(unique_profiles, fetcher.map(fetch_profile, unique_profiles)))
+    
+    all_docs = []
+    web_docs_count = 0
     
     # Track statistics for better reporting
     successful_urls = 0
     failed_urls = 0
     failed_url_list = []
     
-    for url in URLS:
-        try:
-            print(f"\n  📡 Loading: {url}")
-            # Check if this is a staff page that needs profile link extraction
-            is_staff_page = url in STAFF_PAGES
-            if is_staff_page:
-                print(f"    ℹ️  Staff page detected - will extract and scrape profile links")
-            
-            # Retry logic for failed scrapes (more robust)
-            max_retries = 2
-            web_docs = None
-            last_error = None
-            
-            for attempt in range(max_retries):
-                try:
-                    if attempt > 0:
-                        print(f"    🔄 Retry attempt {attempt + 1}/{max_retries}...")
-                        time.sleep(2)  # Wait longer before retry
-                    
-                    web_docs = scrape_with_fallback(url, extract_profile_links=is_staff_page)
-                    
-                    if web_docs and len(web_docs) > 0:
-                        break  # Success, exit retry loop
-                    else:
-                        last_error = "No content extracted"
-                        
-                except Exception as e:
-                    last_error = str(e)
-                    if attempt < max_retries - 1:
-                        print(f"    ⚠️  Attempt {attempt + 1} failed: {last_error[:100]}")
-                        continue
-                    else:
-                        # On final attempt, don't suppress the error
-                        raise
-            
-            if web_docs and len(web_docs) > 0:
-                for doc in web_docs:
-                    # Ensure metadata is properly set for website documents
-                    # Create new metadata dict to ensure all fields are set
-                    doc.metadata = doc.metadata.copy() if doc.metadata else {}
-                    doc.metadata["source"] = url
-                    # Don't override type if it's already set (e.g., staff_profile, text_file)
-                    if doc.metadata.get("type") not in ["staff_profile", "scanned_pdf", "text_file"]:
-                        doc.metadata["type"] = "website"
-                    doc.metadata["url"] = url
-                    # Add title if available
-                    if "title" not in doc.metadata or doc.metadata.get("title") == "No title":
-                        # Try to extract title from content if not set
-                        title = doc.metadata.get("title", "No title")
-                        doc.metadata["title"] = title
-                    
-                    # Ensure source URL is in content for better context (but don't duplicate)
-                    if not doc.page_content.startswith(f"[Source: {url}]"):
-                        doc.page_content = f"[Source: {url}]\n\n{doc.page_content}"
-                
-                all_docs.extend(web_docs)
-                web_docs_count += len(web_docs)
-                total_chars = sum(len(d.page_content) for d in web_docs)
-                successful_urls += 1
-                print(f"  ✅ Successfully loaded {len(web_docs)} document(s) from {url} (content length: {total_chars} chars)")
+    for url, (web_docs, _, last_error) in zip(urls, page_results):
+        if url in profile_links and web_docs:
+            web_docs = list(web_docs)
+            scraped_count = 0
+            failed_count = 0
+            for profile_url in profile_links[url]:
+                profile_docs = profile_results.get(profile_url)
+                if profile_docs:
+                    for pdoc in profile_docs:
+                        # Copy so a profile shared by two listings keeps both parents
+                        web_docs.append(Document(
+                            page_content=pdoc.page_content,
+                            metadata={**(pdoc.metadata or {}), "type": "staff_profile", "parent_page": url}
+                        ))
+                    scraped_count += len(profile_docs)
+                else:
+                    failed_count += 1
+            print(f"\n    📊 Profile scraping summary for {url}:")
+            print(f"       ✅ Successfully scraped: {scraped_count} profiles")
+            if failed_count > 0:
+                print(f"       ❌ Failed: {failed_count} profiles")
+        
+        if web_docs and len(web_docs) > 0:
+            for doc in web_docs:
+                # Ensure metadata is properly set for website documents
+                # Create new metadata dict to ensure all fields are set
+                doc.metadata = doc.metadata.copy() if doc.metadata else {}
+                doc.metadata["source"] = url
+                # Don't override type if it's already set (e.g., staff_profile, text_file)
+                if doc.metadata.get("type") not in ["staff_profile", "scanned_pdf", "text_file"]:
+                    doc.metadata["type"] = "website"
+                doc.metadata["url"] = url
+                # Add title if available
+                if "title" not in doc.metadata or doc.metadata.get("title") == "No title":
+                    # Try to extract title from content if not set
+                    title = doc.metadata.get("title", "No title")
+                    doc.metadata["title"] = title
                 
-                # Warn if content is suspiciously short
-                if total_chars < 200:
-                    print(f"    ⚠️  Warning: Content seems short. Preview: {web_docs[0].page_content[:150]}...")
-            else:
-                failed_urls += 1
-                failed_url_list.append(url)
-                error_msg = last_error if last_error else "No content extracted"
-                print(f"  ❌ Failed to load {url}: {error_msg}")
+                # Ensure source URL is in content for better context (but don't duplicate)
+                if not doc.page_content.startswith(f"[Source: {url}]"):
+                    doc.page_content = f"[Source: {url}]\n\n{doc.page_content}"
             
-            time.sleep(0.5)  # Be polite between requests
+            all_docs.extend(web_docs)
+            web_docs_count += len(web_docs)
+            total_chars = sum(len(d.page_content) for d in web_docs)
+            successful_urls += 1
+            print(f"  ✅ Successfully loaded {len(web_docs)} document(s) from {url} (content length: {total_chars} chars)")
             
-        except Exception as e:
+            # Warn if content is suspiciously short
+            if total_chars < 200:
+                print(f"    ⚠️  Warning: Content seems short. Preview: {web_docs[0].page_content[:150]}...")
+        else:
             failed_urls += 1
             failed_url_list.append(url)
-            error_msg = str(e)[:200]  # Limit error message length
-            print(f"  ❌ Failed to load {url}: {error_msg}")
-            # Only print full traceback for debugging if it's an unexpected error
-            if "Cloudflare" not in error_msg and "403" not in error_msg:
-                import traceback
-                print(f"    Traceback: {traceback.format_exc()[:500]}")
-            continue
+            error_msg = last_error if last_error else "No content extracted"
+            print(f"  ❌ Failed to load {url}: {error_msg[:200]}")
     
     # Print summary statistics
     print(f"\n📊 URL Scraping Summary:")
-    print(f"   ✅ Successful: {successful_urls}/{len(URLS)} URLs")
-    print(f"   ❌ Failed: {failed_urls}/{len(URLS)} URLs")
+    print(f"   ✅ Successful: {successful_urls}/{len(urls)} URLs")
+    print(f"   ❌ Failed: {failed_urls}/{len(urls)} URLs")
     if failed_url_list:
         print(f"   Failed URLs:")
         for failed_url in failed_url_list:
@@ -750,84 +726,317 @@ def load_documents():
         print(f"      - Some URLs may require authentication or have changed")
     
     print(f"🌐 Total web documents loaded: {web_docs_count}")
+    if fetcher.cache is not None:
+        stats = fetcher.cache.stats()
+        print(f"🗄️  HTTP cache: {stats['hits']} not modified, {stats['misses']} downloaded, "
+              f"{stats['entries']} cached")
     return all_docs
 
-def main():
-    raw_docs = load_documents()
-    
-    if not raw_docs:
-        print("❌ No documents loaded. Check if 'fiek_documents' folder is empty or URLs are correct.")
-        return
-
-    print(f"✅ Total raw documents loaded: {len(raw_docs)}")
-    
-    # Count by type
-    pdf_count = sum(1 for doc in raw_docs if doc.metadata.get("type") in ["scanned_pdf", "pdf"])
-    text_count = sum(1 for doc in raw_docs if doc.metadata.get("type") == "text_file")
-    docx_count = sum(1 for doc in raw_docs if doc.metadata.get("type") == "docx_file")
-    web_count = sum(1 for doc in raw_docs if doc.metadata.get("type") == "website")
-    staff_profile_count = sum(1 for doc in raw_docs if doc.metadata.get("type") == "staff_profile")
-    other_count = len(raw_docs) - pdf_count - text_count - docx_count - web_count - staff_profile_count
-    
-    print(f"   📄 PDF documents: {pdf_count}")
-    print(f"   📝 Text files: {text_count}")
-    if docx_count > 0:
-        print(f"   📄 DOCX files: {docx_count}")
-    print(f"   🌐 Web documents: {web_count}")
-    if staff_profile_count > 0:
-        print(f"   👤 Staff profiles: {staff_profile_count}")
-    if other_count > 0:
-        print(f"   📋 Other documents: {other_count}")
-
-    print("\n✂️  Splitting documents into chunks...")
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=200,
-        separators=["\n\n", "\n", " ", ""]
-    )
-    splits = text_splitter.split_documents(raw_docs)
-    
-    # Ensure metadata is preserved after splitting (especially for website chunks)
-    for split in splits:
-        if not split.metadata.get("type"):
-            # If type is missing, infer from source
-            source = split.metadata.get("source", "")
-            if source.startswith("http"):
-                split.metadata["type"] = "website"
-                split.metadata["url"] = source
-            else:
-                split.metadata["type"] = "pdf"
-    print(f"✂️  Split into {len(splits)} chunks.")
-    
-    web_chunks = sum(1 for split in splits if split.metadata.get("type") == "website")
-    staff_profile_chunks = sum(1 for split in splits if split.metadata.get("type") == "staff_profile")
-    pdf_chunks = sum(1 for split in splits if split.metadata.get("type") in ["scanned_pdf", "pdf"])
-    text_chunks = sum(1 for split in splits if split.metadata.get("type") == "text_file")
-    docx_chunks = sum(1 for split in splits if split.metadata.get("type") == "docx_file")
-    other_chunks = len(splits) - web_chunks - staff_profile_chunks - pdf_chunks - text_chunks - docx_chunks
-    
-    print(f"   📄 PDF chunks: {pdf_chunks}")
-    print(f"   📝 Text file chunks: {text_chunks}")
-    if docx_chunks > 0:
-        print(f"   📄 DOCX file chunks: {docx_chunks}")
-    print(f"   🌐 Web chunks: {web_chunks}")
-    if staff_profile_chunks > 0:
-        print(f"   👤 Staff profile chunks: {staff_profile_chunks}")
-    if other_chunks > 0:
-        print(f"   📋 Other chunks: {other_chunks}")
-
-    print("\n💾 Saving to Vector Database (ChromaDB)...")
-    embedding = OpenAIEmbeddings(model="text-embedding-3-small")
-    
-    if os.path.exists("./fiek_db"):
-        print("  🗑️  Clearing existing database...")
-        shutil.rmtree("./fiek_db")
-    
-    vectorstore = Chroma.from_documents(
-        documents=splits, 
-        embedding=embedding, 
-        persist_directory="./fiek_db"
-    )
+def load_documents(is_unchanged=None, schedule=None, executor=None):
+    """
+    Yield Documents from local files, one file at a time, then from URLS.
+    Local files are extracted on `executor`, a pool from process_pool() (see
+    models/file_loader.py), and come out in sorted path order whatever the
+    number of workers; without one they are extracted in-process.
+    
+    If is_unchanged(source, content_hash) is given, it is called for every
+    supported local file and every URL (with web_source_hash), and sources
+    it reports as unchanged are skipped.
+    Sessions read from timetable spreadsheets replace that file's entries
+    in schedule (a ScheduleIndex) when one is given.
+    """
+    # Load PDFs and text files if folder exists (recursively through subfolders)
+    if os.path.exists(FOLDER_PATH):
+        def local_files():
+            # Sorted walk, so documents come out in the same order every run
+            for root, dirs, files in os.walk(FOLDER_PATH):
+                dirs.sort()
+                for filename in sorted(files):
+                    if not filename.endswith(SUPPORTED_EXTENSIONS):
+                        continue
+                    file_path = os.path.join(root, filename)
+                    
+                    # Get relative path from FOLDER_PATH for metadata
+                    rel_path = os.path.relpath(file_path, FOLDER_PATH)
+                    # Use forward slashes for consistency across platforms
+                    rel_path_normalized = rel_path.replace("\\", "/")
+                    
+                    # Skip files whose content was already ingested (incremental mode)
+                    if is_unchanged and is_unchanged(rel_path_normalized, file_sha256(file_path)):
+                        print(f"⏭️  Unchanged, skipping: {rel_path_normalized}")
+                        continue
+                    yield file_path, rel_path_normalized
+        
+        # Text extraction is CPU-bound, so files are extracted on the process
+        # pool and handed on in walk order
+        for (file_path, rel_path_normalized), result in ordered_map(
+                extract_file_task, local_files(), executor=executor):
+            for line in result["log"]:
+                print(line)
+            if result["needs_ocr"]:
+                raw_text = extract_text_from_scanned_pdf(file_path, executor)
+                if raw_text:
+                    yield Document(
+                        page_content=raw_text, 
+                        metadata={
+                            "source": rel_path_normalized,
+                            "file_path": rel_path_normalized,
+                            "type": "scanned_pdf"
+                        }
+                    )
+            if result["sessions"] is not None and schedule is not None:
+                schedule.replace_source(rel_path_normalized, result["sessions"])
+            yield from result["documents"]
+    else:
+        print(f"⚠️ Folder '{FOLDER_PATH}' does not exist. Skipping file loading. Creating folder for future use...")
+        os.makedirs(FOLDER_PATH, exist_ok=True)
+
+    if _ocr_cache is not None:
+        stats = _ocr_cache.stats()
+        print(f"🗂️  OCR cache: {stats['hits']} pages reused, {stats['misses']} OCR'd, "
+              f"{stats['entries']} cached ({stats['bytes'] // 1024} KB)")
+
+    yield from load_web_documents(is_unchanged=is_unchanged)
+
+class IngestTally:
+    """
+    What went through the pipeline: counts by document type and, per
+    source, the chunk ids and a running hash of the loaded text (used for
+    URLs, which have no file hash). Filled by the split stage.
+    """
+
+    def __init__(self):
+        self.documents = Counter()
+        self.chunks = Counter()
+        self._chunk_ids = {}
+        self._digests = {}
+
+    def add(self, doc, chunk_ids):
+        doc_type = doc.metadata.get("type")
+        source = doc.metadata.get("source", "Unknown")
+        self.documents[doc_type] += 1
+        self.chunks[doc_type] += len(chunk_ids)
+        if chunk_ids:
+            self._chunk_ids.setdefault(source, []).extend(chunk_ids)
+        # Same digest as text_sha256 over the source's texts joined by newlines
+        digest = self._digests.get(source)
+        if digest is None:
+            digest = self._digests[source] = hashlib.sha256()
+        else:
+            digest.update(b"\n")
+        digest.update(doc.page_content.encode('utf-8'))
+
+    def sources(self, file_hashes):
+        """Manifest entries for every source that produced chunks."""
+        return {
+            source: {
+                "hash": file_hashes.get(source) or self._digests[source].hexdigest(),
+                "chunk_ids": chunk_ids,
+            }
+            for source, chunk_ids in self._chunk_ids.items()
+        }
+
+    def report(self):
+        docs, chunks = self.documents, self.chunks
+        pdf_types = ("scanned_pdf", "pdf")
+
+        print(f"✅ Total raw documents loaded: {sum(docs.values())}")
+        pdf_count = sum(docs[t] for t in pdf_types)
+        other_count = sum(docs.values()) - pdf_count - sum(
+            docs[t] for t in ("text_file", "docx_file", "timetable", "website", "staff_profile"))
+        print(f"   📄 PDF documents: {pdf_count}")
+        print(f"   📝 Text files: {docs['text_file']}")
+        if docs["docx_file"] > 0:
+            print(f"   📄 DOCX files: {docs['docx_file']}")
+        if docs["timetable"] > 0:
+            print(f"   📅 Timetable rows: {docs['timetable']}")
+        print(f"   🌐 Web documents: {docs['website']}")
+        if docs["staff_profile"] > 0:
+            print(f"   👤 Staff profiles: {docs['staff_profile']}")
+        if other_count > 0:
+            print(f"   📋 Other documents: {other_count}")
+
+        print(f"✂️  Split into {sum(chunks.values())} chunks.")
+        pdf_chunks = sum(chunks[t] for t in pdf_types)
+        other_chunks = sum(chunks.values()) - pdf_chunks - sum(
+            chunks[t] for t in ("text_file", "docx_file", "timetable", "website", "staff_profile"))
+        print(f"   📄 PDF chunks: {pdf_chunks}")
+        print(f"   📝 Text file chunks: {chunks['text_file']}")
+        if chunks["docx_file"] > 0:
+            print(f"   📄 DOCX file chunks: {chunks['docx_file']}")
+        if chunks["timetable"] > 0:
+            print(f"   📅 Timetable chunks: {chunks['timetable']}")
+        print(f"   🌐 Web chunks: {chunks['website']}")
+        if chunks["staff_profile"] > 0:
+            print(f"   👤 Staff profile chunks: {chunks['staff_profile']}")
+        if other_chunks > 0:
+            print(f"   📋 Other chunks: {other_chunks}")
+
+
+def clean_document(doc):
+    """Fill in the document type where the loader left it out."""
+    if not doc.metadata.get("type"):
+        # If type is missing, infer from source
+        source = doc.metadata.get("source", "")
+        if source.startswith("http"):
+            doc.metadata["type"] = "website"
+            doc.metadata["url"] = source
+        else:
+            doc.metadata["type"] = "pdf"
+    return doc
+
+
+def split_documents(documents, text_splitter, tally):
+    """
+    Pipeline stage: clean and split each document as it arrives and yield
+    (chunk_id, chunk) pairs, recording what passed through in tally.
+    """
+    seen_ids = {}
+    for doc in documents:
+        doc = clean_document(doc)
+        splits = text_splitter.split_documents([doc])
+        chunk_ids = assign_chunk_ids(splits, seen_ids)
+        tally.add(doc, chunk_ids)
+        yield from zip(chunk_ids, splits)
+
+
+def main(full_rebuild=False):
+    # Incremental mode needs a manifest describing what fiek_db contains;
+    # a database built without one is rebuilt from scratch
+    manifest = None if full_rebuild else load_manifest(DB_PATH)
+    if manifest is None and not full_rebuild:
+        if os.path.exists(DB_PATH):
+            print("ℹ️  No ingest manifest found for the existing database - doing a full rebuild")
+        full_rebuild = True
+    known_sources = manifest["sources"] if manifest else {}
+    
+    file_hashes = {}
+    unchanged_sources = set()
+    
+    # Files are compared by content hash, URLs by web_source_hash()
+    def is_unchanged(source, content_hash):
+        file_hashes[source] = content_hash
+        if known_sources.get(source, {}).get("hash") == content_hash:
+            unchanged_sources.add(source)
+            return True
+        return False
+    
+    # Sessions of unchanged timetables are kept from the previous run
+    schedule_path = os.path.join(DB_PATH, SCHEDULE_INDEX_FILE)
+    schedule = (not full_rebuild and load_schedule_index(DB_PATH)) or ScheduleIndex()
+    
+    # load -> clean/split -> embed/write run as a streaming pipeline: each
+    # stage works on its own thread and hands over through a bounded queue,
+    # so memory holds a window of the corpus and embedding starts while
+    # later files are still loading
+    # The loader's process pool (file extraction and OCR pages) is created
+    # here, on the main thread, before any stage thread exists (see
+    # models/pipeline.py)
+    pool = process_pool(LOAD_MAX_WORKERS, initializer=init_worker, initargs=(TESSERACT_PATH,))
+    try:
+        loaded = BufferedStage(
+            load_documents(is_unchanged=is_unchanged, schedule=schedule, executor=pool),
+            maxsize=LOAD_QUEUE_SIZE, name="load"
+        )
+        documents = iter(loaded)
+        first_doc = next(documents, None)
+        if first_doc is None and not unchanged_sources:
+            print("❌ No documents loaded. Check if 'fiek_documents' folder is empty or URLs are correct.")
+            return
+        if first_doc is not None:
+            documents = itertools.chain([first_doc], documents)
+
+        print("\n💾 Saving to Vector Database (ChromaDB)...")
+        embedding = OpenAIEmbeddings(model="text-embedding-3-small")
+        checkpoint_path = os.path.join(DB_PATH, EMBED_CHECKPOINT_FILE)
+    
+        if full_rebuild:
+            if os.path.exists(checkpoint_path):
+                print("  ♻️  Found an interrupted build - resuming instead of clearing the database")
+            elif os.path.exists(DB_PATH):
+                print("  🗑️  Clearing existing database...")
+                shutil.rmtree(DB_PATH)
+            existing_ids = set()
+        else:
+            existing_ids = manifest_chunk_ids(manifest)
+        vectorstore = Chroma(persist_directory=DB_PATH, embedding_function=embedding)
+
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=1000,
+            chunk_overlap=200,
+            separators=["\n\n", "\n", " ", ""]
+        )
+        tally = IngestTally()
+        chunks = BufferedStage(
+            split_documents(documents, text_splitter, tally),
+            maxsize=CHUNK_QUEUE_SIZE, name="split"
+        )
+        writer = EmbeddingWriter(
+            vectorstore,
+            batch_tokens=EMBED_BATCH_TOKENS,
+            max_workers=EMBED_MAX_WORKERS,
+            checkpoint_path=checkpoint_path
+        )
+        # Content-derived ids: chunks already in the database are not embedded again
+        writer.write_stream(
+            (chunk_id, split) for chunk_id, split in chunks if chunk_id not in existing_ids
+        )
+        tally.report()
+        print(f"  🚰 Peak queued: {loaded.high_water}/{LOAD_QUEUE_SIZE} documents, "
+              f"{chunks.high_water}/{CHUNK_QUEUE_SIZE} chunks")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    # Group chunks and content hashes per source for the manifest
+    new_sources = tally.sources(file_hashes)
+    # Skipped files keep the chunks they already have in the database
+    for source in unchanged_sources:
+        new_sources[source] = known_sources[source]
+    wanted_ids = manifest_chunk_ids({"sources": new_sources})
+
+    if full_rebuild:
+        # A resumed build may hold chunks of contents that changed since
+        stale_ids = set(vectorstore.get(include=[])["ids"]) - wanted_ids
+        if stale_ids:
+            vectorstore.delete(ids=sorted(stale_ids))
+        changed = True
+    else:
+        to_delete = sorted(existing_ids - wanted_ids)
+        added = len(wanted_ids - existing_ids)
+        
+        print(f"  ⏭️  Unchanged files skipped: {len(unchanged_sources)}")
+        print(f"  ➕ New or changed chunks embedded: {added}")
+        print(f"  ➖ Removed chunks to delete: {len(to_delete)}")
+        
+        if to_delete:
+            vectorstore.delete(ids=to_delete)
+        changed = bool(added or to_delete)
+    
+    save_manifest(DB_PATH, {"sources": new_sources})
+    
+    # Lexical index over exactly the chunks stored in Chroma, for hybrid retrieval
+    bm25_path = os.path.join(DB_PATH, BM25_INDEX_FILE)
+    if changed or not os.path.exists(bm25_path):
+        print("\n🔤 Building BM25 keyword index...")
+        bm25 = BM25Index.from_vectorstore(vectorstore)
+        bm25.save(bm25_path)
+        print(f"  ✅ Indexed {len(bm25)} chunks ({len(bm25.postings)} terms)")
+    
+    # Structured timetable lookups; drops sessions of files no longer ingested
+    schedule.retain_sources(new_sources)
+    schedule.save(schedule_path)
+    if len(schedule):
+        print(f"\n📅 Schedule index: {len(schedule)} sessions in {len(schedule.rooms())} rooms")
+    
+    # Room list and staff contacts for the API's fast path (see models/fast_path.py)
+    lookup_path = os.path.join(DB_PATH, LOOKUP_INDEX_FILE)
+    if changed or not os.path.exists(lookup_path):
+        lookup = LookupIndex.from_vectorstore(vectorstore)
+        lookup.save(lookup_path)
+        print(f"📇 Lookup index: {len(lookup.rooms)} rooms, {len(lookup.staff)} staff contacts")
+    total_chunks = sum(len(entry["chunk_ids"]) for entry in new_sources.values())
+    print(f"  📦 Chunks in database: {total_chunks}")
     
     # Verify what was actually stored
     print("\n🔍 Verifying database contents...")
@@ -838,7 +1047,7 @@ def main():
     all_pdf_results = []
     
     for query in test_queries:
-        test_results = vectorstore.similarity_search(query, k=min(10, len(splits)))
+        test_results = vectorstore.similarity_search(query, k=min(10, total_chunks))
         website_results = [r for r in test_results if r.metadata.get("type") == "website"]
         pdf_results = [r for r in test_results if r.metadata.get("type") != "website"]
         all_website_results.extend(website_results)
@@ -872,7 +1081,7 @@ def main():
         # Try to get all documents and check metadata
         try:
             # Get a larger sample
-            all_results = vectorstore.similarity_search("FIEK", k=min(50, len(splits)))
+            all_results = vectorstore.similarity_search("FIEK", k=min(50, total_chunks))
             website_in_db = [r for r in all_results if r.metadata.get("type") == "website"]
             print(f"   Found {len(website_in_db)} website chunks in larger sample of {len(all_results)}")
             
@@ -886,7 +1095,22 @@ def main():
         except Exception as e:
             print(f"   Error checking database: {e}")
     
-    print("\n🚀 Success! Database built at ./fiek_db")
+    # New version invalidates answers cached by the API against the old contents
+    if changed:
+        kb_version = write_kb_version(DB_PATH)
+        print(f"\n🏷️  Knowledge base version: {kb_version}")
+    else:
+        print("\n🏷️  No changes - knowledge base version kept")
+    
+    print(f"\n🚀 Success! Database built at {DB_PATH}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build the FIEK vector database")
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Delete fiek_db and re-embed everything instead of updating incrementally"
+    )
+    args = parser.parse_args()
+    main(full_rebuild=args.full)
\ No newline at end of file
@@ -0,0 +1,80 @@
+"""
+Content-hash manifest for incremental ingestion.
+
+The manifest lives next to the Chroma data and records, per source
+(relative file path or URL), the content hash that was ingested and the
+ids of the chunks it produced. Chunk ids are derived from the chunk
+content, so an unchanged chunk keeps its id across runs and never has
+to be embedded again.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_FILE = "ingest_manifest.json"
+
+
+def file_sha256(path):
+    """SHA-256 of a file's bytes."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def assign_chunk_ids(chunks, seen=None):
+    """
+    Deterministic id per chunk from its source, content and metadata.
+    Identical chunks within the same run get an occurrence suffix so ids
+    stay unique; pass the same `seen` dict to every call when ids are
+    assigned batch by batch.
+    """
+    ids = []
+    seen = {} if seen is None else seen
+    for chunk in chunks:
+        key = json.dumps(
+            [chunk.metadata.get("source", ""), chunk.page_content, chunk.metadata],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        chunk_id = text_sha256(key)
+        count = seen.get(chunk_id, 0)
+        seen[chunk_id] = count + 1
+        ids.append(chunk_id if count == 0 else f"{chunk_id}-{count}")
+    return ids
+
+
+def load_manifest(persist_directory):
+    """Return the stored manifest, or None if there is none."""
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Could not read ingest manifest ({e}), a full rebuild is needed")
+        return None
+
+
+def save_manifest(persist_directory, manifest):
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def manifest_chunk_ids(manifest):
+    """All chunk ids recorded in a manifest."""
+    return {
+        chunk_id
+        for entry in manifest.get("sources", {}).values()
+        for chunk_id in entry.get("chunk_ids", [])
+    }
@@ -0,0 +1,32 @@
+"""
+Knowledge-base version marker stored inside the Chroma persist directory.
+
+ingest.py writes a fresh version after every (re)build so that anything
+cached against the previous contents (e.g. answers) can be invalidated.
+"""
+
+import os
+import time
+import uuid
+
+KB_VERSION_FILE = "kb_version.txt"
+
+
+def read_kb_version(persist_directory):
+    """Return the current knowledge-base version, or None if never written."""
+    path = os.path.join(persist_directory, KB_VERSION_FILE)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def write_kb_version(persist_directory):
+    """Stamp the knowledge base with a new version and return it."""
+    version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    os.makedirs(persist_directory, exist_ok=True)
+    path = os.path.join(persist_directory, KB_VERSION_FILE)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(version)
+    return version
@@ -0,0 +1,96 @@
+"""
+Parallel OCR for scanned PDFs.
+
+Pages are rasterized one at a time inside worker processes (pdf2image
+first_page/last_page), so peak memory is bounded by the number of workers
+rather than the page count. The page texts are reassembled in order as
+"[Page N]" sections.
+
+The caller supplies the process pool (ingest shares its loader pool, set
+up with init_worker) rather than each PDF starting its own.
+"""
+
+from functools import lru_cache
+
+import pytesseract
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+OCR_DPI = 200
+# Tesseract language packs to use when installed, in order
+PREFERRED_LANGUAGES = ("eng", "sqi")
+
+
+@lru_cache(maxsize=None)
+def detect_ocr_languages(preferred=PREFERRED_LANGUAGES):
+    """
+    Return the tesseract `lang` string for the installed preferred packs
+    (e.g. "eng+sqi"), or None to use tesseract's default. Checked once.
+    """
+    try:
+        available = set(pytesseract.get_languages(config=""))
+    except Exception:
+        return None
+    languages = [lang for lang in preferred if lang in available]
+    return "+".join(languages) or None
+
+
+def init_worker(tesseract_cmd):
+    """Pool initializer: point pytesseract at the tesseract binary."""
+    if tesseract_cmd:
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+
+
+def ocr_page(pdf_path, page_number, lang=None, dpi=OCR_DPI):
+    """Rasterize a single page (1-based) and return its OCR text."""
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    if not images:
+        return ""
+    image = images[0]
+    try:
+        if lang:
+            return pytesseract.image_to_string(image, lang=lang)
+        return pytesseract.image_to_string(image)
+    finally:
+        image.close()
+
+
+def _ocr_page_task(task):
+    return ocr_page(*task)
+
+
+def ocr_pdf_pages(pdf_path, page_numbers, lang=None, dpi=OCR_DPI, executor=None):
+    """
+    OCR the given pages on `executor` (None OCRs them in-process); returns
+    texts in `page_numbers` order.
+    """
+    tasks = [(pdf_path, page_number, lang, dpi) for page_number in page_numbers]
+    if executor is None or len(tasks) <= 1:
+        return [_ocr_page_task(task) for task in tasks]
+    return list(executor.map(_ocr_page_task, tasks))
+
+
+def pdf_page_count(pdf_path):
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def ocr_pdf(pdf_path, lang=None, dpi=OCR_DPI, executor=None, cache=None, file_hash=None):
+    """
+    OCR a whole PDF page by page, in parallel on `executor`, as "[Page N]"
+    sections.
+    With an OcrCache and the file's content hash, cached pages are reused
+    and only the missing ones are OCR'd.
+    """
+    page_numbers = list(range(1, pdf_page_count(pdf_path) + 1))
+    page_texts = {}
+    if cache is not None and file_hash:
+        page_texts = cache.get_pages(file_hash, page_numbers, lang, dpi)
+
+    missing = [n for n in page_numbers if n not in page_texts]
+    if missing:
+        texts = ocr_pdf_pages(pdf_path, missing, lang=lang, dpi=dpi, executor=executor)
+        new_texts = dict(zip(missing, texts))
+        page_texts.update(new_texts)
+        if cache is not None and file_hash:
+            cache.put_pages(file_hash, new_texts, lang, dpi)
+
+    return "".join(f"\n[Page {n}]\n{page_texts[n]}" for n in page_numbers)
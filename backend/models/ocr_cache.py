@@ -0,0 +1,116 @@
+"""
+Persistent OCR result cache.
+
+Page texts are stored in SQLite keyed by (file content hash, page number,
+tesseract language set, DPI), so unchanged scanned PDFs are not OCR'd
+again on re-ingest. The cache is bounded by total text size; the least
+recently used pages are evicted first.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+
+
+class OcrCache:
+    """SQLite-backed page-text cache with LRU eviction by total size."""
+
+    def __init__(self, path, max_bytes=200 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " file_hash TEXT NOT NULL,"
+            " page INTEGER NOT NULL,"
+            " lang TEXT NOT NULL,"
+            " dpi INTEGER NOT NULL,"
+            " text TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " last_access REAL NOT NULL,"
+            " PRIMARY KEY (file_hash, page, lang, dpi))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._conn.commit()
+
+    def get_pages(self, file_hash, page_numbers, lang, dpi):
+        """Return {page_number: text} for the pages that are cached."""
+        lang = lang or "default"
+        found = {}
+        now = time.time()
+        with self._lock:
+            for page in page_numbers:
+                row = self._conn.execute(
+                    "SELECT text FROM pages WHERE file_hash=? AND page=? AND lang=? AND dpi=?",
+                    (file_hash, page, lang, dpi)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                found[page] = row[0]
+                self._conn.execute(
+                    "UPDATE pages SET last_access=? WHERE file_hash=? AND page=? AND lang=? AND dpi=?",
+                    (now, file_hash, page, lang, dpi)
+                )
+            self._conn.commit()
+        return found
+
+    def put_pages(self, file_hash, page_texts, lang, dpi):
+        """Store {page_number: text} and evict old pages beyond max_bytes."""
+        lang = lang or "default"
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO pages (file_hash, page, lang, dpi, text, size, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(file_hash, page, lang, dpi, text, len(text.encode('utf-8')), now)
+                 for page, text in page_texts.items()]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute(
+            "SELECT rowid, size FROM pages ORDER BY last_access ASC"
+        ).fetchall()
+        doomed = []
+        for rowid, size in rows:
+            if total <= self.max_bytes:
+                break
+            doomed.append((rowid,))
+            total -= size
+        self._conn.executemany("DELETE FROM pages WHERE rowid=?", doomed)
+        self.evictions += len(doomed)
+
+    def stats(self):
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages"
+            ).fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "bytes": total,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,130 @@
+"""
+Bounded hand-off between the stages of the ingest pipeline.
+
+Each stage (load → clean/split → embed/write) is a generator. BufferedStage
+runs one on a background thread and passes its items to the next stage
+through a queue of at most `maxsize` items, so stages overlap (embedding
+starts while later files are still loading) while a fast producer blocks
+instead of piling the corpus up in memory. ordered_map() spreads a
+CPU-bound stage over a process pool with the same bound.
+
+Stages run on threads, so they must never create a process pool: forking
+a process that already runs stage, embedding and Chroma threads can
+deadlock the child. Build the pool with process_pool() on the main thread
+before the first stage starts and pass it to ordered_map().
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+_END = object()
+
+
+class BufferedStage:
+    """
+    Iterate `source` on a worker thread, yielding its items in order.
+
+    An exception raised by the source is re-raised in the consumer. If the
+    consumer stops early (break, error), the worker stops at its next item.
+    `high_water` records the fullest the queue got, to check the bound.
+
+    The source runs off the main thread: any process pool it uses must be
+    created beforehand with process_pool(), which refuses other threads.
+    """
+
+    def __init__(self, source, maxsize=32, name="stage"):
+        self.source = source
+        self.maxsize = maxsize
+        self.name = name
+        self.high_water = 0
+        self._queue = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _put(self, item):
+        """Block until there is room, unless the consumer has gone away."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self):
+        try:
+            for item in self.source:
+                if not self._put((item, None)):
+                    return
+                self.high_water = max(self.high_water, self._queue.qsize())
+        except BaseException as e:
+            self._put((_END, e))
+            return
+        self._put((_END, None))
+
+    def __iter__(self):
+        if self._thread is not None:
+            raise RuntimeError(f"Pipeline stage {self.name!r} can only be iterated once")
+        self._thread = threading.Thread(target=self._produce, name=f"ingest-{self.name}", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                item, error = self._queue.get()
+                if item is _END:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            self._stop.set()
+
+
+def process_pool(max_workers=None, initializer=None, initargs=()):
+    """
+    Process pool for CPU-bound stages, or None when one worker is asked
+    for (ordered_map then runs inline). Must be called on the main thread
+    before any stage starts. Workers come from a forkserver (spawn where
+    there is none), so they are never forked from a multi-threaded parent.
+    """
+    if threading.current_thread() is not threading.main_thread():
+        raise RuntimeError("Create process pools on the main thread, before starting pipeline stages")
+    workers = max_workers or os.cpu_count() or 1
+    if workers <= 1:
+        return None
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method),
+                               initializer=initializer, initargs=initargs)
+
+
+def ordered_map(fn, items, executor=None, window=None):
+    """
+    Yield (item, fn(item)) in input order, computing fn on `executor` (a
+    pool from process_pool(); None runs fn inline).
+
+    Items are pulled lazily and at most `window` (default 2 per core) are
+    submitted ahead of the consumer, so a slow consumer holds back the pool
+    instead of collecting every result. fn must be a picklable module-level
+    function.
+    """
+    if executor is None:
+        for item in items:
+            yield item, fn(item)
+        return
+    window = window or 2 * (os.cpu_count() or 1)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append((item, executor.submit(fn, item)))
+            if len(pending) >= window:
+                item, future = pending.popleft()
+                yield item, future.result()
+        while pending:
+            item, future = pending.popleft()
+            yield item, future.result()
+    finally:
+        for _, future in pending:
+            future.cancel()
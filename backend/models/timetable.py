@@ -0,0 +1,402 @@
+"""
+Timetable spreadsheets (.xlsx) and the structured schedule index.
+
+The FIEK timetables are laid out as one block per day: a day row ("E hënë"),
+an "Ora" header row naming the session kind of each column (lectures,
+exercises), then one row per time slot whose cells list the sessions as
+"G1-Bazat e Programimit- A411; G3 - ... - A408". A side column lists the
+courses with their lecturers per group.
+
+load_timetable() streams the rows in openpyxl's read-only mode and returns
+one compact Document per (day, time) row for the vector store, plus one
+entry per session (day, time, kind, group, course, room, lecturer). The
+entries go into a ScheduleIndex, saved next to the vector store, which
+answers exact questions such as "what's in A411 on Monday" with dict
+lookups instead of retrieval.
+"""
+
+import json
+import os
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+SCHEDULE_INDEX_FILE = "schedule_index.json"
+
+# Canonical day names in timetable order; lookups also accept English names
+DAYS = ("E hënë", "E martë", "E mërkurë", "E enjte", "E premte", "E shtunë", "E diel")
+_ENGLISH_DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+ENGLISH_DAY_NAMES = {day: english.capitalize() for day, english in zip(DAYS, _ENGLISH_DAYS)}
+
+KIND_LABELS = {"lecture": "Ligjëratë", "exercise": "Ushtrime"}
+ENGLISH_KIND_LABELS = {"lecture": "Lecture", "exercise": "Exercises"}
+
+_TIME = r"(\d{1,2})[:.](\d{2})"
+_TIME_RANGE_RE = re.compile(_TIME + r"\s*[-–:]?\s*" + _TIME)
+# "(8:15-9:00)", "9:45-10:30-" or "(14.15-15.00-" in front of a session
+_TIME_PREFIX_RE = re.compile(r"^\(?\s*" + _TIME + r"\s*[-–]\s*" + _TIME + r"\s*\)?\s*[-–]?\s*")
+_EDIT_NOTE_RE = re.compile(r"\(\s*(?:e\s+)?edituar\s*\)", re.IGNORECASE)
+_GROUP_ATOM = r"[A-Za-z]{0,4}\d+[A-Za-z]?\d*['\"’]*"
+_LEADING_GROUP_RE = re.compile(r"^(" + _GROUP_ATOM + r"(?:\s*\+\s*" + _GROUP_ATOM + r")*)(?:\s*[-–_]\s*|\s+)")
+_ELECTIVE_GROUP_RE = re.compile(r"\bG\d+Z\d*\b")
+# Rooms need a letter prefix or three digits, so "kalkulus 1" is not a room
+_ROOM_RE = re.compile(
+    r"(?:^|[\s\-–_])((?:[A-Za-z]\s?\d{1,4}|\d{3,4})(?:\s*\+\s*lab)?|lab\s*fiz|kb\s*fiz)$",
+    re.IGNORECASE
+)
+_PANEL_NUMBER_RE = re.compile(r"^\d+\.\s*")
+_PANEL_GROUP_RE = re.compile(r"(?<![\w.])(" + _GROUP_ATOM + r")")
+_COURSE_CREDITS_RE = re.compile(r"\s*\(\d+(?:\+\d+)*\).*$")
+
+
+def fold(text: str) -> str:
+    """Lowercase and drop diacritics (ë -> e, ç -> c) for matching."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+_DAY_KEYS = {}
+for _day, _english in zip(DAYS, _ENGLISH_DAYS):
+    _DAY_KEYS[fold(_day)] = _day
+    _DAY_KEYS[fold(_day)[2:]] = _day  # "hene"
+    _DAY_KEYS[fold(_day)[2:] + "n"] = _day  # "(të) hënën"
+    _DAY_KEYS[_english] = _day
+
+
+def normalize_day(text) -> Optional[str]:
+    """Canonical day name for "E hënë", "e hene", "hënën" or "Monday", else None."""
+    if not isinstance(text, str):
+        return None
+    return _DAY_KEYS.get(" ".join(fold(text).split()))
+
+
+def normalize_room(text: str) -> str:
+    """"A 411" -> "A411", "Lab Fiz" -> "LABFIZ"."""
+    return re.sub(r"\s+", "", text).upper()
+
+
+def group_key(group: str) -> str:
+    """Match key for a group: "3a''" and '3a"' are the same group, "GShk1" is "Shk1"."""
+    key = group.strip().lower().replace("’", "'").replace('"', "''")
+    if re.match(r"^g[a-z]", key):
+        key = key[1:]
+    return key
+
+
+def _minutes(hours, minutes) -> int:
+    return int(hours) * 60 + int(minutes)
+
+
+def _format_time(value: int) -> str:
+    return f"{value // 60:02d}:{value % 60:02d}"
+
+
+def parse_time_range(text) -> Optional[tuple]:
+    """(start, end) in minutes for "08:00-8:45", "10:15: 11:00" or "07:45-08.30"."""
+    if not isinstance(text, str):
+        return None
+    match = _TIME_RANGE_RE.search(text)
+    if not match:
+        return None
+    h1, m1, h2, m2 = match.groups()
+    return _minutes(h1, m1), _minutes(h2, m2)
+
+
+def parse_session(text: str) -> Optional[Dict]:
+    """
+    Parse one cell segment like "(8:15-9:00)3a' -Bazat e programimi- 615"
+    into time override, group, course and room. Returns None for segments
+    without a course (stray times or notes).
+    """
+    text = _EDIT_NOTE_RE.sub("", text).strip(" \t,;")
+    session = {"start": None, "end": None, "group": "", "course": "", "room": "", "lab": False}
+    match = _TIME_PREFIX_RE.match(text)
+    if match:
+        h1, m1, h2, m2 = match.groups()
+        session["start"], session["end"] = _minutes(h1, m1), _minutes(h2, m2)
+        text = text[match.end():]
+    text = text.strip(" \t,;)")
+
+    match = _ROOM_RE.search(text)
+    if match:
+        room = normalize_room(match.group(1))
+        if room.endswith("+LAB"):
+            room, session["lab"] = room[:-len("+LAB")], True
+        session["room"] = room
+        session["lab"] = session["lab"] or room.startswith("LAB")
+        text = text[:match.start()]
+
+    match = _LEADING_GROUP_RE.match(text)
+    if match:
+        session["group"] = re.sub(r"\s+", "", match.group(1))
+        text = text[match.end():]
+    else:
+        match = _ELECTIVE_GROUP_RE.search(text)
+        if match:
+            session["group"] = match.group(0)
+            text = text[:match.start()] + text[match.end():]
+
+    course = " ".join(text.strip(" \t-–_,;").split())
+    if course.count("(") > course.count(")"):
+        course += ")"
+    if not re.search(r"[^\W\d]{3}", course):
+        return None
+    session["course"] = course
+    return session
+
+
+def course_words(course: str) -> set:
+    """5-letter prefixes of the significant words, so "Algjebra"/"ALGJEBER" and "Fizika"/"FIZIKË" match."""
+    return {word[:5] for word in re.findall(r"[^\W\d_]{4,}", fold(course))}
+
+
+def _parse_panel_line(text: str, state: Dict, lecturers: List[Dict]):
+    """Feed one cell of the course/lecturer side column."""
+    text = " ".join(text.split())
+    if not text:
+        return
+    if "ECTS" in text:
+        state["course"] = _COURSE_CREDITS_RE.sub("", _PANEL_NUMBER_RE.sub("", text))
+        state["kind"] = None
+        return
+    folded = fold(text)
+    if folded.startswith("mesimdhenes"):
+        state["kind"] = "lecture" if "ligj" in folded else "exercise"
+        return
+    text = _PANEL_NUMBER_RE.sub("", text)
+    paren = text.find("(")
+    groups = [g for g in _PANEL_GROUP_RE.findall(text[paren:] if paren >= 0 else text) if re.search(r"\d", g)]
+    if not groups:
+        return
+    name = text[:paren] if paren >= 0 else text[:text.find(groups[0])]
+    lecturers.append({
+        "name": name.strip(" ,"),
+        "course": state.get("course") or "",
+        "kind": state.get("kind"),
+        "groups": {group_key(g) for g in groups},
+    })
+
+
+def _find_lecturer(session: Dict, lecturers: List[Dict]) -> str:
+    """
+    Lecturer listed for this session's group, trying the exact group and
+    then the group without primes ("3a'" -> "3a") within the same course
+    first, then in any course. The same kind breaks ties.
+    """
+    if not session["group"]:
+        return ""
+    words = course_words(session["course"])
+    first_group = group_key(session["group"].split("+")[0])
+    best, best_score = "", 0
+    for same_course in (True, False):
+        for wanted in (first_group, first_group.rstrip("'")):
+            for lecturer in lecturers:
+                if wanted not in lecturer["groups"]:
+                    continue
+                overlap = len(words & course_words(lecturer["course"] + " " + lecturer["name"]))
+                if same_course and not overlap:
+                    continue
+                # Section labels are sometimes missing, so kind only breaks ties
+                score = 1 + 2 * overlap + (lecturer["kind"] == session["kind"])
+                if score > best_score:
+                    best, best_score = lecturer["name"], score
+            if best:
+                return best
+    return ""
+
+
+def format_session(entry: Dict, with_day: bool = False, english: bool = False) -> str:
+    """One readable line per session, shared by chunks and direct answers."""
+    parts = [entry["group"], entry["course"]]
+    if entry["room"]:
+        room = f"{'room' if english else 'salla'} {entry['room']}"
+        parts.append(room + (" (+Lab)" if entry["lab"] and not entry["room"].startswith("LAB") else ""))
+    if entry["lecturer"]:
+        parts.append(entry["lecturer"])
+    time_range = f"{entry['start']}-{entry['end']}"
+    day = ENGLISH_DAY_NAMES[entry["day"]] if english else entry["day"]
+    prefix = f"{day} {time_range}" if with_day else time_range
+    label = (ENGLISH_KIND_LABELS if english else KIND_LABELS).get(entry["kind"], entry["kind"])
+    return f"{prefix} {label}: " + ", ".join(p for p in parts if p)
+
+
+def load_timetable(file_path: str, source: str):
+    """
+    Read a timetable workbook. Returns (documents, entries): one Document per
+    (day, time) row with metadata type "timetable", and one entry dict per
+    session for the ScheduleIndex.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    documents, entries = [], []
+    try:
+        for sheet in workbook.worksheets:
+            title_lines, rows = [], []
+            day, kinds = None, {}
+            # Columns right of the session columns hold the course/lecturer list
+            panel_from = None
+            panel_state, lecturers = {}, []
+            for values in sheet.iter_rows(values_only=True):
+                cells = [v.strip() if isinstance(v, str) else v for v in values]
+                if not any(cells):
+                    continue
+                first = cells[0]
+
+                if normalize_day(first):
+                    day, kinds = normalize_day(first), {}
+                elif isinstance(first, str) and fold(first) == "ora":
+                    kinds = {
+                        column: "lecture" if fold(value).startswith("ligj") else "exercise"
+                        for column, value in enumerate(cells)
+                        if column > 0 and isinstance(value, str) and fold(value).startswith(("ligj", "ushtr"))
+                    }
+                    if panel_from is None and kinds:
+                        panel_from = max(kinds) + 1
+                if panel_from is not None:
+                    for cell in cells[panel_from:]:
+                        if isinstance(cell, str):
+                            _parse_panel_line(cell, panel_state, lecturers)
+
+                if normalize_day(first) or (isinstance(first, str) and fold(first) == "ora"):
+                    continue
+                elif day is None and isinstance(first, str):
+                    title_lines.append(first)
+                elif day and kinds and parse_time_range(first):
+                    start, end = parse_time_range(first)
+                    sessions = []
+                    for column, kind in kinds.items():
+                        cell = cells[column] if column < len(cells) else None
+                        if not isinstance(cell, str):
+                            continue
+                        for segment in cell.split(";"):
+                            session = parse_session(segment)
+                            if session:
+                                session["kind"] = kind
+                                session["start"] = _format_time(session["start"] if session["start"] is not None else start)
+                                session["end"] = _format_time(session["end"] if session["end"] is not None else end)
+                                sessions.append(session)
+                    if sessions:
+                        rows.append((day, _format_time(start), _format_time(end), sessions))
+
+            header = " - ".join(title_lines) or sheet.title
+            for day, start, end, sessions in rows:
+                lines = []
+                for session in sessions:
+                    entry = dict(session, day=day, source=source, lecturer=_find_lecturer(session, lecturers))
+                    entries.append(entry)
+                    lines.append(format_session(entry))
+                documents.append(Document(
+                    page_content=f"{header}\n{day}, ora {start}-{end}\n" + "\n".join(lines),
+                    metadata={
+                        "source": source,
+                        "file_path": source,
+                        "type": "timetable",
+                        "sheet": sheet.title,
+                        "day": day,
+                        "time": f"{start}-{end}",
+                    }
+                ))
+    finally:
+        workbook.close()
+    return documents, entries
+
+
+class ScheduleIndex:
+    """Timetable sessions with dict indexes on room, day and group for exact lookups."""
+
+    _FIELDS = ("room", "day", "group")
+
+    def __init__(self, entries: Iterable[Dict] = ()):
+        self.entries: List[Dict] = list(entries)
+        self._reindex()
+
+    def _reindex(self):
+        self._index: Dict[str, Dict[str, List[int]]] = {field: {} for field in self._FIELDS}
+        self._courses: Dict[str, List[int]] = {}
+        for position, entry in enumerate(self.entries):
+            self._index["room"].setdefault(entry["room"], []).append(position)
+            self._index["day"].setdefault(entry["day"], []).append(position)
+            for group in entry["group"].split("+"):
+                self._index["group"].setdefault(group_key(group), []).append(position)
+            self._courses.setdefault(fold(entry["course"]), []).append(position)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rooms(self) -> List[str]:
+        return sorted(room for room in self._index["room"] if room)
+
+    def courses(self) -> List[str]:
+        return sorted({entry["course"] for entry in self.entries})
+
+    def replace_source(self, source: str, entries: Iterable[Dict]):
+        """Swap the sessions read from one file (re-ingested timetable)."""
+        self.entries = [e for e in self.entries if e["source"] != source] + list(entries)
+        self._reindex()
+
+    def retain_sources(self, sources):
+        """Drop sessions of files that are no longer in the knowledge base."""
+        sources = set(sources)
+        self.entries = [e for e in self.entries if e["source"] in sources]
+        self._reindex()
+
+    def lookup(self, room: Optional[str] = None, day: Optional[str] = None,
+               group: Optional[str] = None, course: Optional[str] = None,
+               at: Optional[str] = None) -> List[Dict]:
+        """
+        Sessions matching every given filter, in weekly order. Room, day and
+        group are exact (normalized) dict lookups; course matches a
+        case/diacritic-insensitive substring; at ("10:00") keeps sessions
+        running at that time. An unknown day or an invalid time matches nothing.
+        """
+        candidates = []
+        if room is not None:
+            candidates.append(self._index["room"].get(normalize_room(room), []))
+        if day is not None:
+            candidates.append(self._index["day"].get(normalize_day(day), []))
+        if group is not None:
+            candidates.append(self._index["group"].get(group_key(group), []))
+        if course is not None:
+            wanted = fold(course)
+            candidates.append([p for key, positions in self._courses.items() if wanted in key for p in positions])
+
+        if candidates:
+            candidates.sort(key=len)
+            positions = set(candidates[0]).intersection(*candidates[1:])
+        else:
+            positions = range(len(self.entries))
+        results = [self.entries[p] for p in positions]
+
+        if at is not None:
+            time_range = parse_time_range(f"{at}-{at}")
+            if time_range is None:
+                return []
+            minute = time_range[0]
+            results = [
+                e for e in results
+                if _minutes(*e["start"].split(":")) <= minute < _minutes(*e["end"].split(":"))
+            ]
+        return sorted(results, key=lambda e: (DAYS.index(e["day"]), e["start"], e["kind"], e["group"]))
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"entries": self.entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path) -> "ScheduleIndex":
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(json.load(f)["entries"])
+
+
+def load_schedule_index(persist_directory) -> Optional[ScheduleIndex]:
+    """Load the schedule index written by ingest.py, or None if there is none."""
+    path = os.path.join(persist_directory, SCHEDULE_INDEX_FILE)
+    if not os.path.exists(path):
+        return None
+    return ScheduleIndex.load(path)
@@ -0,0 +1,72 @@
+"""
+Routing tests for the structured fast path (models/fast_path.py).
+
+Builds the router from the timetable and AdditionalInfo.txt in
+fiek_documents, so no vector database or OpenAI key is needed.
+
+Usage:
+    python test_fast_path.py      (or: python -m pytest test_fast_path.py)
+"""
+
+import glob
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from models.fast_path import IntentRouter, LookupIndex, extract_room_list
+from models.timetable import ScheduleIndex, load_timetable
+
+DOCUMENTS = Path(__file__).parent / "fiek_documents"
+
+
+def make_router():
+    sessions = []
+    for path in sorted(glob.glob(str(DOCUMENTS / "**" / "*.xlsx"), recursive=True)):
+        sessions += load_timetable(path, Path(path).name)[1]
+    rooms = extract_room_list((DOCUMENTS / "AdditionalInfo.txt").read_text(encoding="utf-8"))
+    return IntentRouter(ScheduleIndex(sessions), LookupIndex(rooms, []))
+
+
+def test_schedule_questions_take_the_fast_path():
+    router = make_router()
+    assert router.route("Kur është ligjërata e Fizikës?")["intent"] == "course_schedule"
+    assert router.route("What's in A411 on Monday?")["intent"] == "room_schedule"
+
+
+def test_non_schedule_questions_fall_back_to_rag():
+    router = make_router()
+    # "ka" ("has") names a course but asks nothing about the timetable
+    assert router.route("Sa kredite ka lënda Fizika?") is None
+    assert router.route("Çka ka Fizika?") is None
+    assert router.route("Kur është provimi i Fizikës?") is None
+    assert router.route("How many ECTS is Physics lecture?") is None
+
+
+def test_faculty_name_is_not_a_course():
+    router = make_router()
+    # Every "Bazat e inxhinierisë elektrike" style name shares words with the faculty's
+    assert router.route("When was the Faculty of Electrical and Computer Engineering founded?") is None
+    assert router.route("Kur është themeluar Fakulteti i Inxhinierisë Elektrike dhe Kompjuterike?") is None
+
+
+def test_room_list_needs_a_list_question():
+    router = make_router()
+    assert router.route("Lista e sallave")["intent"] == "room_list"
+    assert router.route("Cilat janë sallat?")["intent"] == "room_list"
+    assert router.route("List all rooms")["intent"] == "room_list"
+    assert router.route("Which lab has the most computers?") is None
+    assert router.route("Which rooms have projectors?") is None
+
+
+def test_room_list_has_only_rooms():
+    rooms = extract_room_list((DOCUMENTS / "AdditionalInfo.txt").read_text(encoding="utf-8"))
+    assert "A411" in rooms and "LabFiz" in rooms
+    assert "LAB" not in rooms
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✅ {name}")
@@ -0,0 +1,98 @@
+"""
+Tests for the concurrent fetch stage (models/fetcher.py) against a local
+http.server, so no network access is needed.
+
+Usage:
+    python -m pytest test_fetcher.py
+"""
+
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from models.fetcher import ConcurrentFetcher
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """/page/<n> returns "page <n>", /missing is a 404 and /broken always a 503."""
+
+    def do_GET(self):
+        self.server.requests.append((self.headers["Host"].split(":")[0], self.path, time.monotonic()))
+        if self.path.startswith("/page/"):
+            body = f"page {self.path.rsplit('/', 1)[1]}".encode()
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.send_response(404 if self.path == "/missing" else 503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def base_url(server, host="127.0.0.1"):
+    return f"http://{host}:{server.server_port}"
+
+
+def test_results_keep_input_order(server):
+    fetcher = ConcurrentFetcher(max_workers=8, rate_per_host=200, burst=8)
+    urls = [f"{base_url(server)}/page/{n}" for n in range(20)]
+    assert fetcher.map(lambda url: fetcher.get(url).text, urls) == [f"page {n}" for n in range(20)]
+
+
+def test_rate_limit_is_per_host(server):
+    rate = 10.0
+    fetcher = ConcurrentFetcher(max_workers=8, rate_per_host=rate, burst=1)
+    # Two host names for the same server are limited separately
+    urls = [f"{base_url(server, host)}/page/{n}" for n in range(5) for host in ("127.0.0.1", "localhost")]
+    fetcher.map(fetcher.get, urls)
+
+    spans = {}
+    for host in ("127.0.0.1", "localhost"):
+        times = sorted(t for h, _, t in server.requests if h == host)
+        assert len(times) == 5
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        # Timer and scheduling jitter aside, no two requests come closer than 1/rate
+        assert min(gaps) >= 0.8 / rate
+        spans[host] = (times[0], times[-1])
+    # ...while the hosts are fetched at the same time, not one after the other
+    (first_a, last_a), (first_b, last_b) = spans.values()
+    assert first_a < last_b and first_b < last_a
+
+
+def test_failures_are_isolated_per_url(server):
+    fetcher = ConcurrentFetcher(max_workers=4, rate_per_host=200, burst=8, max_retries=2, backoff_base=0.01)
+    urls = [f"{base_url(server)}{path}" for path in ("/page/1", "/missing", "/page/2", "/broken", "/page/3")]
+
+    def fetch(url):
+        try:
+            return fetcher.get(url).text
+        except requests.RequestException as e:
+            return type(e).__name__
+
+    assert fetcher.map(fetch, urls) == ["page 1", "HTTPError", "page 2", "HTTPError", "page 3"]
+    attempts = [path for _, path, _ in server.requests]
+    # Only the 503 is retried; the other URLs are requested once
+    assert attempts.count("/broken") == 3
+    assert all(attempts.count(path) == 1 for path in ("/page/1", "/missing", "/page/2", "/page/3"))
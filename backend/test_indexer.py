@@ -0,0 +1,106 @@
+"""
+Tests for the batched embedding writer (models/indexer.py) with a fake
+embedding function and an in-memory store, so no OpenAI key or Chroma
+database is needed.
+
+Usage:
+    python -m pytest test_indexer.py
+"""
+
+import hashlib
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+from langchain_core.documents import Document
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from models.indexer import EmbeddingWriter, estimate_tokens
+
+
+def fake_embedding(text, dimension=8):
+    """Deterministic vector derived from the text's hash."""
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    return [b / 255 for b in digest[:dimension]]
+
+
+class InMemoryStore:
+    """add_texts() like a vectorstore; fails every call after `fail_after` successful ones."""
+
+    def __init__(self, fail_after=None):
+        self.vectors = {}
+        self.calls = []
+        self.fail_after = fail_after
+        self._lock = threading.Lock()
+
+    def add_texts(self, texts, metadatas=None, ids=None):
+        with self._lock:
+            if self.fail_after is not None and len(self.calls) >= self.fail_after:
+                raise RuntimeError("embedding API unavailable")
+            self.calls.append(list(ids))
+        for chunk_id, text in zip(ids, texts):
+            self.vectors[chunk_id] = fake_embedding(text)
+        return ids
+
+
+def make_chunks(n):
+    # Varying lengths so batches close on the token budget at different sizes
+    return [(f"chunk-{i}", Document(page_content=f"chunk {i} " + "word " * (5 + 7 * (i % 9)),
+                                    metadata={"source": f"doc-{i // 10}"}))
+            for i in range(n)]
+
+
+def test_batches_stay_within_token_and_item_limits():
+    chunks = make_chunks(200)
+    tokens = {chunk_id: estimate_tokens(doc.page_content) for chunk_id, doc in chunks}
+    store = InMemoryStore()
+    writer = EmbeddingWriter(store, batch_tokens=300, max_items=12, max_workers=3)
+
+    assert writer.write_stream(iter(chunks)) == len(chunks)
+    assert len(store.calls) > 1
+    for ids in store.calls:
+        assert len(ids) <= 12
+        assert len(ids) == 1 or sum(tokens[i] for i in ids) <= 300
+    assert sorted(i for ids in store.calls for i in ids) == sorted(tokens)
+
+
+def test_oversized_chunk_gets_its_own_batch():
+    big = ("big", Document(page_content="word " * 2000, metadata={}))
+    store = InMemoryStore()
+    EmbeddingWriter(store, batch_tokens=100, max_workers=1).write_stream(iter(make_chunks(3) + [big]))
+    assert ["big"] in store.calls
+
+
+@pytest.mark.parametrize("failure", ["store", "producer"])
+def test_resume_from_checkpoint_after_failure(tmp_path, failure):
+    chunks = make_chunks(120)
+    checkpoint = tmp_path / "embed_checkpoint.jsonl"
+
+    def items():
+        for i, chunk in enumerate(chunks):
+            if failure == "producer" and i == 70:
+                raise ValueError("split stage failed")
+            yield chunk
+
+    store = InMemoryStore(fail_after=4 if failure == "store" else None)
+    writer = EmbeddingWriter(store, batch_tokens=200, max_workers=2, max_retries=0,
+                             checkpoint_path=str(checkpoint))
+    with pytest.raises((RuntimeError, ValueError)):
+        writer.write_stream(items())
+    assert checkpoint.exists()
+    first_run = {i for ids in store.calls for i in ids}
+    assert 0 < len(first_run) < len(chunks)
+
+    # Same store, healthy this time: only the missing chunks are embedded
+    store.fail_after = None
+    calls_before = len(store.calls)
+    resumed = EmbeddingWriter(store, batch_tokens=200, max_workers=2, checkpoint_path=str(checkpoint))
+    assert resumed.write_stream(iter(chunks)) == len(chunks) - len(first_run)
+
+    written = [i for ids in store.calls for i in ids]
+    assert len(written) == len(set(written)), "a chunk was embedded twice"
+    assert set(written) == {chunk_id for chunk_id, _ in chunks}
+    assert not {i for ids in store.calls[calls_before:] for i in ids} & first_run
+    assert not checkpoint.exists()
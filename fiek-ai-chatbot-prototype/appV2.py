@@ -7,6 +7,8 @@ from langchain_core.runnables import RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
 from dotenv import load_dotenv
 
+from models.embedding_cache import CachedEmbeddings
+
 load_dotenv()
 
 st.set_page_config(page_title="FIEK Assistant", layout="centered")
@@ -14,7 +16,7 @@ st.title("🤖 FIEK AI Assistant")
 
 @st.cache_resource
 def get_vectorstore():
-    embedding = OpenAIEmbeddings(model="text-embedding-3-small")
+    embedding = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small"))
     vectorstore = Chroma(persist_directory="./fiek_db", embedding_function=embedding)
     return vectorstore
 
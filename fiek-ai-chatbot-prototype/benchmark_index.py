@@ -0,0 +1,175 @@
+"""
+Recall vs latency benchmark for the FIEKChatbot index types.
+
+Builds every index type from models/index_factory.py over the same
+normalized vectors and compares its top-k results with the exact flat
+index while sweeping nprobe (IVF) and efSearch (HNSW), then compares the
+vector storages (float32/float16/int8/pq) by memory per 100k chunks.
+
+Vectors are either synthetic (overlapping clusters, like real chunk
+embeddings, queried with held-out points from the same distribution) or
+the chatbot's own knowledge base chunks encoded with its embedding model
+(queried with noisy copies of chunks). An index type that fell back to
+flat for lack of training data is reported as such.
+
+    python benchmark_index.py --synthetic 100000
+    python benchmark_index.py --knowledge-base
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from models.index_factory import VECTOR_STORAGES, create_index, describe_index, set_search_params
+
+NPROBE_SWEEP = (1, 2, 4, 8, 16, 32, 64)
+EF_SEARCH_SWEEP = (16, 32, 64, 128, 256)
+
+
+def synthetic_vectors(n, dimension=384, clusters=200, spread=1.0, seed=0):
+    """
+    Normalized vectors scattered around random centroids. With spread
+    around 1 the clusters overlap, so nearest neighbours often sit in a
+    neighbouring cluster as they do for real embeddings.
+    """
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dimension)).astype('float32')
+    vectors = centroids[rng.integers(0, clusters, n)] + spread * rng.standard_normal((n, dimension)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def knowledge_base_vectors():
+    from models.chatbot_model import FIEKChatbot
+    chatbot = FIEKChatbot(use_index_cache=False)
+    texts = [doc['text'] for doc in chatbot.documents if doc is not None]
+    return chatbot._encode(texts)
+
+
+def make_queries(vectors, n_queries, noise=1.0, seed=1):
+    """
+    Corpus vectors plus noise of norm about `noise` (the vectors have norm
+    1), so a query is near its source chunk without being a copy of it.
+    """
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.integers(0, len(vectors), n_queries)].copy()
+    queries += noise * rng.standard_normal(queries.shape).astype('float32') / np.sqrt(vectors.shape[1])
+    faiss.normalize_L2(queries)
+    return queries
+
+
+def recall_at_k(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def timed_search(index, queries, k):
+    """(results, batched ms/query, single-query ms/query)."""
+    start = time.perf_counter()
+    _, found = index.search(queries, k)
+    batched = (time.perf_counter() - start) * 1000 / len(queries)
+    single_queries = queries[:min(200, len(queries))]
+    start = time.perf_counter()
+    for q in single_queries:
+        index.search(q[None, :], k)
+    single = (time.perf_counter() - start) * 1000 / len(single_queries)
+    return found, batched, single
+
+
+def index_bytes(index):
+    return faiss.serialize_index(index).nbytes
+
+
+def index_label(index_type, index):
+    """describe_index(), flagging an index type that create_index() replaced with flat."""
+    if index_type == "hnsw":
+        trained = isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW)
+    else:
+        trained = faiss.try_extract_index_ivf(index) is not None
+    if trained:
+        return describe_index(index)
+    return f"{index_type} -> {describe_index(index)} (fallback)"
+
+
+def run(vectors, queries, k, index_params):
+    n, dimension = vectors.shape
+    ids = np.arange(n, dtype='int64')
+
+    print(f"{n} vectors x {dimension} dims, {len(queries)} queries, recall@{k} vs flat")
+    print("=" * 88)
+    print(f"{'index':<40}{'build s':>9}{'MB':>8}{'recall':>9}{'batch ms/q':>11}{'single ms/q':>12}")
+    print("-" * 88)
+
+    flat = create_index("flat", dimension)
+    start = time.perf_counter()
+    flat.add_with_ids(vectors, ids)
+    build = time.perf_counter() - start
+    truth, batched, single = timed_search(flat, queries, k)
+    print(f"{describe_index(flat):<40}{build:>9.2f}{index_bytes(flat) / 1e6:>8.1f}{1.0:>9.3f}{batched:>11.3f}{single:>12.3f}")
+
+    for index_type in ("ivf_flat", "ivf_pq", "hnsw"):
+        start = time.perf_counter()
+        index = create_index(index_type, dimension, vectors, **index_params.get(index_type, {}))
+        index.add_with_ids(vectors, ids)
+        build = time.perf_counter() - start
+        size = index_bytes(index) / 1e6
+
+        if index_type == "hnsw":
+            sweep = [dict(ef_search=ef) for ef in EF_SEARCH_SWEEP]
+        elif faiss.try_extract_index_ivf(index) is not None:
+            sweep = [dict(nprobe=p) for p in NPROBE_SWEEP if p <= faiss.try_extract_index_ivf(index).nlist]
+        else:
+            sweep = [{}]  # fell back to flat
+        for params in sweep:
+            set_search_params(index, **params)
+            found, batched, single = timed_search(index, queries, k)
+            print(f"{index_label(index_type, index):<40}{build:>9.2f}{size:>8.1f}"
+                  f"{recall_at_k(found, truth):>9.3f}{batched:>11.3f}{single:>12.3f}")
+        print("-" * 88)
+
+    print()
+    print(f"{'flat index storage':<40}{'MB/100k':>9}{'recall':>9}{'batch ms/q':>11}")
+    print("-" * 69)
+    for storage in VECTOR_STORAGES:
+        index = create_index("flat", dimension, vectors, storage=storage, **index_params.get("storage", {}))
+        index.add_with_ids(vectors, ids)
+        found, batched, _ = timed_search(index, queries, k)
+        per_100k = index_bytes(index) / 1e6 * 100_000 / n
+        print(f"{storage + ' ' + describe_index(index):<40}{per_100k:>9.1f}"
+              f"{recall_at_k(found, truth):>9.3f}{batched:>11.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--synthetic", type=int, default=50000, help="number of synthetic vectors")
+    source.add_argument("--knowledge-base", action="store_true", help="encode the chatbot's knowledge base")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--spread", type=float, default=1.0, help="synthetic cluster spread (higher = more overlap)")
+    parser.add_argument("--query-noise", type=float, default=1.0, help="noise added to knowledge base queries")
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default ~4*sqrt(N))")
+    parser.add_argument("--pq-m", type=int, default=48, help="PQ sub-quantizers")
+    parser.add_argument("--hnsw-m", type=int, default=32, help="HNSW neighbours per node")
+    args = parser.parse_args()
+
+    if args.knowledge_base:
+        vectors = knowledge_base_vectors()
+        queries = make_queries(vectors, args.queries, noise=args.query_noise)
+    else:
+        # Queries are held out: drawn from the same clusters, not in the index
+        vectors = synthetic_vectors(args.synthetic + args.queries, spread=args.spread)
+        vectors, queries = vectors[:args.synthetic], vectors[args.synthetic:]
+    run(vectors, queries, args.k, {
+        "ivf_flat": {"nlist": args.nlist},
+        "ivf_pq": {"nlist": args.nlist, "pq_m": args.pq_m},
+        "hnsw": {"hnsw_m": args.hnsw_m},
+        "storage": {"pq_m": args.pq_m},
+    })
@@ -0,0 +1,18 @@
+"""
+Conditional HTTP cache for scrape_data.py.
+
+The implementation is the backend's (backend/models/http_cache.py). It is
+loaded from its file rather than by putting backend/models on sys.path,
+so the scraper doesn't pick up the backend's other modules.
+"""
+
+import importlib.util
+from pathlib import Path
+
+_PATH = Path(__file__).resolve().parents[2] / "backend" / "models" / "http_cache.py"
+_spec = importlib.util.spec_from_file_location("backend_http_cache", _PATH)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+CachingAdapter = _module.CachingAdapter
+HttpCache = _module.HttpCache
@@ -1,6 +1,10 @@
 """
 Data collection script for FIEK chatbot.
 Scrapes web pages and extracts content from PDFs.
+
+Requests go through a conditional HTTP cache (ETag/Last-Modified); a page
+or PDF the server reports as not modified reuses its entry from the last
+collected_data.json instead of being downloaded and parsed again.
 """
 
 import requests
@@ -11,9 +15,20 @@ import os
 from pathlib import Path
 import time
 
+try:
+    from .http_cache import CachingAdapter, HttpCache
+except ImportError:
+    from http_cache import CachingAdapter, HttpCache
+
 BASE_URL = "https://fiek.uni-pr.edu"
 DATA_DIR = Path(__file__).parent.parent / "knowledge_base" / "raw_data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
+CACHE_DIR = Path(__file__).parent.parent / "knowledge_base" / "http_cache"
+
+SESSION = requests.Session()
+_adapter = CachingAdapter(HttpCache(str(CACHE_DIR)))
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
 
 # Headers to mimic a real browser and avoid 403 errors
 # Note: Using only gzip, deflate (not br/Brotli) as requests handles these automatically
@@ -30,12 +45,15 @@ HEADERS = {
     'Cache-Control': 'max-age=0',
 }
 
-def scrape_web_page(url, title):
-    """Scrape content from a web page."""
+def scrape_web_page(url, title, previous=None):
+    """Scrape content from a web page (previous: its last collected entry)."""
     try:
         print(f"Scraping: {title}")
-        response = requests.get(url, headers=HEADERS, timeout=30)
+        response = SESSION.get(url, headers=HEADERS, timeout=30)
         response.raise_for_status()
+        if response.from_cache and previous:
+            print("  Not modified, reusing collected content")
+            return {**previous, "title": title}
         
         # Ensure proper encoding - requests handles decompression automatically
         if not response.encoding or response.encoding == 'ISO-8859-1':
@@ -67,8 +85,8 @@ def scrape_web_page(url, title):
         print(f"Error scraping {url}: {e}")
         return None
 
-def extract_pdf_content(pdf_url, title):
-    """Extract text content from a PDF."""
+def extract_pdf_content(pdf_url, title, previous=None):
+    """Extract text content from a PDF (previous: its last collected entry)."""
     try:
         print(f"Extracting PDF: {title}")
         # Use simpler headers for PDFs
@@ -76,8 +94,11 @@ def extract_pdf_content(pdf_url, title):
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'application/pdf,application/octet-stream,*/*',
         }
-        response = requests.get(pdf_url, headers=pdf_headers, timeout=60)
+        response = SESSION.get(pdf_url, headers=pdf_headers, timeout=60)
         response.raise_for_status()
+        if response.from_cache and previous:
+            print("  Not modified, reusing collected content")
+            return {**previous, "title": title}
         
         # Save PDF temporarily
         pdf_path = DATA_DIR / f"{title.replace(' ', '_')}.pdf"
@@ -148,12 +169,22 @@ def collect_all_data():
     ]
     
     all_data = []
+    output_file = DATA_DIR.parent / "collected_data.json"
+    
+    # Entries from the last run, reused for sources that have not changed
+    previous = {}
+    if output_file.exists():
+        try:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                previous = {item.get("url"): item for item in json.load(f) if item.get("url")}
+        except (OSError, ValueError) as e:
+            print(f"Could not read previous {output_file.name}: {e}")
     
     for url, title, source_type in data_sources:
         if source_type == "web":
-            data = scrape_web_page(url, title)
+            data = scrape_web_page(url, title, previous.get(url))
         else:
-            data = extract_pdf_content(url, title)
+            data = extract_pdf_content(url, title, previous.get(url))
         
         if data:
             all_data.append(data)
@@ -161,11 +192,12 @@ def collect_all_data():
         time.sleep(2)  # Be respectful with requests
     
     # Save collected data
-    output_file = DATA_DIR.parent / "collected_data.json"
     with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(all_data, f, ensure_ascii=False, indent=2)
     
+    stats = _adapter.cache.stats()
     print(f"\nCollected {len(all_data)} documents")
+    print(f"HTTP cache: {stats['hits']} not modified, {stats['misses']} downloaded")
     print(f"Data saved to {output_file}")
     
     return all_data
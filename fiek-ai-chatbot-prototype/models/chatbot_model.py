@@ -3,6 +3,7 @@ Chatbot model using RAG (Retrieval Augmented Generation) approach.
 Supports bilingual queries in English and Albanian.
 """
 
+import hashlib
 import json
 import os
 from pathlib import Path
@@ -12,12 +13,43 @@ import faiss
 from typing import List, Dict, Tuple
 import re
 
+from .chunk_store import ChunkStore
+from .index_factory import create_index, describe_index, set_search_params
+from .index_store import INDEX_FILE, corpus_fingerprint, load_index, read_index, save_index
+
+MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+EMBEDDING_DIM = 384  # Dimension for multilingual-MiniLM
+# Version of the chunking logic, part of the index cache fingerprint
+CHUNKER = "word-offsets-1"
+# Lookup table of the code points str.split() treats as whitespace (all
+# are below U+3001); the last entry stands for every higher code point
+_SPACE_TABLE = np.zeros(0x3002, dtype=bool)
+_SPACE_TABLE[[c for c in range(0x3001) if chr(c).isspace()]] = True
+# Search hits scoring at or below this are not used in answers or sources
+RELEVANCE_THRESHOLD = 0.3
+# Compact the index once this share of its vectors belongs to removed documents
+COMPACT_RATIO = 0.2
+
 class FIEKChatbot:
-    def __init__(self, knowledge_base_path: str = None):
-        """Initialize the chatbot with knowledge base."""
+    def __init__(self, knowledge_base_path: str = None, index_dir: str = None, use_index_cache: bool = True,
+                 index_type: str = "flat", index_params: Dict = None, nprobe: int = 8, ef_search: int = 64,
+                 vector_storage: str = "float32"):
+        """
+        Initialize the chatbot with knowledge base.
+        
+        The search index is cached in index_dir (default: knowledge_base/index)
+        and memory-mapped on later starts while the knowledge base is unchanged.
+        index_type is "flat" (exact), "ivf_flat", "ivf_pq" or "hnsw"; index_params
+        are build options for models.index_factory.create_index (nlist, pq_m,
+        hnsw_m, ...), nprobe/ef_search are the IVF/HNSW query-time knobs.
+        vector_storage is "float32", "float16", "int8" or "pq" to trade a
+        little recall for index memory (see benchmark_index.py).
+        """
         # Load multilingual model for Albanian and English
         print("Loading language model...")
-        self.model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+        self.model = SentenceTransformer(MODEL_NAME)
         
         # Load knowledge base
         if knowledge_base_path is None:
@@ -26,13 +58,78 @@ class FIEKChatbot:
             kb_path = Path(knowledge_base_path)
         
         self.knowledge_base = self._load_knowledge_base(kb_path)
+        self._assign_doc_ids()
+        self.index_dir = Path(index_dir) if index_dir else kb_path.parent / "index"
+        self.use_index_cache = use_index_cache
+        self.index_type = index_type
+        self.index_params = dict(index_params or {})
+        self.index_params.setdefault('storage', vector_storage)
+        self.nprobe = nprobe
+        self.ef_search = ef_search
         
-        # Build search index
-        print("Building search index...")
-        self.index, self.documents = self._build_index()
+        # Load the cached search index, or build it
+        self._index_mapped = False
+        self.index, self.documents = self._load_or_build_index()
+        set_search_params(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
+        print(f"Search index: {describe_index(self.index)}")
+        
+        # doc id -> chunk ids in the index; chunk ids of removed documents
+        # stay in the index as tombstones until the next compaction
+        self.doc_chunks: Dict[str, List[int]] = {}
+        for chunk_id in range(len(self.documents)):
+            doc_id = self.documents.doc_id(chunk_id)
+            if doc_id is not None:
+                self.doc_chunks.setdefault(doc_id, []).append(chunk_id)
+        self.tombstones = set()
         
         print("Chatbot initialized successfully!")
     
+    def _assign_doc_ids(self):
+        """Give every knowledge base entry a stable 'id' (title + url, suffixed when repeated)."""
+        seen = set()
+        for doc in self.knowledge_base:
+            if doc.get('id'):
+                seen.add(doc['id'])
+        for doc in self.knowledge_base:
+            if doc.get('id'):
+                continue
+            base = hashlib.sha1(f"{doc.get('title', '')}|{doc.get('url', '')}".encode('utf-8')).hexdigest()[:16]
+            doc_id, n = base, 1
+            while doc_id in seen:
+                n += 1
+                doc_id = f"{base}-{n}"
+            doc['id'] = doc_id
+            seen.add(doc_id)
+    
+    def _fingerprint(self) -> str:
+        """Identifies the knowledge base and the settings the index was built with."""
+        return corpus_fingerprint(
+            self.knowledge_base,
+            model=MODEL_NAME,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+            chunker=CHUNKER,
+            index_type=self.index_type,
+            index_params=self.index_params
+        )
+    
+    def _load_or_build_index(self) -> Tuple[faiss.Index, ChunkStore]:
+        """Memory-map the cached index if it matches the knowledge base, else rebuild and cache it."""
+        fingerprint = self._fingerprint()
+        if self.use_index_cache and self.knowledge_base:
+            cached = load_index(self.index_dir, fingerprint)
+            if cached is not None:
+                print(f"Loaded search index from {self.index_dir} ({cached[0].ntotal} chunks)")
+                self._index_mapped = True
+                return cached
+        
+        print("Building search index...")
+        index, documents = self._build_index()
+        if self.use_index_cache and len(documents):
+            save_index(self.index_dir, index, documents, fingerprint)
+            print(f"Saved search index to {self.index_dir}")
+        return index, documents
+    
     def _load_knowledge_base(self, path: Path) -> List[Dict]:
         """Load knowledge base from JSON file."""
         if not path.exists():
@@ -43,82 +140,99 @@ class FIEKChatbot:
         with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     
-    def _chunk_text(self, text: str, chunk_size: int = 500, overlap: int = 100) -> List[str]:
-        """Split text into overlapping chunks."""
-        words = text.split()
-        chunks = []
-        
-        for i in range(0, len(words), chunk_size - overlap):
-            chunk = ' '.join(words[i:i + chunk_size])
-            chunks.append(chunk)
-        
-        return chunks
+    def _chunk_spans(self, text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[Tuple[int, int]]:
+        """
+        (start, end) character offsets of overlapping windows of chunk_size
+        words, advancing chunk_size - overlap words at a time (the same
+        windows as text.split()). Word boundaries are found with array
+        operations over the code points; no per-word strings are created.
+        """
+        code_points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+        is_word = ~_SPACE_TABLE[np.minimum(code_points, len(_SPACE_TABLE) - 1)]
+        # Positions where a word starts or ends, alternating
+        bounds = np.flatnonzero(np.diff(is_word, prepend=False, append=False))
+        if not bounds.size:
+            return []
+        word_starts, word_ends = bounds[0::2], bounds[1::2]
+        first_words = np.arange(0, len(word_starts), chunk_size - overlap)
+        last_words = np.minimum(first_words + chunk_size, len(word_starts)) - 1
+        return list(zip(word_starts[first_words].tolist(), word_ends[last_words].tolist()))
     
-    def _build_index(self) -> Tuple[faiss.Index, List[Dict]]:
-        """Build FAISS index for semantic search."""
-        if not self.knowledge_base:
-            # Create empty index
-            dimension = 384  # Dimension for multilingual-MiniLM
-            index = faiss.IndexFlatL2(dimension)
-            return index, []
-        
-        documents = []
+    def _chunk_text(self, text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
+        """Split text into overlapping chunks (slices of the original text)."""
+        return [text[start:end] for start, end in self._chunk_spans(text, chunk_size, overlap)]
+    
+    def _new_index(self, dimension: int = EMBEDDING_DIM, train_vectors: np.ndarray = None) -> faiss.Index:
+        """
+        Empty index whose vector ids are chunk ids (positions in self.documents);
+        IVF types are trained on train_vectors.
+        """
+        index = create_index(self.index_type, dimension, train_vectors, **self.index_params)
+        set_search_params(index, nprobe=self.nprobe, ef_search=self.ef_search)
+        return index
+    
+    def _encode(self, texts: List[str], show_progress_bar: bool = False) -> np.ndarray:
+        """Embed texts as normalized float32 vectors (inner product = cosine)."""
+        embeddings = np.asarray(self.model.encode(texts, show_progress_bar=show_progress_bar), dtype='float32')
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _build_index(self) -> Tuple[faiss.Index, ChunkStore]:
+        """
+        Build FAISS index for semantic search. Chunk metadata goes into a
+        ChunkStore (start/end are character offsets in the entry's content).
+        """
+        documents = ChunkStore()
         texts = []
-        
         for doc in self.knowledge_base:
-            # Split document into chunks
-            chunks = self._chunk_text(doc['content'])
-            
-            for i, chunk in enumerate(chunks):
-                documents.append({
-                    'title': doc['title'],
-                    'url': doc.get('url', ''),
-                    'chunk_index': i,
-                    'text': chunk,
-                    'type': doc.get('type', 'web_page')
-                })
-                texts.append(chunk)
+            spans = self._chunk_spans(doc['content'])
+            documents.add_document(doc, spans)
+            texts.extend(doc['content'][start:end] for start, end in spans)
         
         if not texts:
-            dimension = 384
-            index = faiss.IndexFlatL2(dimension)
-            return index, []
+            # Create empty index
+            return self._new_index(), documents
         
         # Generate embeddings
         print(f"Generating embeddings for {len(texts)} chunks...")
-        embeddings = self.model.encode(texts, show_progress_bar=True)
-        
-        # Normalize embeddings for cosine similarity
-        faiss.normalize_L2(embeddings)
+        embeddings = self._encode(texts, show_progress_bar=True)
+        del texts
         
         # Create FAISS index
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
-        index.add(embeddings.astype('float32'))
+        index = self._new_index(embeddings.shape[1], train_vectors=embeddings)
+        index.add_with_ids(embeddings, np.arange(len(documents), dtype='int64'))
         
         return index, documents
     
     def _search(self, query: str, top_k: int = 3) -> List[Dict]:
         """Search for relevant documents."""
-        if not self.documents:
-            return []
+        return self._search_batch([query], top_k)[0]
+    
+    def _search_batch(self, queries: List[str], top_k: int = 3) -> List[List[Dict]]:
+        """Search for several queries with one encode call and one index search."""
+        if not self.doc_chunks:
+            return [[] for _ in queries]
         
-        # Encode query
-        query_embedding = self.model.encode([query])
-        faiss.normalize_L2(query_embedding)
+        # Encode queries
+        query_embeddings = self._encode(list(queries))
         
-        # Search
-        distances, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        # Search, over-fetching by the number of tombstoned vectors
+        k = min(top_k + len(self.tombstones), self.index.ntotal)
+        distances, indices = self.index.search(query_embeddings, k)
         
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.documents):
-                results.append({
-                    'document': self.documents[idx],
-                    'score': float(distances[0][i])
-                })
+        # Keep the first top_k live hits of each row
+        valid = indices >= 0
+        if self.tombstones:
+            valid &= ~np.isin(indices, np.fromiter(self.tombstones, dtype='int64'))
+        valid &= np.cumsum(valid, axis=1) <= top_k
         
-        return results
+        return [
+            [
+                {'document': self.documents[idx], 'score': float(score)}
+                for idx, score in zip(row_indices[row_valid], row_distances[row_valid])
+            ]
+            for row_indices, row_distances, row_valid in zip(indices, distances, valid)
+        ]
     
     def _generate_response(self, query: str, context: List[Dict]) -> str:
         """Generate response based on query and context."""
@@ -126,7 +240,7 @@ class FIEKChatbot:
             return "I'm sorry, I couldn't find relevant information to answer your question. Please try rephrasing your query or ask about FIEK's programs, staff, schedules, or other institutional information."
         
         # Filter results by relevance (score > 0.3)
-        relevant_context = [r for r in context if r['score'] > 0.3]
+        relevant_context = [r for r in context if r['score'] > RELEVANCE_THRESHOLD]
         
         if not relevant_context:
             return "I couldn't find highly relevant information. Could you please rephrase your question or ask about a specific topic like academic programs, staff, schedules, or regulations?"
@@ -170,12 +284,25 @@ class FIEKChatbot:
         """Answer a user query."""
         # Search for relevant information
         results = self._search(query, top_k)
-        
+        return self._build_answer(query, results)
+    
+    def answer_batch(self, queries: List[str], top_k: int = 3) -> List[Dict]:
+        """
+        Answer several queries at once (evaluation, FAQ precomputation).
+        Same results as calling answer() for each query, but the queries are
+        encoded in one model.encode call and searched in one index.search.
+        """
+        if not queries:
+            return []
+        batch_results = self._search_batch(queries, top_k)
+        return [self._build_answer(query, results) for query, results in zip(queries, batch_results)]
+    
+    def _build_answer(self, query: str, results: List[Dict]) -> Dict:
         # Generate response
         response = self._generate_response(query, results)
         
         # Get unique sources
-        sources = list(set([r['document']['title'] for r in results if r['score'] > 0.3]))
+        sources = list(set([r['document']['title'] for r in results if r['score'] > RELEVANCE_THRESHOLD]))
         
         return {
             'response': response,
@@ -183,17 +310,98 @@ class FIEKChatbot:
             'confidence': float(results[0]['score']) if results else 0.0
         }
     
-    def add_custom_data(self, title: str, content: str, url: str = "", doc_type: str = "custom"):
-        """Add custom data to knowledge base (e.g., Student Council info)."""
+    def add_custom_data(self, title: str, content: str, url: str = "", doc_type: str = "custom",
+                        doc_id: str = None) -> str:
+        """
+        Add custom data to knowledge base (e.g., Student Council info).
+        Only the new document is encoded. Returns its id; adding with an
+        existing id replaces that document.
+        """
         new_doc = {
             "title": title,
             "url": url,
             "content": content,
             "type": doc_type
         }
+        if doc_id:
+            new_doc["id"] = doc_id
+        return self.add_document(new_doc)
+    
+    def _make_writable(self):
+        """A memory-mapped index is read-only; load it into memory before the first change."""
+        if self._index_mapped:
+            self.index = read_index(self.index_dir / INDEX_FILE, mmap=False)
+            set_search_params(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
+            self._index_mapped = False
+    
+    def add_document(self, doc: Dict) -> str:
+        """Encode one knowledge base entry and add its chunks to the index."""
+        if doc.get('id') in self.doc_chunks:
+            self.remove_document(doc['id'])
+        self.knowledge_base.append(doc)
+        if not doc.get('id'):
+            self._assign_doc_ids()
         
-        self.knowledge_base.append(new_doc)
-        
-        # Rebuild index
-        self.index, self.documents = self._build_index()
+        spans = self._chunk_spans(doc['content'])
+        self.doc_chunks[doc['id']] = []
+        if spans:
+            self._make_writable()
+            embeddings = self._encode([doc['content'][start:end] for start, end in spans])
+            chunk_ids = self.documents.add_document(doc, spans)
+            self.index.add_with_ids(embeddings, chunk_ids)
+            self.doc_chunks[doc['id']] = chunk_ids.tolist()
+        return doc['id']
+    
+    def remove_document(self, doc_id: str) -> bool:
+        """
+        Remove a document by id. Its vectors are tombstoned (skipped by
+        search) and dropped from the index by the next compaction.
+        """
+        chunk_ids = self.doc_chunks.pop(doc_id, None)
+        if chunk_ids is None:
+            return False
+        self.knowledge_base = [doc for doc in self.knowledge_base if doc.get('id') != doc_id]
+        for chunk_id in chunk_ids:
+            self.documents[chunk_id] = None
+        self.tombstones.update(chunk_ids)
+        if self.index.ntotal and len(self.tombstones) > COMPACT_RATIO * self.index.ntotal:
+            self.compact()
+        return True
+    
+    def update_document(self, doc_id: str, **fields) -> str:
+        """Replace a document's title, url, content or type, re-encoding only that document."""
+        current = next((doc for doc in self.knowledge_base if doc.get('id') == doc_id), None)
+        if current is None:
+            raise KeyError(f"Unknown document id: {doc_id}")
+        return self.add_document({**current, **fields, 'id': doc_id})
+    
+    def memory_usage(self) -> Dict:
+        """Approximate resident bytes of the search index and chunk metadata."""
+        index_bytes = faiss.serialize_index(self.index).nbytes
+        metadata_bytes = self.documents.nbytes()
+        chunks = max(self.index.ntotal, 1)
+        return {
+            'chunks': int(self.index.ntotal),
+            'index_bytes': int(index_bytes),
+            'metadata_bytes': int(metadata_bytes),
+            'bytes_per_100k_chunks': int((index_bytes + metadata_bytes) * 100_000 / chunks)
+        }
+    
+    def compact(self):
+        """Drop tombstoned vectors from the index. Chunk ids of live documents don't change."""
+        if not self.tombstones:
+            return
+        self._make_writable()
+        removed = np.array(sorted(self.tombstones), dtype='int64')
+        try:
+            self.index.remove_ids(removed)
+        except RuntimeError:
+            # Index types without remove_ids (e.g. HNSW): re-add the surviving
+            # vectors to a fresh index; nothing is re-encoded
+            live_ids = np.array(sorted(c for ids in self.doc_chunks.values() for c in ids), dtype='int64')
+            vectors = np.vstack([self.index.reconstruct(int(c)) for c in live_ids]) if len(live_ids) else None
+            self.index = self._new_index(self.index.d, train_vectors=vectors)
+            if vectors is not None:
+                self.index.add_with_ids(vectors, live_ids)
+        self.tombstones.clear()
 
@@ -0,0 +1,194 @@
+"""
+Compact chunk metadata for the FIEKChatbot search index.
+
+Instead of one dict per chunk holding a copy of the chunk text, chunk
+metadata is kept in typed arrays (about 40 bytes per chunk), with the
+title, url and type stored once per document. The document contents
+are stored once as UTF-8 in a text file. It is memory-mapped from the
+index cache, and a chunk's text is decoded from its byte offsets only
+when a search returns that chunk.
+
+ChunkStore behaves like the list of chunk dicts it replaces: indexing by
+chunk id returns a dict (or None for removed chunks).
+"""
+
+import json
+import mmap
+import os
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+CHUNKS_FILE = "chunks.npz"
+DOCS_FILE = "chunk_docs.json"
+TEXT_FILE = "texts.bin"
+
+_COLUMNS = ("chunk_doc", "chunk_index", "char_start", "char_end", "byte_start", "byte_end")
+_TYPECODES = {"chunk_doc": "i", "chunk_index": "i", "char_start": "q", "char_end": "q",
+              "byte_start": "q", "byte_end": "q"}
+
+
+def utf8_offsets(text: str, positions: Sequence[int]) -> Dict[int, int]:
+    """Map character positions in text to UTF-8 byte offsets in one pass over the text."""
+    offsets = {}
+    char_pos = 0
+    byte_pos = 0
+    for position in sorted(set(positions)):
+        byte_pos += len(text[char_pos:position].encode('utf-8'))
+        char_pos = position
+        offsets[position] = byte_pos
+    return offsets
+
+
+class ChunkStore:
+    """Columnar chunk metadata with lazily decoded chunk text."""
+
+    __slots__ = ("doc_ids", "titles", "urls", "types", "chunk_doc", "chunk_index",
+                 "char_start", "char_end", "byte_start", "byte_end",
+                 "_mapped", "_mapped_file", "_tail")
+
+    def __init__(self):
+        # Per-document columns (row = position)
+        self.doc_ids: List[str] = []
+        self.titles: List[str] = []
+        self.urls: List[str] = []
+        self.types: List[str] = []
+        # Per-chunk columns (row = chunk id); chunk_doc is -1 for removed chunks
+        self.chunk_doc = array('i')
+        self.chunk_index = array('i')
+        self.char_start = array('q')
+        self.char_end = array('q')
+        self.byte_start = array('q')
+        self.byte_end = array('q')
+        # Text bytes: a memory-mapped file, followed by in-memory text added since
+        self._mapped = b""
+        self._mapped_file = None
+        self._tail = bytearray()
+
+    def __len__(self):
+        return len(self.chunk_doc)
+
+    def __iter__(self):
+        for chunk_id in range(len(self)):
+            yield self[chunk_id]
+
+    def __getitem__(self, chunk_id) -> Optional[Dict]:
+        row = self.chunk_doc[chunk_id]
+        if row < 0:
+            return None
+        return {
+            'doc_id': self.doc_ids[row],
+            'title': self.titles[row],
+            'url': self.urls[row],
+            'chunk_index': self.chunk_index[chunk_id],
+            'start': self.char_start[chunk_id],
+            'end': self.char_end[chunk_id],
+            'text': self.text(chunk_id),
+            'type': self.types[row]
+        }
+
+    def __setitem__(self, chunk_id, value):
+        if value is not None:
+            raise TypeError("ChunkStore only supports removing chunks (store[i] = None)")
+        self.chunk_doc[chunk_id] = -1
+
+    def _text_size(self) -> int:
+        return len(self._mapped) + len(self._tail)
+
+    def text(self, chunk_id) -> str:
+        start, end = self.byte_start[chunk_id], self.byte_end[chunk_id]
+        mapped_size = len(self._mapped)
+        if end <= mapped_size:
+            data = self._mapped[start:end]
+        elif start >= mapped_size:
+            data = self._tail[start - mapped_size:end - mapped_size]
+        else:
+            data = bytes(self._mapped[start:]) + bytes(self._tail[:end - mapped_size])
+        return bytes(data).decode('utf-8')
+
+    def doc_id(self, chunk_id) -> Optional[str]:
+        row = self.chunk_doc[chunk_id]
+        return self.doc_ids[row] if row >= 0 else None
+
+    def add_document(self, doc: Dict, spans: List[Tuple[int, int]]) -> np.ndarray:
+        """Append a document's chunks given their (start, end) character offsets; returns their chunk ids."""
+        row = len(self.doc_ids)
+        self.doc_ids.append(doc['id'])
+        self.titles.append(doc['title'])
+        self.urls.append(doc.get('url', ''))
+        self.types.append(doc.get('type', 'web_page'))
+
+        content = doc['content']
+        base = self._text_size()
+        self._tail += content.encode('utf-8')
+        offsets = utf8_offsets(content, [pos for span in spans for pos in span])
+
+        first_id = len(self)
+        for i, (start, end) in enumerate(spans):
+            self.chunk_doc.append(row)
+            self.chunk_index.append(i)
+            self.char_start.append(start)
+            self.char_end.append(end)
+            self.byte_start.append(base + offsets[start])
+            self.byte_end.append(base + offsets[end])
+        return np.arange(first_id, len(self), dtype='int64')
+
+    def nbytes(self) -> int:
+        """Resident bytes of the metadata columns and in-memory text (mapped text excluded)."""
+        columns = sum(getattr(self, name).itemsize * len(getattr(self, name)) for name in _COLUMNS)
+        doc_table = sum(len(s) for column in (self.doc_ids, self.titles, self.urls, self.types) for s in column)
+        return columns + doc_table + len(self._tail)
+
+    def save(self, directory):
+        """Write the columns, document table and text file, then map the written text file."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = directory / (TEXT_FILE + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(self._mapped)
+            f.write(self._tail)
+        os.replace(tmp_path, directory / TEXT_FILE)
+
+        tmp_path = directory / (CHUNKS_FILE + ".tmp.npz")
+        np.savez(tmp_path, **{name: np.frombuffer(getattr(self, name), dtype=_TYPECODES[name]) for name in _COLUMNS})
+        os.replace(tmp_path, directory / CHUNKS_FILE)
+
+        tmp_path = directory / (DOCS_FILE + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"doc_ids": self.doc_ids, "titles": self.titles, "urls": self.urls, "types": self.types},
+                      f, ensure_ascii=False)
+        os.replace(tmp_path, directory / DOCS_FILE)
+
+        # The old mapping (if any) stays valid until the new file is mapped
+        old_mapped, old_file = self._mapped, self._mapped_file
+        self._map_text(directory / TEXT_FILE)
+        if isinstance(old_mapped, mmap.mmap):
+            old_mapped.close()
+            old_file.close()
+
+    @classmethod
+    def load(cls, directory) -> "ChunkStore":
+        directory = Path(directory)
+        store = cls()
+        with open(directory / DOCS_FILE, 'r', encoding='utf-8') as f:
+            docs = json.load(f)
+        store.doc_ids, store.titles, store.urls, store.types = (
+            docs["doc_ids"], docs["titles"], docs["urls"], docs["types"]
+        )
+        with np.load(directory / CHUNKS_FILE) as columns:
+            for name in _COLUMNS:
+                setattr(store, name, array(_TYPECODES[name], columns[name].astype(_TYPECODES[name]).tobytes()))
+        store._map_text(directory / TEXT_FILE)
+        return store
+
+    def _map_text(self, path):
+        self._tail = bytearray()
+        self._mapped = b""
+        self._mapped_file = None
+        if os.path.getsize(path) == 0:
+            return
+        self._mapped_file = open(path, 'rb')
+        self._mapped = mmap.mmap(self._mapped_file.fileno(), 0, access=mmap.ACCESS_READ)
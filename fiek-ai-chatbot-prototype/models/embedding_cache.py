@@ -0,0 +1,17 @@
+"""
+Query-embedding cache for the Streamlit assistant (appV2.py).
+
+The implementation is the backend's (backend/models/embedding_cache.py).
+It is loaded from its file rather than by putting backend/ on sys.path,
+where the backend's `models` package would shadow this one.
+"""
+
+import importlib.util
+from pathlib import Path
+
+_PATH = Path(__file__).resolve().parents[2] / "backend" / "models" / "embedding_cache.py"
+_spec = importlib.util.spec_from_file_location("backend_embedding_cache", _PATH)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+
+CachedEmbeddings = _module.CachedEmbeddings
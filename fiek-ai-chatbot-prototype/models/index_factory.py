@@ -0,0 +1,151 @@
+"""
+FAISS index factory for the FIEKChatbot search index.
+
+Index types (all use inner product on normalized vectors = cosine):
+- "flat":     exact brute-force search (default, best for small corpora)
+- "ivf_flat": inverted file over k-means cells; searches `nprobe` cells
+- "ivf_pq":   IVF with product-quantized vectors (smallest memory)
+- "hnsw":     graph search; `ef_search` trades recall for latency
+
+Vector storage ("float32" by default) can be "float16" or "int8" (scalar
+quantization, 1/2 and 1/4 of the memory) or "pq" (product quantization,
+pq_m bytes per vector); ivf_pq always stores PQ codes.
+
+Every index accepts add_with_ids() with chunk ids. IVF indexes keep ids
+natively and support remove_ids(). Flat and HNSW are wrapped in
+IndexIDMap2, so vectors can be reconstructed by id when compacting.
+Use benchmark_index.py to pick settings by recall and latency.
+"""
+
+import math
+from typing import Optional
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+VECTOR_STORAGES = ("float32", "float16", "int8", "pq")
+_SQ_TYPES = {"float16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+
+# k-means wants roughly this many training points per cell
+MIN_POINTS_PER_CELL = 39
+# Cap on the training sample (FAISS samples 256 points per cell anyway)
+MAX_TRAIN_POINTS_PER_CELL = 256
+
+
+def default_nlist(n_vectors: int) -> int:
+    """About 4 * sqrt(N) cells, but never fewer training points per cell than k-means needs."""
+    nlist = int(4 * math.sqrt(max(n_vectors, 1)))
+    return max(1, min(nlist, n_vectors // MIN_POINTS_PER_CELL))
+
+
+def min_training_points(index_type: str, nlist: int, nbits: int = 8, storage: str = "float32") -> int:
+    """Vectors needed before an index of this type can be trained."""
+    needed = 0
+    if index_type in ("ivf_flat", "ivf_pq"):
+        needed = nlist * MIN_POINTS_PER_CELL
+    if index_type == "ivf_pq" or storage == "pq":
+        needed = max(needed, 2 ** nbits * MIN_POINTS_PER_CELL)
+    elif storage == "int8":
+        # Scalar quantizer ranges are estimated from a sample
+        needed = max(needed, 1)
+    return needed
+
+
+def _pq_subquantizers(dimension: int, wanted: int) -> int:
+    """Largest m <= wanted that divides the dimension (PQ requirement)."""
+    for m in range(min(wanted, dimension), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def _training_sample(train_vectors: np.ndarray, size: int, seed: int) -> np.ndarray:
+    if size < len(train_vectors):
+        rng = np.random.default_rng(seed)
+        train_vectors = train_vectors[rng.choice(len(train_vectors), size, replace=False)]
+    return np.ascontiguousarray(train_vectors, dtype='float32')
+
+
+def create_index(index_type: str, dimension: int, train_vectors: Optional[np.ndarray] = None,
+                 nlist: Optional[int] = None, pq_m: int = 48, nbits: int = 8,
+                 hnsw_m: int = 32, ef_construction: int = 80, storage: str = "float32",
+                 seed: int = 1234) -> faiss.Index:
+    """
+    Create an empty index ready for add_with_ids(). Trained index types and
+    storages are trained on a random sample of train_vectors; when there
+    are too few vectors to train them, an exact float32 flat index is
+    returned instead.
+    """
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type {index_type!r}; expected one of {INDEX_TYPES}")
+    if storage not in VECTOR_STORAGES:
+        raise ValueError(f"Unknown vector storage {storage!r}; expected one of {VECTOR_STORAGES}")
+
+    n = 0 if train_vectors is None else len(train_vectors)
+    if index_type in ("ivf_flat", "ivf_pq"):
+        nlist = nlist or default_nlist(n)
+    if n < min_training_points(index_type, nlist or 0, nbits, storage):
+        print(f"Only {n} vectors - too few to train {index_type} with {storage} storage; using a flat index")
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+    m = _pq_subquantizers(dimension, pq_m)
+    metric = faiss.METRIC_INNER_PRODUCT
+
+    if index_type == "hnsw":
+        if storage in _SQ_TYPES:
+            hnsw = faiss.IndexHNSWSQ(dimension, _SQ_TYPES[storage], hnsw_m, metric)
+        elif storage == "pq":
+            hnsw = faiss.IndexHNSWPQ(dimension, m, hnsw_m, nbits, metric)
+        else:
+            hnsw = faiss.IndexHNSWFlat(dimension, hnsw_m, metric)
+        hnsw.hnsw.efConstruction = ef_construction
+        if not hnsw.is_trained:
+            hnsw.train(_training_sample(train_vectors, 2 ** nbits * MAX_TRAIN_POINTS_PER_CELL, seed))
+        return faiss.IndexIDMap2(hnsw)
+
+    if index_type in ("ivf_flat", "ivf_pq"):
+        quantizer = faiss.IndexFlatIP(dimension)
+        if index_type == "ivf_pq" or storage == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, nbits, metric)
+        elif storage in _SQ_TYPES:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, _SQ_TYPES[storage], metric)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, metric)
+        # The index must not be freed along with the Python quantizer wrapper
+        index.own_fields = True
+        quantizer.this.disown()
+
+        index.train(_training_sample(train_vectors, nlist * MAX_TRAIN_POINTS_PER_CELL, seed))
+        # Lets compaction and reconstruct() look vectors up by id
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+
+    if storage in _SQ_TYPES:
+        flat = faiss.IndexScalarQuantizer(dimension, _SQ_TYPES[storage], metric)
+    elif storage == "pq":
+        flat = faiss.IndexPQ(dimension, m, nbits, metric)
+    else:
+        flat = faiss.IndexFlatIP(dimension)
+    if not flat.is_trained:
+        flat.train(_training_sample(train_vectors, 2 ** nbits * MAX_TRAIN_POINTS_PER_CELL, seed))
+    return faiss.IndexIDMap2(flat)
+
+
+def set_search_params(index: faiss.Index, nprobe: int = 8, ef_search: int = 64):
+    """Apply query-time knobs to whichever index type this is (no-op for flat)."""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = ef_search
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+
+
+def describe_index(index: faiss.Index) -> str:
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        return f"{type(inner).__name__}(nlist={ivf.nlist}, nprobe={ivf.nprobe})"
+    if isinstance(inner, faiss.IndexHNSW):
+        return f"{type(inner).__name__}(efSearch={inner.hnsw.efSearch})"
+    return type(inner).__name__
@@ -0,0 +1,105 @@
+"""
+On-disk cache of the FIEKChatbot search index.
+
+The FAISS index, the chunk store (columnar metadata plus a text file)
+and a fingerprint of everything the
+index depends on (knowledge base content, embedding model, chunking
+settings) are written next to the knowledge base. On the next start the
+index is memory-mapped instead of re-encoding the corpus, as long as the
+fingerprint still matches.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import faiss
+
+from .chunk_store import ChunkStore
+
+INDEX_FILE = "faiss.index"
+META_FILE = "index_meta.json"
+# Chunk list written by format versions 1-2, superseded by the chunk store
+LEGACY_FILES = ("documents.json",)
+# Bump when the on-disk layout changes so old caches are rebuilt
+FORMAT_VERSION = 3
+
+
+def corpus_fingerprint(knowledge_base: List[Dict], **settings) -> str:
+    """Hash of the knowledge base plus the settings that shape the index."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({"format": FORMAT_VERSION, **settings}, sort_keys=True).encode("utf-8"))
+    for doc in knowledge_base:
+        digest.update(json.dumps(doc, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _write_atomic(path: Path, write):
+    tmp_path = path.with_name(path.name + ".tmp")
+    write(str(tmp_path))
+    os.replace(tmp_path, path)
+
+
+def save_index(index_dir, index: faiss.Index, documents: ChunkStore, fingerprint: str):
+    """
+    Write index, chunk store and metadata; the metadata file goes last and
+    marks the cache valid. The chunk store switches to the written text file.
+    Files of older cache formats are removed.
+    """
+    index_dir = Path(index_dir)
+    index_dir.mkdir(parents=True, exist_ok=True)
+    meta_path = index_dir / META_FILE
+    if meta_path.exists():
+        # Invalidate first so a crash mid-save can't pair new files with old metadata
+        meta_path.unlink()
+
+    _write_atomic(index_dir / INDEX_FILE, lambda p: faiss.write_index(index, p))
+
+    def write_json(data):
+        def write(p):
+            with open(p, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+        return write
+
+    documents.save(index_dir)
+    _write_atomic(meta_path, write_json({
+        "fingerprint": fingerprint,
+        "ntotal": int(index.ntotal),
+        "dimension": int(index.d),
+    }))
+    for name in LEGACY_FILES:
+        (index_dir / name).unlink(missing_ok=True)
+
+
+def read_index(path, mmap: bool = True) -> faiss.Index:
+    """Read a FAISS index, memory-mapped when the index type supports it."""
+    if mmap:
+        try:
+            return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # Not every index type can be mapped; fall back to a normal read
+            pass
+    return faiss.read_index(str(path))
+
+
+def load_index(index_dir, fingerprint: str, mmap: bool = True) -> Optional[Tuple[faiss.Index, ChunkStore]]:
+    """Return (index, chunk store) if a cache for this fingerprint exists, else None."""
+    index_dir = Path(index_dir)
+    meta_path = index_dir / META_FILE
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get("fingerprint") != fingerprint:
+            return None
+        index = read_index(index_dir / INDEX_FILE, mmap=mmap)
+        documents = ChunkStore.load(index_dir)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Ignoring unreadable index cache in {index_dir}: {e}")
+        return None
+    if index.ntotal != meta.get("ntotal") or len(documents) < index.ntotal:
+        return None
+    return index, documents
@@ -3,6 +3,7 @@ Simple test script to verify the chatbot is working.
 """
 
 import sys
+import time
 from pathlib import Path
 
 # Add parent directory to path
@@ -50,6 +51,24 @@ def test_chatbot():
             
             print("\n")
         
+        # Batched answers must match the one-by-one answers
+        print("Batch query test")
+        print("-" * 60)
+        start = time.perf_counter()
+        single_results = [chatbot.answer(query) for query in test_queries]
+        single_time = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        batch_results = chatbot.answer_batch(test_queries)
+        batch_time = time.perf_counter() - start
+        
+        for single, batch in zip(single_results, batch_results):
+            assert single['response'] == batch['response'], "answer_batch response differs from answer"
+            assert sorted(single['sources']) == sorted(batch['sources']), "answer_batch sources differ from answer"
+        print(f"answer() loop: {single_time:.3f}s, answer_batch(): {batch_time:.3f}s "
+              f"for {len(test_queries)} queries - results match")
+        print("\n")
+        
         print("=" * 60)
         print("Test completed!")
         